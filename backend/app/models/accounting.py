@@ -7,6 +7,8 @@ import os
 # Add the parent directory to the path to import app
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
+from app.models.money import Money, to_minor_units
+
 db = SQLAlchemy()
 
 class Account(db.Model):
@@ -26,10 +28,14 @@ class Account(db.Model):
     parent_id = db.Column(db.Integer, db.ForeignKey('accounts.id'), nullable=True)
     level = db.Column(db.Integer, default=1)
     
+    # Materialized hierarchy, maintained on insert, reparent and rename
+    full_code = db.Column(db.String(255), nullable=True, index=True)  # e.g. 1000.1100.1110
+    full_name = db.Column(db.String(1000), nullable=True)
+    
     # Balance Information
     normal_balance = db.Column(db.String(10), nullable=False)  # debit, credit
-    current_balance = db.Column(db.Float, default=0.0)
-    opening_balance = db.Column(db.Float, default=0.0)
+    current_balance = db.Column(Money, default=0.0)
+    opening_balance = db.Column(Money, default=0.0)
     
     # Settings
     is_active = db.Column(db.Boolean, default=True)
@@ -45,34 +51,24 @@ class Account(db.Model):
     
     # Relationships
     parent = db.relationship('Account', remote_side=[id], backref='children', lazy=True)
-    journal_entries = db.relationship('JournalEntry', backref='account', lazy=True)
     
     def get_balance(self, as_of_date=None):
         """Get account balance as of specific date"""
-        query = JournalEntry.query.filter_by(account_id=self.id)
-        
-        if as_of_date:
-            query = query.filter(JournalEntry.entry_date <= as_of_date)
-        
-        entries = query.all()
-        
-        balance = self.opening_balance
-        for entry in entries:
-            if self.normal_balance == 'debit':
-                balance += entry.debit_amount - entry.credit_amount
-            else:
-                balance += entry.credit_amount - entry.debit_amount
-        
-        return balance
+        from app.services.account_balances import get_account_balance
+        return get_account_balance(self, as_of_date)
     
     def get_full_code(self):
         """Get full account code with parent codes"""
+        if self.full_code:
+            return self.full_code
         if self.parent:
             return f"{self.parent.get_full_code()}.{self.code}"
         return self.code
     
     def get_full_name(self):
         """Get full account name with parent names"""
+        if self.full_name:
+            return self.full_name
         if self.parent:
             return f"{self.parent.get_full_name()} > {self.name}"
         return self.name
@@ -86,7 +82,7 @@ class Account(db.Model):
         
         db.session.commit()
     
-    def to_dict(self, include_balance=True):
+    def to_dict(self, include_balance=True, balance=None):
         """Convert account object to dictionary"""
         data = {
             'id': self.id,
@@ -111,7 +107,8 @@ class Account(db.Model):
         }
         
         if include_balance:
-            data['current_balance'] = self.get_balance()
+            # Bulk listings pass a balance precomputed by get_account_balances
+            data['current_balance'] = balance if balance is not None else self.get_balance()
         
         return data
     
@@ -119,6 +116,20 @@ class Account(db.Model):
         return f'<Account {self.code}: {self.name}>'
 
 
+@db.event.listens_for(Account, 'before_insert')
+def materialize_account_path_on_insert(mapper, connection, target):
+    """Set full_code, full_name and level from the parent row"""
+    from app.services.account_paths import materialize_path
+    materialize_path(connection, target)
+
+
+@db.event.listens_for(Account, 'before_update')
+def materialize_account_path_on_update(mapper, connection, target):
+    """Refresh the path and rewrite the subtree after a rename or reparent"""
+    from app.services.account_paths import update_path
+    update_path(connection, target)
+
+
 class JournalEntry(db.Model):
     __tablename__ = 'journal_entries'
     
@@ -135,8 +146,8 @@ class JournalEntry(db.Model):
     reference_number = db.Column(db.String(100), nullable=True)
     
     # Amounts
-    total_debit = db.Column(db.Float, default=0.0)
-    total_credit = db.Column(db.Float, default=0.0)
+    total_debit = db.Column(Money, default=0.0)
+    total_credit = db.Column(Money, default=0.0)
     
     # Status
     status = db.Column(db.String(20), default='draft')  # draft, posted, reversed
@@ -149,6 +160,9 @@ class JournalEntry(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     posted_at = db.Column(db.DateTime, nullable=True)
     
+    # Indexes
+    __table_args__ = (db.Index('ix_journal_entries_status_date', 'status', 'entry_date'),)
+    
     # Relationships
     entries = db.relationship('JournalEntryLine', backref='journal_entry', lazy=True, cascade='all, delete-orphan')
     creator = db.relationship('User', foreign_keys=[created_by], backref='created_journal_entries', lazy=True)
@@ -158,30 +172,20 @@ class JournalEntry(db.Model):
         """Calculate total debits and credits"""
         self.total_debit = sum(line.debit_amount for line in self.entries)
         self.total_credit = sum(line.credit_amount for line in self.entries)
-        db.session.commit()
     
     def is_balanced(self):
         """Check if journal entry is balanced"""
-        return abs(self.total_debit - self.total_credit) < 0.01
+        return to_minor_units(self.total_debit or 0) == to_minor_units(self.total_credit or 0)
     
     def post(self, posted_by_user_id):
         """Post journal entry"""
-        if not self.is_balanced():
-            raise ValueError("Journal entry is not balanced")
-        
-        self.status = 'posted'
-        self.posted_by = posted_by_user_id
-        self.posted_at = datetime.utcnow()
-        
-        # Update account balances
-        for line in self.entries:
-            if line.account:
-                line.account.update_balance(line.debit_amount, line.credit_amount)
-        
-        db.session.commit()
+        from app.services.journal_posting import post_journal_entry
+        post_journal_entry(self, posted_by_user_id)
     
     def reverse(self, reversal_date=None, description=None):
         """Create reversal entry"""
+        from app.services.journal_posting import allocate_entry_numbers
+        
         if reversal_date is None:
             reversal_date = datetime.now().date()
         
@@ -190,7 +194,7 @@ class JournalEntry(db.Model):
         
         # Create reversal entry
         reversal = JournalEntry(
-            entry_number=self.generate_entry_number(),
+            entry_number=allocate_entry_numbers(1)[0],
             entry_date=reversal_date,
             description=description,
             reference_type='reversal',
@@ -262,12 +266,12 @@ class JournalEntryLine(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     journal_entry_id = db.Column(db.Integer, db.ForeignKey('journal_entries.id'), nullable=False)
-    account_id = db.Column(db.Integer, db.ForeignKey('accounts.id'), nullable=False)
+    account_id = db.Column(db.Integer, db.ForeignKey('accounts.id'), nullable=False, index=True)
     
     # Entry Details
     description = db.Column(db.Text, nullable=False)
-    debit_amount = db.Column(db.Float, default=0.0)
-    credit_amount = db.Column(db.Float, default=0.0)
+    debit_amount = db.Column(Money, default=0.0)
+    credit_amount = db.Column(Money, default=0.0)
     
     # Additional Information
     reference = db.Column(db.String(100), nullable=True)
@@ -275,6 +279,11 @@ class JournalEntryLine(db.Model):
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Covering index so range aggregates never touch the table rows
+    __table_args__ = (
+        db.Index('ix_journal_entry_lines_entry_account', 'journal_entry_id', 'account_id', 'debit_amount', 'credit_amount'),
+    )
+    
     # Relationships
     account = db.relationship('Account', backref='journal_entry_lines', lazy=True)
     
@@ -306,7 +315,7 @@ class Payment(db.Model):
     # Payment Information
     payment_date = db.Column(db.Date, nullable=False, default=datetime.utcnow().date)
     payment_type = db.Column(db.String(20), nullable=False)  # receipt, payment
-    amount = db.Column(db.Float, nullable=False)
+    amount = db.Column(Money, nullable=False)
     
     # Party Information
     party_type = db.Column(db.String(20), nullable=False)  # customer, supplier, employee, other
@@ -330,6 +339,10 @@ class Payment(db.Model):
     # Status
     status = db.Column(db.String(20), default='draft')  # draft, posted, cancelled
     
+    # Bank Reconciliation
+    statement_line_id = db.Column(db.Integer, db.ForeignKey('bank_statement_lines.id'), nullable=True)
+    reconciled_at = db.Column(db.DateTime, nullable=True)
+    
     # Additional Information
     description = db.Column(db.Text, nullable=True)
     notes = db.Column(db.Text, nullable=True)
@@ -346,6 +359,11 @@ class Payment(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     posted_at = db.Column(db.DateTime, nullable=True)
     
+    # Indexes
+    __table_args__ = (
+        db.Index('ix_payments_reconcile', 'bank_account_id', 'statement_line_id', 'payment_date'),
+    )
+    
     # Relationships
     creator = db.relationship('User', foreign_keys=[created_by], backref='created_payments', lazy=True)
     poster = db.relationship('User', foreign_keys=[posted_by], backref='posted_payments', lazy=True)
@@ -353,80 +371,18 @@ class Payment(db.Model):
     
     def post(self, posted_by_user_id):
         """Post payment and create journal entry"""
-        self.status = 'posted'
-        self.posted_by = posted_by_user_id
-        self.posted_at = datetime.utcnow()
-        
-        # Create journal entry
-        journal_entry = JournalEntry(
-            entry_number=JournalEntry.generate_entry_number(),
-            entry_date=self.payment_date,
-            description=f"{self.payment_type.title()} - {self.party_name}",
-            reference_type='payment',
-            reference_id=self.id,
-            reference_number=self.payment_number,
-            created_by=posted_by_user_id
-        )
-        
-        db.session.add(journal_entry)
-        db.session.flush()
-        
-        # Create journal entry lines
-        if self.payment_type == 'receipt':
-            # Debit: Cash/Bank Account
-            debit_line = JournalEntryLine(
-                journal_entry_id=journal_entry.id,
-                account_id=self.bank_account_id or 1,  # Default cash account
-                description=f"Receipt from {self.party_name}",
-                debit_amount=self.amount,
-                credit_amount=0
-            )
-            
-            # Credit: Customer/Party Account
-            credit_line = JournalEntryLine(
-                journal_entry_id=journal_entry.id,
-                account_id=self._get_party_account_id(),
-                description=f"Receipt from {self.party_name}",
-                debit_amount=0,
-                credit_amount=self.amount
-            )
-        else:  # payment
-            # Debit: Supplier/Party Account
-            debit_line = JournalEntryLine(
-                journal_entry_id=journal_entry.id,
-                account_id=self._get_party_account_id(),
-                description=f"Payment to {self.party_name}",
-                debit_amount=self.amount,
-                credit_amount=0
-            )
-            
-            # Credit: Cash/Bank Account
-            credit_line = JournalEntryLine(
-                journal_entry_id=journal_entry.id,
-                account_id=self.bank_account_id or 1,  # Default cash account
-                description=f"Payment to {self.party_name}",
-                debit_amount=0,
-                credit_amount=self.amount
-            )
-        
-        db.session.add(debit_line)
-        db.session.add(credit_line)
-        
-        journal_entry.calculate_totals()
-        journal_entry.post(posted_by_user_id)
-        
-        db.session.commit()
+        from app.services.payment_import import post_payments
+        post_payments([self], posted_by_user_id)
     
     def _get_party_account_id(self):
         """Get party account ID based on party type"""
-        # This should be implemented based on your chart of accounts
-        # For now, return default accounts
-        if self.party_type == 'customer':
-            return 2  # Accounts Receivable
-        elif self.party_type == 'supplier':
-            return 3  # Accounts Payable
-        else:
-            return 4  # Other Receivables/Payables
+        return Payment.get_party_account_id(self.party_type)
+    
+    @staticmethod
+    def get_party_account_id(party_type):
+        """Get party account ID for a party type from the posting rules"""
+        from app.services.posting_rules import get_party_account_id
+        return get_party_account_id(party_type)
     
     def to_dict(self):
         """Convert payment object to dictionary"""
@@ -449,6 +405,8 @@ class Payment(db.Model):
             'reference_id': self.reference_id,
             'reference_number': self.reference_number,
             'status': self.status,
+            'statement_line_id': self.statement_line_id,
+            'reconciled_at': self.reconciled_at.isoformat() if self.reconciled_at else None,
             'description': self.description,
             'notes': self.notes,
             'currency': self.currency,
@@ -471,3 +429,352 @@ class Payment(db.Model):
     
     def __repr__(self):
         return f'<Payment {self.payment_number}: {self.amount}>'
+
+
+class FiscalPeriod(db.Model):
+    __tablename__ = 'fiscal_periods'
+    
+    # One period calendar for the one set of books: accounts and journal entries carry no company
+    id = db.Column(db.Integer, primary_key=True)
+    
+    # Period Information
+    fiscal_year = db.Column(db.Integer, nullable=False)  # Calendar year the fiscal year starts in
+    period_number = db.Column(db.Integer, nullable=False)  # 1-12
+    name = db.Column(db.String(50), nullable=False)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=False)
+    
+    # Status
+    status = db.Column(db.String(20), default='open')  # open, closed
+    
+    # User Information
+    closed_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    closed_at = db.Column(db.DateTime, nullable=True)
+    
+    # Indexes
+    __table_args__ = (
+        db.UniqueConstraint('start_date', name='unique_period_start'),
+        db.Index('ix_fiscal_periods_status_dates', 'status', 'start_date', 'end_date'),
+    )
+    
+    # Relationships
+    snapshots = db.relationship('AccountBalanceSnapshot', backref='period', lazy=True, cascade='all, delete-orphan')
+    closer = db.relationship('User', foreign_keys=[closed_by], backref='closed_fiscal_periods', lazy=True)
+    
+    def is_closed(self):
+        """Check if period is closed"""
+        return self.status == 'closed'
+    
+    def contains(self, entry_date):
+        """Check if a date falls inside this period"""
+        return self.start_date <= entry_date <= self.end_date
+    
+    def to_dict(self):
+        """Convert fiscal period object to dictionary"""
+        return {
+            'id': self.id,
+            'fiscal_year': self.fiscal_year,
+            'period_number': self.period_number,
+            'name': self.name,
+            'start_date': self.start_date.isoformat(),
+            'end_date': self.end_date.isoformat(),
+            'status': self.status,
+            'closed_by': self.closed_by,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat(),
+            'closed_at': self.closed_at.isoformat() if self.closed_at else None
+        }
+    
+    def __repr__(self):
+        return f'<FiscalPeriod {self.name}: {self.status}>'
+
+
+class AccountBalanceSnapshot(db.Model):
+    __tablename__ = 'account_balance_snapshots'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    period_id = db.Column(db.Integer, db.ForeignKey('fiscal_periods.id'), nullable=False)
+    account_id = db.Column(db.Integer, db.ForeignKey('accounts.id'), nullable=False)
+    
+    # Cumulative posted totals from the first entry through period_end (opening_balance excluded)
+    period_end = db.Column(db.Date, nullable=False)
+    debit_total = db.Column(Money, default=0.0)
+    credit_total = db.Column(Money, default=0.0)
+    
+    # Closing balance in the account's normal direction, opening_balance included
+    closing_balance = db.Column(Money, default=0.0)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Indexes
+    __table_args__ = (
+        db.UniqueConstraint('period_id', 'account_id', name='unique_period_account_snapshot'),
+        db.Index('ix_account_balance_snapshots_end_account', 'period_end', 'account_id'),
+    )
+    
+    # Relationships
+    account = db.relationship('Account', backref='balance_snapshots', lazy=True)
+    
+    def to_dict(self):
+        """Convert balance snapshot object to dictionary"""
+        return {
+            'id': self.id,
+            'period_id': self.period_id,
+            'account_id': self.account_id,
+            'period_end': self.period_end.isoformat(),
+            'debit_total': self.debit_total,
+            'credit_total': self.credit_total,
+            'closing_balance': self.closing_balance,
+            'created_at': self.created_at.isoformat()
+        }
+    
+    def __repr__(self):
+        return f'<AccountBalanceSnapshot A:{self.account_id} {self.period_end}: {self.closing_balance}>'
+
+
+class BankStatementLine(db.Model):
+    __tablename__ = 'bank_statement_lines'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    bank_account_id = db.Column(db.Integer, db.ForeignKey('accounts.id'), nullable=True)
+    
+    # Statement Information
+    statement_date = db.Column(db.Date, nullable=False)
+    amount = db.Column(Money, nullable=False)  # Positive for credits (receipts), negative for debits
+    reference_number = db.Column(db.String(100), nullable=True)
+    check_number = db.Column(db.String(50), nullable=True)
+    description = db.Column(db.Text, nullable=True)
+    
+    # Reconciliation
+    status = db.Column(db.String(20), default='unmatched')  # unmatched, matched
+    match_type = db.Column(db.String(20), nullable=True)  # reference, check, exact, date_tolerance, group
+    matched_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    matched_at = db.Column(db.DateTime, nullable=True)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Indexes
+    __table_args__ = (
+        db.Index('ix_bank_statement_lines_account_status_date', 'bank_account_id', 'status', 'statement_date'),
+    )
+    
+    # Relationships
+    payments = db.relationship('Payment', backref='statement_line', lazy=True)
+    bank_account = db.relationship('Account', backref='statement_lines', lazy=True)
+    
+    def to_dict(self):
+        """Convert bank statement line object to dictionary"""
+        return {
+            'id': self.id,
+            'bank_account_id': self.bank_account_id,
+            'statement_date': self.statement_date.isoformat(),
+            'amount': self.amount,
+            'reference_number': self.reference_number,
+            'check_number': self.check_number,
+            'description': self.description,
+            'status': self.status,
+            'match_type': self.match_type,
+            'matched_by': self.matched_by,
+            'matched_at': self.matched_at.isoformat() if self.matched_at else None,
+            'payment_ids': [payment.id for payment in self.payments],
+            'created_at': self.created_at.isoformat()
+        }
+    
+    def __repr__(self):
+        return f'<BankStatementLine {self.statement_date}: {self.amount}>'
+
+
+class ExchangeRate(db.Model):
+    __tablename__ = 'exchange_rates'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    currency = db.Column(db.String(3), nullable=False)
+    rate_date = db.Column(db.Date, nullable=False)
+    rate = db.Column(db.Float, nullable=False)  # Base currency units per one unit of currency
+    source = db.Column(db.String(50), nullable=True)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Indexes
+    __table_args__ = (
+        db.UniqueConstraint('currency', 'rate_date', name='unique_currency_rate_date'),
+    )
+    
+    def to_dict(self):
+        """Convert exchange rate object to dictionary"""
+        return {
+            'id': self.id,
+            'currency': self.currency,
+            'rate_date': self.rate_date.isoformat(),
+            'rate': self.rate,
+            'source': self.source,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
+    
+    def __repr__(self):
+        return f'<ExchangeRate {self.currency} {self.rate_date}: {self.rate}>'
+
+
+class AccountMonthlyTotal(db.Model):
+    __tablename__ = 'account_monthly_totals'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    account_id = db.Column(db.Integer, db.ForeignKey('accounts.id'), nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)  # 1-12
+    cost_center = db.Column(db.String(50), nullable=False, default='')  # '' = not split by cost center
+    
+    # Posted totals for the month, maintained at posting time
+    debit_total = db.Column(Money, default=0.0)
+    credit_total = db.Column(Money, default=0.0)
+    
+    # Timestamps
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Indexes
+    __table_args__ = (
+        db.UniqueConstraint('year', 'month', 'account_id', 'cost_center', name='unique_account_month_cost_center'),
+    )
+    
+    # Relationships
+    account = db.relationship('Account', backref='monthly_totals', lazy=True)
+    
+    def to_dict(self):
+        """Convert monthly total object to dictionary"""
+        return {
+            'id': self.id,
+            'account_id': self.account_id,
+            'year': self.year,
+            'month': self.month,
+            'cost_center': self.cost_center,
+            'debit_total': self.debit_total,
+            'credit_total': self.credit_total,
+            'updated_at': self.updated_at.isoformat()
+        }
+    
+    def __repr__(self):
+        return f'<AccountMonthlyTotal A:{self.account_id} {self.year}-{self.month}: D:{self.debit_total} C:{self.credit_total}>'
+
+
+class Budget(db.Model):
+    __tablename__ = 'budgets'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    account_id = db.Column(db.Integer, db.ForeignKey('accounts.id'), nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)  # 1-12
+    cost_center = db.Column(db.String(50), nullable=False, default='')  # '' = whole company
+    
+    # Budgeted amount in the account's normal direction
+    amount = db.Column(Money, nullable=False, default=0.0)
+    notes = db.Column(db.Text, nullable=True)
+    
+    # User Information
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Indexes
+    __table_args__ = (
+        db.UniqueConstraint('year', 'month', 'account_id', 'cost_center', name='unique_budget_account_month_cost_center'),
+    )
+    
+    # Relationships
+    account = db.relationship('Account', backref='budgets', lazy=True)
+    creator = db.relationship('User', foreign_keys=[created_by], backref='created_budgets', lazy=True)
+    
+    def to_dict(self):
+        """Convert budget object to dictionary"""
+        return {
+            'id': self.id,
+            'account_id': self.account_id,
+            'account_code': self.account.code if self.account else None,
+            'account_name': self.account.name if self.account else None,
+            'year': self.year,
+            'month': self.month,
+            'cost_center': self.cost_center,
+            'amount': self.amount,
+            'notes': self.notes,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
+    
+    def __repr__(self):
+        return f'<Budget A:{self.account_id} {self.year}-{self.month}: {self.amount}>'
+
+
+class ArchivedFiscalYear(db.Model):
+    __tablename__ = 'archived_fiscal_years'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    fiscal_year = db.Column(db.Integer, unique=True, nullable=False)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=False)
+    
+    # Archive location: schema (attached database name on SQLite) and file path when attached
+    schema_name = db.Column(db.String(50), nullable=False)
+    location = db.Column(db.String(500), nullable=True)
+    
+    # Rows moved per table
+    journal_entries = db.Column(db.Integer, default=0)
+    journal_entry_lines = db.Column(db.Integer, default=0)
+    invoices = db.Column(db.Integer, default=0)
+    invoice_items = db.Column(db.Integer, default=0)
+    inventory_movements = db.Column(db.Integer, default=0)
+    
+    # User Information
+    archived_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    
+    # Timestamps
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        """Convert archived fiscal year object to dictionary"""
+        return {
+            'id': self.id,
+            'fiscal_year': self.fiscal_year,
+            'start_date': self.start_date.isoformat(),
+            'end_date': self.end_date.isoformat(),
+            'schema_name': self.schema_name,
+            'location': self.location,
+            'journal_entries': self.journal_entries,
+            'journal_entry_lines': self.journal_entry_lines,
+            'invoices': self.invoices,
+            'invoice_items': self.invoice_items,
+            'inventory_movements': self.inventory_movements,
+            'archived_by': self.archived_by,
+            'archived_at': self.archived_at.isoformat() if self.archived_at else None
+        }
+    
+    def __repr__(self):
+        return f'<ArchivedFiscalYear {self.fiscal_year}: {self.schema_name}>'
+
+
+class DocumentSequence(db.Model):
+    __tablename__ = 'document_sequences'
+    
+    # Sequence name, e.g. 'journal_entry' or 'payment_receipt'
+    name = db.Column(db.String(50), primary_key=True)
+    last_value = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        """Convert document sequence object to dictionary"""
+        return {
+            'name': self.name,
+            'last_value': self.last_value
+        }
+    
+    def __repr__(self):
+        return f'<DocumentSequence {self.name}: {self.last_value}>'
@@ -6,6 +6,8 @@ import os
 # Add the parent directory to the path to import app
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
+from app.models.money import Money
+
 db = SQLAlchemy()
 
 class Customer(db.Model):
@@ -38,13 +40,13 @@ class Customer(db.Model):
     industry = db.Column(db.String(100), nullable=True)
     
     # Financial Information
-    credit_limit = db.Column(db.Float, default=0.0)
-    current_balance = db.Column(db.Float, default=0.0)  # Positive = Customer owes us
+    credit_limit = db.Column(Money, default=0.0)
+    current_balance = db.Column(Money, default=0.0)  # Positive = Customer owes us
     payment_terms = db.Column(db.Integer, default=30)  # Days
     currency = db.Column(db.String(3), default='SAR')
     
     # Sales Information
-    total_purchases = db.Column(db.Float, default=0.0)
+    total_purchases = db.Column(Money, default=0.0)
     last_purchase_date = db.Column(db.Date, nullable=True)
     discount_percentage = db.Column(db.Float, default=0.0)
     
@@ -79,45 +81,17 @@ class Customer(db.Model):
         """Check if credit limit would be exceeded"""
         return (self.current_balance + amount) > self.credit_limit
     
-    def get_aging_analysis(self):
+    def get_aging_analysis(self, as_of_date=None):
         """Get customer aging analysis"""
-        from app.models.invoice import Invoice
-        from sqlalchemy import and_
-        
-        today = datetime.now().date()
-        
-        # Get unpaid invoices
-        unpaid_invoices = Invoice.query.filter(
-            and_(
-                Invoice.customer_id == self.id,
-                Invoice.status.in_(['pending', 'overdue']),
-                Invoice.balance_due > 0
-            )
-        ).all()
-        
-        aging = {
-            'current': 0,      # 0-30 days
-            'days_31_60': 0,   # 31-60 days
-            'days_61_90': 0,   # 61-90 days
-            'over_90': 0       # Over 90 days
-        }
-        
-        for invoice in unpaid_invoices:
-            days_overdue = (today - invoice.due_date).days
-            
-            if days_overdue <= 30:
-                aging['current'] += invoice.balance_due
-            elif days_overdue <= 60:
-                aging['days_31_60'] += invoice.balance_due
-            elif days_overdue <= 90:
-                aging['days_61_90'] += invoice.balance_due
-            else:
-                aging['over_90'] += invoice.balance_due
-        
-        return aging
+        from app.services.aging import get_aging_by_party
+        return get_aging_by_party('receivable', [self.id], as_of_date)[self.id]
     
-    def to_dict(self, include_aging=False):
-        """Convert customer object to dictionary"""
+    def to_dict(self, include_aging=False, aging=None):
+        """Convert customer object to dictionary
+        
+        When serializing many customers, pass each one's aging from a single
+        get_aging_by_party('receivable', ids) call.
+        """
         data = {
             'id': self.id,
             'code': self.code,
@@ -152,7 +126,7 @@ class Customer(db.Model):
         }
         
         if include_aging:
-            data['aging_analysis'] = self.get_aging_analysis()
+            data['aging_analysis'] = aging if aging is not None else self.get_aging_analysis()
         
         return data
     
@@ -6,6 +6,8 @@ import os
 # Add the parent directory to the path to import app
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
+from app.models.money import Money
+
 db = SQLAlchemy()
 
 class Invoice(db.Model):
@@ -22,17 +24,21 @@ class Invoice(db.Model):
     due_date = db.Column(db.Date, nullable=False)
     
     # Financial Information
-    subtotal = db.Column(db.Float, default=0.0)
-    discount_amount = db.Column(db.Float, default=0.0)
+    subtotal = db.Column(Money, default=0.0)
+    discount_amount = db.Column(Money, default=0.0)
     discount_percentage = db.Column(db.Float, default=0.0)
-    tax_amount = db.Column(db.Float, default=0.0)
-    total_amount = db.Column(db.Float, default=0.0)
-    paid_amount = db.Column(db.Float, default=0.0)
-    balance_due = db.Column(db.Float, default=0.0)
+    tax_amount = db.Column(Money, default=0.0)
+    total_amount = db.Column(Money, default=0.0)
+    paid_amount = db.Column(Money, default=0.0)
+    balance_due = db.Column(Money, default=0.0)
     
     # Status
     status = db.Column(db.String(20), default='draft')  # draft, sent, paid, overdue, cancelled
     payment_status = db.Column(db.String(20), default='unpaid')  # unpaid, partial, paid
+    status_before_overdue = db.Column(db.String(20), nullable=True)  # Restored by the overdue sweep
+    
+    # Accounting
+    journal_entry_id = db.Column(db.Integer, db.ForeignKey('journal_entries.id'), nullable=True, index=True)
     
     # Additional Information
     notes = db.Column(db.Text, nullable=True)
@@ -51,6 +57,12 @@ class Invoice(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Indexes
+    __table_args__ = (
+        db.Index('ix_invoices_date_status', 'invoice_date', 'status'),
+        db.Index('ix_invoices_status_due_date', 'status', 'due_date'),
+    )
+    
     # Relationships
     items = db.relationship('InvoiceItem', backref='invoice', lazy=True, cascade='all, delete-orphan')
     creator = db.relationship('User', foreign_keys=[created_by], backref='created_invoices', lazy=True)
@@ -111,6 +123,8 @@ class Invoice(db.Model):
             self.status = 'paid'
             self.payment_status = 'paid'
         elif self.is_overdue():
+            if self.status != 'overdue':
+                self.status_before_overdue = self.status
             self.status = 'overdue'
         elif self.paid_amount > 0:
             self.payment_status = 'partial'
@@ -135,6 +149,7 @@ class Invoice(db.Model):
             'balance_due': self.balance_due,
             'status': self.status,
             'payment_status': self.payment_status,
+            'journal_entry_id': self.journal_entry_id,
             'notes': self.notes,
             'terms_conditions': self.terms_conditions,
             'reference': self.reference,
@@ -143,8 +158,8 @@ class Invoice(db.Model):
             'created_by': self.created_by,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat(),
-            'is_overdue': self.is_overdue(),
-            'days_overdue': self.days_overdue()
+            'is_overdue': self.status == 'overdue',
+            'days_overdue': (datetime.now().date() - self.due_date).days if self.status == 'overdue' else 0
         }
         
         if include_items:
@@ -171,16 +186,16 @@ class InvoiceItem(db.Model):
     quantity = db.Column(db.Float, nullable=False)
     unit_price = db.Column(db.Float, nullable=False)
     discount_percentage = db.Column(db.Float, default=0.0)
-    discount_amount = db.Column(db.Float, default=0.0)
+    discount_amount = db.Column(Money, default=0.0)
     
     # Tax Information
     is_taxable = db.Column(db.Boolean, default=True)
     tax_rate = db.Column(db.Float, default=15.0)
-    tax_amount = db.Column(db.Float, default=0.0)
+    tax_amount = db.Column(Money, default=0.0)
     
     # Totals
-    subtotal = db.Column(db.Float, default=0.0)  # quantity * unit_price
-    total_amount = db.Column(db.Float, default=0.0)  # subtotal - discount + tax
+    subtotal = db.Column(Money, default=0.0)  # quantity * unit_price
+    total_amount = db.Column(Money, default=0.0)  # subtotal - discount + tax
     
     # Unit
     unit = db.Column(db.String(20), default='piece')
@@ -189,6 +204,9 @@ class InvoiceItem(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Indexes
+    __table_args__ = (db.Index('ix_invoice_items_invoice_tax', 'invoice_id', 'is_taxable', 'tax_rate'),)
+    
     def calculate_totals(self):
         """Calculate item totals"""
         self.subtotal = self.quantity * self.unit_price
@@ -234,3 +252,202 @@ class InvoiceItem(db.Model):
     
     def __repr__(self):
         return f'<InvoiceItem {self.item_name}>'
+
+
+class SalesDailyTotal(db.Model):
+    __tablename__ = 'sales_daily_totals'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    sale_date = db.Column(db.Date, nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=True)  # None = lines without a product
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=True)  # Product category at sale time
+    
+    # Issued invoice lines for the day, in base currency, maintained when invoices are issued
+    quantity = db.Column(db.Float, default=0.0)
+    net_amount = db.Column(Money, default=0.0)  # Line subtotal less line discount
+    tax_amount = db.Column(Money, default=0.0)
+    cost_amount = db.Column(Money, default=0.0)  # Quantity at the product cost price
+    line_count = db.Column(db.Integer, default=0)
+    
+    # Timestamps
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Indexes
+    __table_args__ = (
+        db.UniqueConstraint('sale_date', 'product_id', 'customer_id', name='unique_sales_day_product_customer'),
+        db.Index('ix_sales_daily_totals_product_date', 'product_id', 'sale_date'),
+        db.Index('ix_sales_daily_totals_customer_date', 'customer_id', 'sale_date'),
+        db.Index('ix_sales_daily_totals_category_date', 'category_id', 'sale_date'),
+    )
+    
+    def to_dict(self):
+        """Convert sales daily total object to dictionary"""
+        return {
+            'id': self.id,
+            'sale_date': self.sale_date.isoformat(),
+            'product_id': self.product_id,
+            'customer_id': self.customer_id,
+            'category_id': self.category_id,
+            'quantity': self.quantity,
+            'net_amount': self.net_amount,
+            'tax_amount': self.tax_amount,
+            'cost_amount': self.cost_amount,
+            'line_count': self.line_count,
+            'updated_at': self.updated_at.isoformat()
+        }
+    
+    def __repr__(self):
+        return f'<SalesDailyTotal {self.sale_date} P:{self.product_id} C:{self.customer_id}: {self.net_amount}>'
+
+
+class RecurringInvoice(db.Model):
+    __tablename__ = 'recurring_invoices'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=False)
+    
+    # Schedule: one invoice every interval_count frequency units from start_date
+    frequency = db.Column(db.String(20), default='monthly')  # weekly, monthly, quarterly, yearly
+    interval_count = db.Column(db.Integer, default=1)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=True)
+    next_run_date = db.Column(db.Date, nullable=False)
+    last_run_date = db.Column(db.Date, nullable=True)
+    periods_generated = db.Column(db.Integer, default=0)
+    
+    # Invoice settings
+    invoice_status = db.Column(db.String(20), default='sent')  # Status of generated invoices: draft or sent
+    payment_terms = db.Column(db.Integer, nullable=True)  # Days until due; None = the customer's terms
+    discount_percentage = db.Column(db.Float, default=0.0)
+    discount_amount = db.Column(Money, default=0.0)
+    currency = db.Column(db.String(3), nullable=True)
+    exchange_rate = db.Column(db.Float, default=1.0)
+    notes = db.Column(db.Text, nullable=True)
+    terms_conditions = db.Column(db.Text, nullable=True)
+    
+    # Status
+    status = db.Column(db.String(20), default='active')  # active, paused, completed
+    
+    # User Information
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    customer = db.relationship('Customer', lazy=True)
+    items = db.relationship('RecurringInvoiceItem', backref='recurring_invoice', lazy=True, cascade='all, delete-orphan')
+    
+    # Indexes
+    __table_args__ = (db.Index('ix_recurring_invoices_status_next_run', 'status', 'next_run_date'),)
+    
+    def to_dict(self, include_items=False):
+        """Convert recurring invoice object to dictionary"""
+        data = {
+            'id': self.id,
+            'name': self.name,
+            'customer_id': self.customer_id,
+            'customer_name': self.customer.name if self.customer else None,
+            'frequency': self.frequency,
+            'interval_count': self.interval_count,
+            'start_date': self.start_date.isoformat(),
+            'end_date': self.end_date.isoformat() if self.end_date else None,
+            'next_run_date': self.next_run_date.isoformat(),
+            'last_run_date': self.last_run_date.isoformat() if self.last_run_date else None,
+            'periods_generated': self.periods_generated,
+            'invoice_status': self.invoice_status,
+            'payment_terms': self.payment_terms,
+            'discount_percentage': self.discount_percentage,
+            'discount_amount': self.discount_amount,
+            'currency': self.currency,
+            'exchange_rate': self.exchange_rate,
+            'notes': self.notes,
+            'terms_conditions': self.terms_conditions,
+            'status': self.status,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
+        
+        if include_items:
+            data['items'] = [item.to_dict() for item in self.items]
+        
+        return data
+    
+    def __repr__(self):
+        return f'<RecurringInvoice {self.name}>'
+
+
+class RecurringInvoiceItem(db.Model):
+    __tablename__ = 'recurring_invoice_items'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    recurring_invoice_id = db.Column(db.Integer, db.ForeignKey('recurring_invoices.id'), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=True)
+    
+    # Item Details
+    item_name = db.Column(db.String(200), nullable=True)  # None = the product name
+    item_description = db.Column(db.Text, nullable=True)
+    unit = db.Column(db.String(20), nullable=True)
+    
+    # Quantity and Pricing; None takes the product's price and tax settings when invoiced
+    quantity = db.Column(db.Float, nullable=False)
+    unit_price = db.Column(db.Float, nullable=True)
+    discount_percentage = db.Column(db.Float, default=0.0)
+    discount_amount = db.Column(Money, default=0.0)
+    is_taxable = db.Column(db.Boolean, nullable=True)
+    tax_rate = db.Column(db.Float, nullable=True)
+    
+    def to_item(self):
+        """Get the item as create_invoices takes it"""
+        return {
+            'product_id': self.product_id,
+            'item_name': self.item_name,
+            'item_description': self.item_description,
+            'unit': self.unit,
+            'quantity': self.quantity,
+            'unit_price': self.unit_price,
+            'discount_percentage': self.discount_percentage,
+            'discount_amount': self.discount_amount,
+            'is_taxable': self.is_taxable,
+            'tax_rate': self.tax_rate
+        }
+    
+    def to_dict(self):
+        """Convert recurring invoice item object to dictionary"""
+        return dict(self.to_item(), id=self.id, recurring_invoice_id=self.recurring_invoice_id)
+    
+    def __repr__(self):
+        return f'<RecurringInvoiceItem {self.item_name or self.product_id}>'
+
+
+class RecurringInvoiceRun(db.Model):
+    __tablename__ = 'recurring_invoice_runs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    recurring_invoice_id = db.Column(db.Integer, db.ForeignKey('recurring_invoices.id'), nullable=False)
+    period_date = db.Column(db.Date, nullable=False)  # Scheduled date of the billed period
+    # Cleared when the invoice is archived or deleted; the run row still marks the period as billed
+    invoice_id = db.Column(db.Integer, db.ForeignKey('invoices.id', ondelete='SET NULL'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # One invoice per template and period, so reruns cannot bill a period twice
+    __table_args__ = (
+        db.UniqueConstraint('recurring_invoice_id', 'period_date', name='unique_recurring_invoice_period'),
+    )
+    
+    def to_dict(self):
+        """Convert recurring invoice run object to dictionary"""
+        return {
+            'id': self.id,
+            'recurring_invoice_id': self.recurring_invoice_id,
+            'period_date': self.period_date.isoformat(),
+            'invoice_id': self.invoice_id,
+            'created_at': self.created_at.isoformat()
+        }
+    
+    def __repr__(self):
+        return f'<RecurringInvoiceRun {self.recurring_invoice_id} {self.period_date}>'
@@ -0,0 +1,55 @@
+from sqlalchemy.types import TypeDecorator, BigInteger
+from sqlalchemy import type_coerce
+import operator
+from decimal import Decimal, ROUND_HALF_UP
+
+# Amounts are stored as integer minor units (halalas for SAR)
+MINOR_UNITS = 100
+
+def to_minor_units(amount):
+    """Convert a major-unit amount (float, Decimal, int or str) to integer minor units"""
+    if amount is None:
+        return None
+    if isinstance(amount, int):
+        return amount * MINOR_UNITS
+    return int((Decimal(str(amount)) * MINOR_UNITS).to_integral_value(rounding=ROUND_HALF_UP))
+
+def from_minor_units(minor):
+    """Convert integer minor units back to a major-unit amount"""
+    if minor is None:
+        return None
+    return minor / MINOR_UNITS
+
+def minor_units(column):
+    """Select a Money column or aggregate as raw integer minor units"""
+    return type_coerce(column, BigInteger)
+
+class Money(TypeDecorator):
+    """Monetary amount stored as BIGINT minor units, exposed as major units
+    
+    SQL sums and differences of Money columns stay exact integers; Python
+    code keeps working in major units (e.g. 115.5 SAR).
+    """
+    impl = BigInteger
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        return to_minor_units(value)
+    
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        # round() also covers SQLite columns that kept REAL affinity after the migration
+        return round(value) / MINOR_UNITS
+    
+    def coerce_compared_value(self, op, value):
+        return self
+    
+    class comparator_factory(BigInteger.Comparator):
+        def _adapt_expression(self, op, other_comparator):
+            # Money +/- Money and Money * quantity stay Money so results come back in major units
+            if op in (operator.add, operator.sub, operator.neg) or (
+                op is operator.mul and not isinstance(other_comparator.type, Money)
+            ):
+                return op, self.type
+            return super()._adapt_expression(op, other_comparator)
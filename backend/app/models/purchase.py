@@ -6,6 +6,8 @@ import os
 # Add the parent directory to the path to import app
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
+from app.models.money import Money
+
 db = SQLAlchemy()
 
 class Purchase(db.Model):
@@ -23,18 +25,22 @@ class Purchase(db.Model):
     delivery_date = db.Column(db.Date, nullable=True)
     
     # Financial Information
-    subtotal = db.Column(db.Float, default=0.0)
-    discount_amount = db.Column(db.Float, default=0.0)
+    subtotal = db.Column(Money, default=0.0)
+    discount_amount = db.Column(Money, default=0.0)
     discount_percentage = db.Column(db.Float, default=0.0)
-    tax_amount = db.Column(db.Float, default=0.0)
-    shipping_cost = db.Column(db.Float, default=0.0)
-    total_amount = db.Column(db.Float, default=0.0)
-    paid_amount = db.Column(db.Float, default=0.0)
-    balance_due = db.Column(db.Float, default=0.0)
+    tax_amount = db.Column(Money, default=0.0)
+    shipping_cost = db.Column(Money, default=0.0)
+    total_amount = db.Column(Money, default=0.0)
+    paid_amount = db.Column(Money, default=0.0)
+    balance_due = db.Column(Money, default=0.0)
     
     # Status
     status = db.Column(db.String(20), default='draft')  # draft, sent, received, completed, cancelled
     payment_status = db.Column(db.String(20), default='unpaid')  # unpaid, partial, paid
+    status_before_overdue = db.Column(db.String(20), nullable=True)  # Restored by the overdue sweep
+    
+    # Accounting
+    journal_entry_id = db.Column(db.Integer, db.ForeignKey('journal_entries.id'), nullable=True, index=True)
     
     # Additional Information
     notes = db.Column(db.Text, nullable=True)
@@ -61,6 +67,12 @@ class Purchase(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     approved_at = db.Column(db.DateTime, nullable=True)
     
+    # Indexes
+    __table_args__ = (
+        db.Index('ix_purchases_date_status', 'purchase_date', 'status'),
+        db.Index('ix_purchases_status_due_date', 'status', 'due_date'),
+    )
+    
     # Relationships
     items = db.relationship('PurchaseItem', backref='purchase', lazy=True, cascade='all, delete-orphan')
     creator = db.relationship('User', foreign_keys=[created_by], backref='created_purchases', lazy=True)
@@ -96,7 +108,7 @@ class Purchase(db.Model):
         # Update payment status
         if self.balance_due <= 0:
             self.payment_status = 'paid'
-            if self.status == 'received':
+            if self.status in ('received', 'overdue'):
                 self.status = 'completed'
         elif self.paid_amount > 0:
             self.payment_status = 'partial'
@@ -180,6 +192,7 @@ class Purchase(db.Model):
             'balance_due': self.balance_due,
             'status': self.status,
             'payment_status': self.payment_status,
+            'journal_entry_id': self.journal_entry_id,
             'notes': self.notes,
             'terms_conditions': self.terms_conditions,
             'reference': self.reference,
@@ -194,8 +207,8 @@ class Purchase(db.Model):
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat(),
             'approved_at': self.approved_at.isoformat() if self.approved_at else None,
-            'is_overdue': self.is_overdue(),
-            'days_overdue': self.days_overdue()
+            'is_overdue': self.status == 'overdue',
+            'days_overdue': (datetime.now().date() - self.due_date).days if self.status == 'overdue' else 0
         }
         
         if include_items:
@@ -223,16 +236,16 @@ class PurchaseItem(db.Model):
     received_quantity = db.Column(db.Float, default=0.0)
     unit_cost = db.Column(db.Float, nullable=False)
     discount_percentage = db.Column(db.Float, default=0.0)
-    discount_amount = db.Column(db.Float, default=0.0)
+    discount_amount = db.Column(Money, default=0.0)
     
     # Tax Information
     is_taxable = db.Column(db.Boolean, default=True)
     tax_rate = db.Column(db.Float, default=15.0)
-    tax_amount = db.Column(db.Float, default=0.0)
+    tax_amount = db.Column(Money, default=0.0)
     
     # Totals
-    subtotal = db.Column(db.Float, default=0.0)  # quantity * unit_cost
-    total_amount = db.Column(db.Float, default=0.0)  # subtotal - discount + tax
+    subtotal = db.Column(Money, default=0.0)  # quantity * unit_cost
+    total_amount = db.Column(Money, default=0.0)  # subtotal - discount + tax
     
     # Unit
     unit = db.Column(db.String(20), default='piece')
@@ -244,6 +257,9 @@ class PurchaseItem(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Indexes
+    __table_args__ = (db.Index('ix_purchase_items_purchase_tax', 'purchase_id', 'is_taxable', 'tax_rate'),)
+    
     def calculate_totals(self):
         """Calculate item totals"""
         self.subtotal = self.quantity * self.unit_cost
@@ -6,6 +6,8 @@ import os
 # Add the parent directory to the path to import app
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
+from app.models.money import Money
+
 db = SQLAlchemy()
 
 class Supplier(db.Model):
@@ -39,13 +41,13 @@ class Supplier(db.Model):
     industry = db.Column(db.String(100), nullable=True)
     
     # Financial Information
-    credit_limit = db.Column(db.Float, default=0.0)
-    current_balance = db.Column(db.Float, default=0.0)  # Positive = We owe supplier
+    credit_limit = db.Column(Money, default=0.0)
+    current_balance = db.Column(Money, default=0.0)  # Positive = We owe supplier
     payment_terms = db.Column(db.Integer, default=30)  # Days
     currency = db.Column(db.String(3), default='SAR')
     
     # Purchase Information
-    total_purchases = db.Column(db.Float, default=0.0)
+    total_purchases = db.Column(Money, default=0.0)
     last_purchase_date = db.Column(db.Date, nullable=True)
     discount_percentage = db.Column(db.Float, default=0.0)
     
@@ -86,72 +88,27 @@ class Supplier(db.Model):
         """Check if credit limit would be exceeded"""
         return (self.current_balance + amount) > self.credit_limit
     
-    def get_aging_analysis(self):
+    def get_aging_analysis(self, as_of_date=None):
         """Get supplier aging analysis"""
-        from app.models.purchase import Purchase
-        from sqlalchemy import and_
-        
-        today = datetime.now().date()
-        
-        # Get unpaid purchases
-        unpaid_purchases = Purchase.query.filter(
-            and_(
-                Purchase.supplier_id == self.id,
-                Purchase.status.in_(['pending', 'overdue']),
-                Purchase.balance_due > 0
-            )
-        ).all()
-        
-        aging = {
-            'current': 0,      # 0-30 days
-            'days_31_60': 0,   # 31-60 days
-            'days_61_90': 0,   # 61-90 days
-            'over_90': 0       # Over 90 days
+        from app.services.aging import get_aging_by_party
+        return get_aging_by_party('payable', [self.id], as_of_date)[self.id]
+    
+    def get_performance_metrics(self, start_date=None, end_date=None):
+        """Get supplier performance metrics (computed for all suppliers at once and cached)"""
+        from app.services.supplier_scorecard import get_scorecards
+        metrics = get_scorecards(start_date, end_date).get(self.id) or {
+            'total_orders': 0, 'total_amount': 0, 'average_order': 0, 'completed_orders': 0, 'cancelled_orders': 0,
+            'completion_rate': 0, 'delivered_orders': 0, 'on_time_rate': None, 'ordered_quantity': 0,
+            'received_quantity': 0, 'fill_rate': None
         }
-        
-        for purchase in unpaid_purchases:
-            days_overdue = (today - purchase.due_date).days
-            
-            if days_overdue <= 30:
-                aging['current'] += purchase.balance_due
-            elif days_overdue <= 60:
-                aging['days_31_60'] += purchase.balance_due
-            elif days_overdue <= 90:
-                aging['days_61_90'] += purchase.balance_due
-            else:
-                aging['over_90'] += purchase.balance_due
-        
-        return aging
+        return dict(metrics, rating=self.rating)
     
-    def get_performance_metrics(self):
-        """Get supplier performance metrics"""
-        from app.models.purchase import Purchase
-        from sqlalchemy import func
-        
-        # Get purchase statistics
-        stats = db.session.query(
-            func.count(Purchase.id).label('total_orders'),
-            func.sum(Purchase.total_amount).label('total_amount'),
-            func.avg(Purchase.total_amount).label('average_order'),
-            func.count(Purchase.id).filter(Purchase.status == 'completed').label('completed_orders'),
-            func.count(Purchase.id).filter(Purchase.status == 'cancelled').label('cancelled_orders')
-        ).filter(Purchase.supplier_id == self.id).first()
-        
-        completion_rate = 0
-        if stats.total_orders > 0:
-            completion_rate = (stats.completed_orders / stats.total_orders) * 100
+    def to_dict(self, include_aging=False, include_performance=False, aging=None, performance=None):
+        """Convert supplier object to dictionary
         
-        return {
-            'total_orders': stats.total_orders or 0,
-            'total_amount': stats.total_amount or 0,
-            'average_order': stats.average_order or 0,
-            'completion_rate': round(completion_rate, 2),
-            'cancelled_orders': stats.cancelled_orders or 0,
-            'rating': self.rating
-        }
-    
-    def to_dict(self, include_aging=False, include_performance=False):
-        """Convert supplier object to dictionary"""
+        When serializing many suppliers, pass aging from get_aging_by_party('payable', ids)
+        and performance from get_scorecards() instead of querying per supplier.
+        """
         data = {
             'id': self.id,
             'code': self.code,
@@ -191,10 +148,10 @@ class Supplier(db.Model):
         }
         
         if include_aging:
-            data['aging_analysis'] = self.get_aging_analysis()
+            data['aging_analysis'] = aging if aging is not None else self.get_aging_analysis()
         
         if include_performance:
-            data['performance_metrics'] = self.get_performance_metrics()
+            data['performance_metrics'] = dict(performance, rating=self.rating) if performance is not None else self.get_performance_metrics()
         
         return data
     
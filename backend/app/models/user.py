@@ -27,7 +27,7 @@ class User(db.Model):
     
     # Permissions
     permissions = db.Column(db.JSON, default={
-        'sales': {'read': True, 'write': True, 'delete': False},
+        'sales': {'read': True, 'write': True, 'delete': False, 'discount': False},
         'purchases': {'read': True, 'write': True, 'delete': False},
         'inventory': {'read': True, 'write': True, 'delete': False},
         'customers': {'read': True, 'write': True, 'delete': False},
@@ -88,7 +88,7 @@ class User(db.Model):
         """Get default permissions based on role"""
         if role == 'admin':
             return {
-                'sales': {'read': True, 'write': True, 'delete': True},
+                'sales': {'read': True, 'write': True, 'delete': True, 'discount': True},
                 'purchases': {'read': True, 'write': True, 'delete': True},
                 'inventory': {'read': True, 'write': True, 'delete': True},
                 'customers': {'read': True, 'write': True, 'delete': True},
@@ -99,7 +99,7 @@ class User(db.Model):
             }
         elif role == 'manager':
             return {
-                'sales': {'read': True, 'write': True, 'delete': True},
+                'sales': {'read': True, 'write': True, 'delete': True, 'discount': True},
                 'purchases': {'read': True, 'write': True, 'delete': True},
                 'inventory': {'read': True, 'write': True, 'delete': False},
                 'customers': {'read': True, 'write': True, 'delete': False},
@@ -110,7 +110,7 @@ class User(db.Model):
             }
         else:  # employee
             return {
-                'sales': {'read': True, 'write': True, 'delete': False},
+                'sales': {'read': True, 'write': True, 'delete': False, 'discount': False},
                 'purchases': {'read': True, 'write': True, 'delete': False},
                 'inventory': {'read': True, 'write': True, 'delete': False},
                 'customers': {'read': True, 'write': True, 'delete': False},
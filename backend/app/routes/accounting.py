@@ -0,0 +1,1589 @@
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import datetime
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import Account, FiscalPeriod, BankStatementLine, ExchangeRate, Budget, ArchivedFiscalYear, db
+from app.models.company import Company
+from app.models.user import User
+from app.services.account_balances import get_account_balances
+from app.services.account_paths import subtree_filter
+from app.services.trial_balance import generate_trial_balance
+from app.services.journal_posting import post_journal_batch
+from app.services.posting_rules import post_documents
+from app.services.ledger_index import get_range_balances
+from app.services.payment_import import parse_csv, parse_mt940, import_payments
+from app.services.bank_reconciliation import import_statement_lines, reconcile_statement, unmatch_statement_line
+from app.services.fx_revaluation import save_rates, revalue_open_items
+from app.services.vat_return import get_quarter_dates, generate_vat_return, iter_vat_audit_rows, VAT_AUDIT_COLUMNS
+from app.services.cash_forecast import generate_cash_forecast
+from app.services.aging import generate_aging_report
+from app.services.supplier_scorecard import generate_supplier_leaderboard
+from app.services.sales_analytics import get_top_products, get_sales_by_category_month, get_customer_trends
+from app.services.sales_cube import rebuild_sales_cube
+from app.services.budgets import save_budgets, generate_budget_vs_actual
+from app.services.archive import archive_fiscal_year
+from app.services.general_ledger import get_ledger_page, iter_ledger_rows, iter_ndjson, iter_csv
+from app.services.financial_statements import generate_income_statement, generate_balance_sheet, BASES
+from app.services.period_close import (
+    generate_fiscal_periods, get_fiscal_year_for_date, close_period, close_periods_through, reopen_period
+)
+
+accounting_bp = Blueprint('accounting', __name__, url_prefix='/api/accounting')
+
+def parse_date(value):
+    """Parse an ISO date query parameter"""
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+@accounting_bp.route('/accounts', methods=['GET'])
+@jwt_required()
+def get_accounts():
+    """Get chart of accounts with balances"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('accounting', 'read'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        as_of_date = parse_date(request.args.get('as_of_date'))
+        include_balance = request.args.get('include_balance', 'true').lower() == 'true'
+        parent_code = request.args.get('parent_code')
+        account_type = request.args.get('account_type')
+        
+        query = Account.query.filter_by(is_active=True)
+        
+        # Subtree filter on the materialized path, e.g. parent_code=1000 for all asset accounts
+        if parent_code:
+            query = query.filter(subtree_filter(parent_code))
+        if account_type:
+            query = query.filter(Account.account_type == account_type)
+        
+        accounts = query.order_by(Account.full_code).all()
+        
+        # One grouped query for the whole chart instead of one per account
+        balances = get_account_balances(as_of_date=as_of_date) if include_balance else {}
+        
+        return jsonify({
+            'success': True,
+            'data': [
+                account.to_dict(
+                    include_balance=include_balance,
+                    balance=balances.get(account.id, account.opening_balance or 0)
+                )
+                for account in accounts
+            ]
+        }), 200
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'Invalid date: {str(e)}'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to get accounts: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/trial-balance', methods=['GET'])
+@jwt_required()
+def get_trial_balance():
+    """Get hierarchical trial balance for a date range"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('accounting', 'read'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        start_date = parse_date(request.args.get('start_date'))
+        end_date = parse_date(request.args.get('end_date')) or datetime.now().date()
+        max_level = request.args.get('max_level', type=int)
+        include_zero = request.args.get('include_zero', 'false').lower() == 'true'
+        
+        if start_date is None:
+            start_date = end_date.replace(month=1, day=1)
+        
+        if start_date > end_date:
+            return jsonify({
+                'success': False,
+                'message': 'start_date must be before end_date'
+            }), 400
+        
+        trial_balance = generate_trial_balance(start_date, end_date, max_level, include_zero)
+        
+        return jsonify({
+            'success': True,
+            'data': trial_balance
+        }), 200
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'Invalid date: {str(e)}'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to get trial balance: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/journal-entries/batch', methods=['POST'])
+@jwt_required()
+def post_journal_entries_batch():
+    """Create and post a batch of journal entries in one transaction"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('accounting', 'write'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        data = request.get_json()
+        
+        if not data or not data.get('entries'):
+            return jsonify({
+                'success': False,
+                'message': 'entries are required'
+            }), 400
+        
+        entries_data = []
+        for entry in data['entries']:
+            entries_data.append({
+                'entry_date': parse_date(entry.get('entry_date')) or datetime.now().date(),
+                'description': entry.get('description') or 'Batch posting',
+                'reference_type': entry.get('reference_type'),
+                'reference_id': entry.get('reference_id'),
+                'reference_number': entry.get('reference_number'),
+                'status': entry.get('status', 'draft'),
+                'lines': [
+                    {
+                        'account_id': line['account_id'],
+                        'description': line.get('description'),
+                        'debit_amount': float(line.get('debit_amount') or 0),
+                        'credit_amount': float(line.get('credit_amount') or 0),
+                        'reference': line.get('reference')
+                    }
+                    for line in entry.get('lines', [])
+                ]
+            })
+        
+        entry_ids = post_journal_batch(entries_data, current_user_id)
+        
+        return jsonify({
+            'success': True,
+            'message': f'{len(entry_ids)} journal entries posted successfully',
+            'data': {
+                'journal_entry_ids': entry_ids
+            }
+        }), 201
+    
+    except (ValueError, KeyError) as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Invalid journal entries: {str(e)}'
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Failed to post journal entries: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/fiscal-periods', methods=['GET'])
+@jwt_required()
+def get_fiscal_periods():
+    """Get fiscal periods"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('accounting', 'read'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        query = FiscalPeriod.query
+        
+        fiscal_year = request.args.get('fiscal_year', type=int)
+        if fiscal_year:
+            query = query.filter(FiscalPeriod.fiscal_year == fiscal_year)
+        
+        periods = query.order_by(FiscalPeriod.start_date).all()
+        
+        return jsonify({
+            'success': True,
+            'data': [period.to_dict() for period in periods]
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to get fiscal periods: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/fiscal-periods/generate', methods=['POST'])
+@jwt_required()
+def create_fiscal_periods():
+    """Generate the monthly periods of a fiscal year"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('accounting', 'write'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        data = request.get_json() or {}
+        company = Company.query.get(data['company_id']) if data.get('company_id') else Company.query.first()
+        fiscal_year = data.get('fiscal_year') or get_fiscal_year_for_date(company, datetime.now().date())
+        
+        periods = generate_fiscal_periods(company, int(fiscal_year))
+        
+        return jsonify({
+            'success': True,
+            'message': 'Fiscal periods generated successfully',
+            'data': [period.to_dict() for period in periods]
+        }), 201
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Failed to generate fiscal periods: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/fiscal-periods/<int:period_id>/close', methods=['POST'])
+@jwt_required()
+def close_fiscal_period(period_id):
+    """Close a fiscal period and snapshot account balances"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('accounting', 'write'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        period = FiscalPeriod.query.get(period_id)
+        
+        if not period:
+            return jsonify({
+                'success': False,
+                'message': 'Fiscal period not found'
+            }), 404
+        
+        close_period(period, current_user_id)
+        
+        return jsonify({
+            'success': True,
+            'message': 'Fiscal period closed successfully',
+            'data': period.to_dict()
+        }), 200
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Failed to close fiscal period: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/fiscal-periods/close-through', methods=['POST'])
+@jwt_required()
+def close_fiscal_periods_through():
+    """Close every open period ending on or before a date (period-close job)"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('accounting', 'write'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        data = request.get_json() or {}
+        as_of_date = parse_date(data.get('as_of_date')) or datetime.now().date()
+        
+        periods = close_periods_through(as_of_date, current_user_id)
+        
+        return jsonify({
+            'success': True,
+            'message': f'{len(periods)} fiscal periods closed successfully',
+            'data': [period.to_dict() for period in periods]
+        }), 200
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Failed to close fiscal periods: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/fiscal-periods/<int:period_id>/reopen', methods=['POST'])
+@jwt_required()
+def reopen_fiscal_period(period_id):
+    """Reopen a fiscal period and every later closed period"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('accounting', 'delete'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        period = FiscalPeriod.query.get(period_id)
+        
+        if not period:
+            return jsonify({
+                'success': False,
+                'message': 'Fiscal period not found'
+            }), 404
+        
+        periods = reopen_period(period)
+        
+        return jsonify({
+            'success': True,
+            'message': f'{len(periods)} fiscal periods reopened successfully',
+            'data': [reopened.to_dict() for reopened in periods]
+        }), 200
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Failed to reopen fiscal period: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/fiscal-years/<int:fiscal_year>/archive', methods=['POST'])
+@jwt_required()
+def archive_closed_fiscal_year(fiscal_year):
+    """Move a closed fiscal year's history to its archive database"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('accounting', 'delete'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        data = request.get_json(silent=True) or {}
+        archived = archive_fiscal_year(
+            fiscal_year, archived_by_user_id=current_user_id, chunk_size=int(data.get('chunk_size', 5000))
+        )
+        
+        return jsonify({
+            'success': True,
+            'message': f'Fiscal year {fiscal_year} archived successfully',
+            'data': archived
+        }), 200
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Failed to archive fiscal year: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/archived-fiscal-years', methods=['GET'])
+@jwt_required()
+def get_archived_fiscal_years():
+    """Get archived fiscal years with their row counts"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('accounting', 'read'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        archived = ArchivedFiscalYear.query.order_by(ArchivedFiscalYear.fiscal_year).all()
+        
+        return jsonify({
+            'success': True,
+            'data': [year.to_dict() for year in archived]
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to get archived fiscal years: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/range-balances', methods=['GET'])
+@jwt_required()
+def get_account_range_balances():
+    """Get opening, movement and closing balances for accounts over a date range"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('accounting', 'read'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        account_ids = [int(account_id) for account_id in request.args.get('account_ids', '').split(',') if account_id]
+        start_date = parse_date(request.args.get('start_date'))
+        end_date = parse_date(request.args.get('end_date')) or datetime.now().date()
+        
+        if not account_ids or start_date is None:
+            return jsonify({
+                'success': False,
+                'message': 'account_ids and start_date are required'
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'data': get_range_balances(account_ids, start_date, end_date)
+        }), 200
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'Invalid parameters: {str(e)}'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to get range balances: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/income-statement', methods=['GET'])
+@jwt_required()
+def get_income_statement():
+    """Get income statement for a period with comparative column"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('reports', 'read'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        end_date = parse_date(request.args.get('end_date')) or datetime.now().date()
+        start_date = parse_date(request.args.get('start_date')) or end_date.replace(month=1, day=1)
+        basis = request.args.get('basis', 'previous_period')
+        
+        if basis not in BASES or start_date > end_date:
+            return jsonify({
+                'success': False,
+                'message': 'Invalid period or basis'
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'data': generate_income_statement(start_date, end_date, basis)
+        }), 200
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'Invalid date: {str(e)}'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to get income statement: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/balance-sheet', methods=['GET'])
+@jwt_required()
+def get_balance_sheet():
+    """Get balance sheet as of a date with comparative column"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('reports', 'read'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        as_of_date = parse_date(request.args.get('as_of_date')) or datetime.now().date()
+        basis = request.args.get('basis', 'previous_period')
+        
+        if basis not in BASES:
+            return jsonify({
+                'success': False,
+                'message': 'Invalid basis'
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'data': generate_balance_sheet(as_of_date, basis)
+        }), 200
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'Invalid date: {str(e)}'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to get balance sheet: {str(e)}'
+        }), 500
+
+def parse_ledger_args():
+    """Parse the date range and account filter shared by ledger endpoints"""
+    end_date = parse_date(request.args.get('end_date')) or datetime.now().date()
+    start_date = parse_date(request.args.get('start_date')) or end_date.replace(month=1, day=1)
+    account_ids = [int(account_id) for account_id in request.args.get('account_ids', '').split(',') if account_id]
+    return start_date, end_date, account_ids or None
+
+@accounting_bp.route('/ledger', methods=['GET'])
+@jwt_required()
+def get_ledger():
+    """Get general ledger lines with cursor pagination"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('accounting', 'read'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        start_date, end_date, account_ids = parse_ledger_args()
+        cursor = request.args.get('cursor')
+        limit = min(request.args.get('limit', 100, type=int), 1000)
+        
+        return jsonify({
+            'success': True,
+            'data': get_ledger_page(start_date, end_date, account_ids, cursor, limit)
+        }), 200
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'Invalid parameters: {str(e)}'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to get ledger: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/ledger/export', methods=['GET'])
+@jwt_required()
+def export_ledger():
+    """Stream the general ledger as NDJSON or CSV"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('accounting', 'read'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        start_date, end_date, account_ids = parse_ledger_args()
+        export_format = request.args.get('format', 'ndjson')
+        
+        if export_format not in ('ndjson', 'csv'):
+            return jsonify({
+                'success': False,
+                'message': 'format must be ndjson or csv'
+            }), 400
+        
+        rows = iter_ledger_rows(start_date, end_date, account_ids)
+        filename = f"general-ledger-{start_date.isoformat()}-{end_date.isoformat()}.{export_format}"
+        
+        if export_format == 'csv':
+            body, mimetype = iter_csv(rows), 'text/csv'
+        else:
+            body, mimetype = iter_ndjson(rows), 'application/x-ndjson'
+        
+        return Response(
+            stream_with_context(body),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'Invalid parameters: {str(e)}'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to export ledger: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/payments/import', methods=['POST'])
+@jwt_required()
+def import_payment_file():
+    """Import a CSV or MT940 bank statement as payments and post them in one batch"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('accounting', 'write'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        uploaded = request.files.get('file')
+        
+        if not uploaded:
+            return jsonify({
+                'success': False,
+                'message': 'file is required'
+            }), 400
+        
+        file_format = request.form.get('format') or ('mt940' if uploaded.filename.lower().endswith(('.sta', '.mt940')) else 'csv')
+        bank_account_id = request.form.get('bank_account_id', type=int)
+        post = request.form.get('post', 'true').lower() == 'true'
+        
+        content = uploaded.read().decode('utf-8-sig')
+        records = parse_mt940(content) if file_format == 'mt940' else parse_csv(content)
+        
+        result = import_payments(records, bank_account_id, current_user_id, post)
+        
+        return jsonify({
+            'success': True,
+            'message': f"{result['imported']} payments imported successfully",
+            'data': result
+        }), 201
+    
+    except (ValueError, KeyError) as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Invalid payment file: {str(e)}'
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Failed to import payments: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/bank-reconciliation/statement-lines', methods=['GET'])
+@jwt_required()
+def get_statement_lines():
+    """Get bank statement lines"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('accounting', 'read'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 50, type=int)
+        bank_account_id = request.args.get('bank_account_id', type=int)
+        status = request.args.get('status')
+        start_date = parse_date(request.args.get('start_date'))
+        end_date = parse_date(request.args.get('end_date'))
+        
+        query = BankStatementLine.query
+        
+        if bank_account_id:
+            query = query.filter(BankStatementLine.bank_account_id == bank_account_id)
+        if status:
+            query = query.filter(BankStatementLine.status == status)
+        if start_date:
+            query = query.filter(BankStatementLine.statement_date >= start_date)
+        if end_date:
+            query = query.filter(BankStatementLine.statement_date <= end_date)
+        
+        lines = query.order_by(BankStatementLine.statement_date, BankStatementLine.id).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'statement_lines': [line.to_dict() for line in lines.items],
+                'total': lines.total,
+                'pages': lines.pages,
+                'current_page': page,
+                'per_page': per_page
+            }
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to get statement lines: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/bank-reconciliation/statement-lines', methods=['POST'])
+@jwt_required()
+def upload_statement_lines():
+    """Load a CSV or MT940 bank statement for reconciliation"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('accounting', 'write'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        uploaded = request.files.get('file')
+        
+        if not uploaded:
+            return jsonify({
+                'success': False,
+                'message': 'file is required'
+            }), 400
+        
+        file_format = request.form.get('format') or ('mt940' if uploaded.filename.lower().endswith(('.sta', '.mt940')) else 'csv')
+        bank_account_id = request.form.get('bank_account_id', type=int)
+        
+        content = uploaded.read().decode('utf-8-sig')
+        records = parse_mt940(content) if file_format == 'mt940' else parse_csv(content)
+        
+        count = import_statement_lines(records, bank_account_id)
+        
+        return jsonify({
+            'success': True,
+            'message': f'{count} statement lines loaded successfully',
+            'data': {'loaded': count}
+        }), 201
+    
+    except (ValueError, KeyError) as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Invalid statement file: {str(e)}'
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Failed to load statement lines: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/bank-reconciliation/reconcile', methods=['POST'])
+@jwt_required()
+def run_bank_reconciliation():
+    """Match unmatched statement lines against posted payments"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('accounting', 'write'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        data = request.get_json() or {}
+        start_date = parse_date(data.get('start_date'))
+        end_date = parse_date(data.get('end_date'))
+        
+        if not start_date or not end_date:
+            return jsonify({
+                'success': False,
+                'message': 'start_date and end_date are required'
+            }), 400
+        
+        result = reconcile_statement(
+            data.get('bank_account_id'),
+            start_date,
+            end_date,
+            current_user_id,
+            tolerance_days=int(data.get('date_tolerance_days', 3)),
+            match_groups=bool(data.get('match_groups', True))
+        )
+        
+        return jsonify({
+            'success': True,
+            'message': f"{result['matched']} of {result['lines']} statement lines matched",
+            'data': result
+        }), 200
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Failed to reconcile statement: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/bank-reconciliation/statement-lines/<int:line_id>/unmatch', methods=['POST'])
+@jwt_required()
+def unmatch_bank_statement_line(line_id):
+    """Undo the match of a statement line"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('accounting', 'write'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        line = BankStatementLine.query.get(line_id)
+        
+        if not line:
+            return jsonify({
+                'success': False,
+                'message': 'Statement line not found'
+            }), 404
+        
+        unmatch_statement_line(line)
+        
+        return jsonify({
+            'success': True,
+            'message': 'Statement line unmatched successfully',
+            'data': line.to_dict()
+        }), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Failed to unmatch statement line: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/post-documents', methods=['POST'])
+@jwt_required()
+def post_document_journals():
+    """Generate and post journal entries for unposted invoices and purchases"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('accounting', 'write'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        data = request.get_json() or {}
+        start_date = parse_date(data.get('start_date')) or datetime.now().date()
+        end_date = parse_date(data.get('end_date')) or start_date
+        document_types = data.get('document_types') or ['invoice', 'purchase']
+        
+        invalid_types = [document_type for document_type in document_types if document_type not in ('invoice', 'purchase')]
+        if invalid_types:
+            return jsonify({
+                'success': False,
+                'message': f"Unsupported document types: {', '.join(invalid_types)}"
+            }), 400
+        
+        result = post_documents(
+            start_date,
+            end_date,
+            current_user_id,
+            document_types=document_types,
+            summarize=data.get('mode', 'summary') == 'summary'
+        )
+        
+        return jsonify({
+            'success': True,
+            'message': f"{result['entries']} journal entries posted successfully",
+            'data': result
+        }), 201
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Failed to post documents: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/exchange-rates', methods=['GET'])
+@jwt_required()
+def get_exchange_rates():
+    """Get exchange rates"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('accounting', 'read'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        currency = request.args.get('currency')
+        start_date = parse_date(request.args.get('start_date'))
+        end_date = parse_date(request.args.get('end_date'))
+        
+        query = ExchangeRate.query
+        
+        if currency:
+            query = query.filter(ExchangeRate.currency == currency.upper())
+        if start_date:
+            query = query.filter(ExchangeRate.rate_date >= start_date)
+        if end_date:
+            query = query.filter(ExchangeRate.rate_date <= end_date)
+        
+        rates = query.order_by(ExchangeRate.currency, ExchangeRate.rate_date.desc()).all()
+        
+        return jsonify({
+            'success': True,
+            'data': [rate.to_dict() for rate in rates]
+        }), 200
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'Invalid date: {str(e)}'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to get exchange rates: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/exchange-rates', methods=['POST'])
+@jwt_required()
+def save_exchange_rates():
+    """Create or update exchange rates in bulk"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('accounting', 'write'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        data = request.get_json() or {}
+        rates = data.get('rates') or []
+        
+        if not rates:
+            return jsonify({
+                'success': False,
+                'message': 'rates are required'
+            }), 400
+        
+        parsed_rates = []
+        for rate in rates:
+            if not rate.get('currency') or not rate.get('rate_date') or not rate.get('rate'):
+                return jsonify({
+                    'success': False,
+                    'message': 'Each rate needs currency, rate_date and rate'
+                }), 400
+            parsed_rates.append({
+                'currency': rate['currency'].upper(),
+                'rate_date': parse_date(rate['rate_date']),
+                'rate': float(rate['rate'])
+            })
+        
+        count = save_rates(parsed_rates, data.get('source'))
+        
+        return jsonify({
+            'success': True,
+            'message': f'{count} exchange rates saved successfully'
+        }), 201
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'Invalid rate: {str(e)}'
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Failed to save exchange rates: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/fx-revaluation', methods=['POST'])
+@jwt_required()
+def run_fx_revaluation():
+    """Revalue open foreign-currency receivables and payables (month-end job)"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('accounting', 'write'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        data = request.get_json() or {}
+        as_of_date = parse_date(data.get('as_of_date')) or datetime.now().date()
+        post = bool(data.get('post', True))
+        
+        result = revalue_open_items(as_of_date, current_user_id, post=post)
+        
+        return jsonify({
+            'success': True,
+            'message': 'Foreign currency revaluation posted successfully' if result['journal_entry_ids'] else 'Foreign currency revaluation calculated',
+            'data': result
+        }), 200
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Failed to revalue foreign currency balances: {str(e)}'
+        }), 500
+
+def parse_vat_period_args():
+    """Read the VAT period from start_date/end_date or year/quarter query arguments"""
+    if request.args.get('quarter'):
+        year = request.args.get('year', type=int) or datetime.now().year
+        return get_quarter_dates(year, int(request.args['quarter']))
+    
+    start_date = parse_date(request.args.get('start_date'))
+    end_date = parse_date(request.args.get('end_date'))
+    if not start_date or not end_date:
+        raise ValueError('start_date and end_date, or year and quarter, are required')
+    if start_date > end_date:
+        raise ValueError('start_date must be on or before end_date')
+    return start_date, end_date
+
+@accounting_bp.route('/vat-return', methods=['GET'])
+@jwt_required()
+def get_vat_return():
+    """Get the VAT return for a period"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('accounting', 'read'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        start_date, end_date = parse_vat_period_args()
+        
+        return jsonify({
+            'success': True,
+            'data': generate_vat_return(start_date, end_date)
+        }), 200
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'Invalid parameters: {str(e)}'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to generate VAT return: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/vat-return/audit', methods=['GET'])
+@jwt_required()
+def export_vat_audit():
+    """Stream the line-level VAT audit file as NDJSON or CSV"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('accounting', 'read'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        start_date, end_date = parse_vat_period_args()
+        export_format = request.args.get('format', 'csv')
+        
+        if export_format not in ('ndjson', 'csv'):
+            return jsonify({
+                'success': False,
+                'message': 'format must be ndjson or csv'
+            }), 400
+        
+        rows = iter_vat_audit_rows(start_date, end_date)
+        filename = f"vat-audit-{start_date.isoformat()}-{end_date.isoformat()}.{export_format}"
+        
+        if export_format == 'csv':
+            body, mimetype = iter_csv(rows, columns=VAT_AUDIT_COLUMNS), 'text/csv'
+        else:
+            body, mimetype = iter_ndjson(rows), 'application/x-ndjson'
+        
+        return Response(
+            stream_with_context(body),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'Invalid parameters: {str(e)}'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to export VAT audit file: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/cash-forecast', methods=['GET'])
+@jwt_required()
+def get_cash_forecast():
+    """Get the weekly cash forecast from open receivables and payables"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('accounting', 'read'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        as_of_date = parse_date(request.args.get('as_of_date')) or datetime.now().date()
+        weeks = request.args.get('weeks', 13, type=int)
+        use_payment_history = request.args.get('use_payment_history', 'true').lower() == 'true'
+        
+        if weeks < 1 or weeks > 104:
+            return jsonify({
+                'success': False,
+                'message': 'weeks must be between 1 and 104'
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'data': generate_cash_forecast(as_of_date, weeks, use_payment_history)
+        }), 200
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'Invalid parameters: {str(e)}'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to generate cash forecast: {str(e)}'
+        }), 500
+
+def aging_report_response(side):
+    """Build an aging report response from the common query parameters"""
+    report = generate_aging_report(
+        side,
+        as_of_date=parse_date(request.args.get('as_of_date')),
+        bucket=request.args.get('bucket'),
+        sort_by=request.args.get('sort_by', 'total'),
+        descending=request.args.get('order', 'desc').lower() != 'asc',
+        page=max(request.args.get('page', 1, type=int), 1),
+        per_page=min(max(request.args.get('per_page', 100, type=int), 1), 1000)
+    )
+    
+    return jsonify({
+        'success': True,
+        'data': report
+    }), 200
+
+@accounting_bp.route('/receivables-aging', methods=['GET'])
+@jwt_required()
+def get_receivables_aging():
+    """Get every customer's open balance by aging bucket"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('reports', 'read'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        return aging_report_response('receivable')
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'Invalid parameters: {str(e)}'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to generate receivables aging: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/payables-aging', methods=['GET'])
+@jwt_required()
+def get_payables_aging():
+    """Get every supplier's open balance by aging bucket"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('reports', 'read'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        return aging_report_response('payable')
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'Invalid parameters: {str(e)}'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to generate payables aging: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/supplier-scorecard', methods=['GET'])
+@jwt_required()
+def get_supplier_scorecard():
+    """Rank suppliers by order volume, completion, on-time delivery and fill rate"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('reports', 'read'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        start_date = parse_date(request.args.get('start_date'))
+        end_date = parse_date(request.args.get('end_date'))
+        if start_date and end_date and start_date > end_date:
+            return jsonify({
+                'success': False,
+                'message': 'start_date must be before end_date'
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'data': generate_supplier_leaderboard(
+                start_date,
+                end_date,
+                sort_by=request.args.get('sort_by', 'total_amount'),
+                descending=request.args.get('order', 'desc').lower() != 'asc',
+                limit=request.args.get('limit', type=int)
+            )
+        }), 200
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'Invalid parameters: {str(e)}'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to generate supplier scorecard: {str(e)}'
+        }), 500
+
+def sales_analytics_response(report, description):
+    """Run a sales cube report over the start_date/end_date query arguments"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('reports', 'read'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        start_date = parse_date(request.args.get('start_date'))
+        end_date = parse_date(request.args.get('end_date'))
+        if start_date and end_date and start_date > end_date:
+            return jsonify({
+                'success': False,
+                'message': 'start_date must be before end_date'
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'data': report(start_date, end_date)
+        }), 200
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'Invalid parameters: {str(e)}'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to generate {description}: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/sales-analytics/top-products', methods=['GET'])
+@jwt_required()
+def get_top_products_report():
+    """Rank products by net sales, quantity or gross profit"""
+    return sales_analytics_response(
+        lambda start_date, end_date: get_top_products(
+            start_date,
+            end_date,
+            rank_by=request.args.get('rank_by', 'net_amount'),
+            limit=request.args.get('limit', 10, type=int)
+        ),
+        'top products'
+    )
+
+@accounting_bp.route('/sales-analytics/categories', methods=['GET'])
+@jwt_required()
+def get_category_sales_report():
+    """Get sales per product category per month"""
+    return sales_analytics_response(get_sales_by_category_month, 'category sales')
+
+@accounting_bp.route('/sales-analytics/customer-trends', methods=['GET'])
+@jwt_required()
+def get_customer_trends_report():
+    """Get monthly sales per customer for the given or top customers"""
+    customer_ids = request.args.getlist('customer_id', type=int) or None
+    return sales_analytics_response(
+        lambda start_date, end_date: get_customer_trends(
+            start_date,
+            end_date,
+            customer_ids=customer_ids,
+            limit=request.args.get('limit', 10, type=int)
+        ),
+        'customer trends'
+    )
+
+@accounting_bp.route('/sales-analytics/rebuild', methods=['POST'])
+@jwt_required()
+def rebuild_sales_analytics():
+    """Recompute the sales cube from invoices, for all dates or a date range"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('reports', 'write'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        data = request.get_json() or {}
+        start_date = parse_date(data.get('start_date'))
+        end_date = parse_date(data.get('end_date'))
+        if start_date and end_date and start_date > end_date:
+            return jsonify({
+                'success': False,
+                'message': 'start_date must be before end_date'
+            }), 400
+        
+        chunks = rebuild_sales_cube(start_date, end_date, chunk_days=int(data.get('chunk_days', 31)))
+        
+        return jsonify({
+            'success': True,
+            'message': 'Sales analytics rebuilt successfully',
+            'data': {'chunks': chunks}
+        }), 200
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'Invalid parameters: {str(e)}'
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Failed to rebuild sales analytics: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/budgets', methods=['GET'])
+@jwt_required()
+def get_budgets():
+    """Get budgets for a year"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('accounting', 'read'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        year = request.args.get('year', datetime.now().year, type=int)
+        account_id = request.args.get('account_id', type=int)
+        cost_center = request.args.get('cost_center', '')
+        
+        query = Budget.query.filter(Budget.year == year, Budget.cost_center == cost_center)
+        
+        if account_id:
+            query = query.filter(Budget.account_id == account_id)
+        
+        budgets = query.order_by(Budget.account_id, Budget.month).all()
+        
+        return jsonify({
+            'success': True,
+            'data': [budget.to_dict() for budget in budgets]
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to get budgets: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/budgets', methods=['POST'])
+@jwt_required()
+def save_account_budgets():
+    """Create or update monthly budgets in bulk"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('accounting', 'write'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        data = request.get_json() or {}
+        budgets = data.get('budgets') or []
+        
+        if not budgets:
+            return jsonify({
+                'success': False,
+                'message': 'budgets are required'
+            }), 400
+        
+        parsed_budgets = []
+        for budget in budgets:
+            if not budget.get('account_id') or not budget.get('month') or budget.get('amount') is None:
+                return jsonify({
+                    'success': False,
+                    'message': 'Each budget needs account_id, month and amount'
+                }), 400
+            parsed_budgets.append({
+                'account_id': int(budget['account_id']),
+                'year': int(budget.get('year') or data.get('year') or datetime.now().year),
+                'month': int(budget['month']),
+                'amount': float(budget['amount']),
+                'notes': budget.get('notes')
+            })
+        
+        count = save_budgets(parsed_budgets, current_user_id, data.get('cost_center') or '')
+        
+        return jsonify({
+            'success': True,
+            'message': f'{count} budgets saved successfully'
+        }), 201
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'Invalid budget: {str(e)}'
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Failed to save budgets: {str(e)}'
+        }), 500
+
+@accounting_bp.route('/budget-vs-actual', methods=['GET'])
+@jwt_required()
+def get_budget_vs_actual():
+    """Get budget vs actual with variances per account and month"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('accounting', 'read'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        year = request.args.get('year', datetime.now().year, type=int)
+        start_month = request.args.get('start_month', 1, type=int)
+        end_month = request.args.get('end_month', 12, type=int)
+        account_type = request.args.get('account_type')
+        cost_center = request.args.get('cost_center', '')
+        
+        return jsonify({
+            'success': True,
+            'data': generate_budget_vs_actual(year, start_month, end_month, account_type, cost_center)
+        }), 200
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'Invalid parameters: {str(e)}'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to generate budget vs actual: {str(e)}'
+        }), 500
@@ -0,0 +1,131 @@
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import datetime
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.user import User
+from app.services.invoice_pdf import get_document_pdf, iter_document_pdfs, iter_zip, find_document_ids
+
+documents_bp = Blueprint('documents', __name__, url_prefix='/api/documents')
+
+# Document kinds by URL segment: (kind, permission module)
+DOCUMENT_ROUTES = {
+    'invoices': ('invoice', 'sales'),
+    'receipts': ('receipt', 'accounting')
+}
+
+def parse_date(value):
+    """Parse an ISO date parameter"""
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+@documents_bp.route('/<string:documents>/<int:document_id>/pdf', methods=['GET'])
+@jwt_required()
+def download_document_pdf(documents, document_id):
+    """Download an invoice or receipt as PDF, rendered once per version and cached"""
+    try:
+        if documents not in DOCUMENT_ROUTES:
+            return jsonify({
+                'success': False,
+                'message': 'Document type not found'
+            }), 404
+        kind, module = DOCUMENT_ROUTES[documents]
+        
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission(module, 'read'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        pdf = get_document_pdf(kind, document_id)
+        if pdf is None:
+            return jsonify({
+                'success': False,
+                'message': f'{kind.capitalize()} not found'
+            }), 404
+        
+        filename, data = pdf
+        disposition = 'attachment' if request.args.get('download', 'true').lower() == 'true' else 'inline'
+        return Response(
+            data,
+            mimetype='application/pdf',
+            headers={'Content-Disposition': f'{disposition}; filename={filename}'}
+        )
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to generate PDF: {str(e)}'
+        }), 500
+
+@documents_bp.route('/<string:documents>/pdf', methods=['POST'])
+@jwt_required()
+def export_document_pdfs(documents):
+    """Stream a ZIP of invoice or receipt PDFs, by ids or by date range and customer"""
+    try:
+        if documents not in DOCUMENT_ROUTES:
+            return jsonify({
+                'success': False,
+                'message': 'Document type not found'
+            }), 404
+        kind, module = DOCUMENT_ROUTES[documents]
+        
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission(module, 'read'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        data = request.get_json() or {}
+        document_ids = data.get('ids')
+        if document_ids is not None:
+            document_ids = [int(document_id) for document_id in document_ids]
+        else:
+            start_date = parse_date(data.get('start_date'))
+            end_date = parse_date(data.get('end_date'))
+            if not start_date or not end_date:
+                return jsonify({
+                    'success': False,
+                    'message': 'ids or start_date and end_date are required'
+                }), 400
+            if start_date > end_date:
+                return jsonify({
+                    'success': False,
+                    'message': 'start_date must be before end_date'
+                }), 400
+            document_ids = find_document_ids(kind, start_date, end_date, data.get('customer_id'))
+        
+        if not document_ids:
+            return jsonify({
+                'success': False,
+                'message': f'No {documents} found'
+            }), 404
+        
+        filename = f"{documents}-{datetime.now().strftime('%Y%m%d%H%M%S')}.zip"
+        return Response(
+            stream_with_context(iter_zip(iter_document_pdfs(kind, document_ids))),
+            mimetype='application/zip',
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'Invalid parameters: {str(e)}'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to export PDFs: {str(e)}'
+        }), 500
@@ -0,0 +1,63 @@
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import db
+from app.models.user import User
+from app.services.pos_checkout import checkout
+
+pos_bp = Blueprint('pos', __name__, url_prefix='/api/pos')
+
+@pos_bp.route('/checkout', methods=['POST'])
+@jwt_required()
+def pos_checkout():
+    """Sell a basket and take its payment in one request"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('sales', 'write'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        data = request.get_json() or {}
+        customer_id = data.get('customer_id') or current_app.config.get('POS_DEFAULT_CUSTOMER_ID')
+        if not customer_id:
+            return jsonify({
+                'success': False,
+                'message': 'customer_id is required'
+            }), 400
+        
+        receipt = checkout(
+            data.get('items') or [],
+            data.get('tenders') or [],
+            int(customer_id),
+            current_user_id,
+            cashier_name=user.name,
+            notes=data.get('notes'),
+            allow_discounts=user.has_permission('sales', 'discount')
+        )
+        
+        return jsonify({
+            'success': True,
+            'message': 'Sale completed successfully',
+            'data': receipt
+        }), 201
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Failed to complete sale: {str(e)}'
+        }), 500
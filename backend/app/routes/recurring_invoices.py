@@ -0,0 +1,233 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import datetime
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import db
+from app.models.invoice import RecurringInvoice
+from app.models.user import User
+from app.services.recurring_invoices import create_recurring_invoice, generate_recurring_invoices
+
+recurring_invoices_bp = Blueprint('recurring_invoices', __name__, url_prefix='/api/recurring-invoices')
+
+# Statuses a user may set; 'completed' is set by the generator after the end date
+SETTABLE_STATUSES = ('active', 'paused')
+
+def parse_date(value):
+    """Parse an ISO date parameter"""
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+@recurring_invoices_bp.route('', methods=['GET'])
+@jwt_required()
+def get_recurring_invoices():
+    """Get recurring invoice templates with pagination"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('sales', 'read'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 20, type=int)
+        status = request.args.get('status', '')
+        customer_id = request.args.get('customer_id', type=int)
+        
+        query = RecurringInvoice.query
+        if status:
+            query = query.filter(RecurringInvoice.status == status)
+        if customer_id:
+            query = query.filter(RecurringInvoice.customer_id == customer_id)
+        
+        templates = query.order_by(RecurringInvoice.next_run_date, RecurringInvoice.id).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'recurring_invoices': [template.to_dict() for template in templates.items],
+                'pagination': {
+                    'page': page,
+                    'pages': templates.pages,
+                    'per_page': per_page,
+                    'total': templates.total,
+                    'has_next': templates.has_next,
+                    'has_prev': templates.has_prev
+                }
+            }
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to get recurring invoices: {str(e)}'
+        }), 500
+
+@recurring_invoices_bp.route('/<int:template_id>', methods=['GET'])
+@jwt_required()
+def get_recurring_invoice(template_id):
+    """Get one recurring invoice template with its items"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('sales', 'read'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        template = RecurringInvoice.query.get(template_id)
+        if not template:
+            return jsonify({
+                'success': False,
+                'message': 'Recurring invoice not found'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'data': template.to_dict(include_items=True)
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to get recurring invoice: {str(e)}'
+        }), 500
+
+@recurring_invoices_bp.route('', methods=['POST'])
+@jwt_required()
+def create_recurring_invoice_template():
+    """Create a recurring invoice template"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('sales', 'write'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        data = request.get_json() or {}
+        if not data.get('customer_id'):
+            return jsonify({
+                'success': False,
+                'message': 'customer_id is required'
+            }), 400
+        
+        data['start_date'] = parse_date(data.get('start_date'))
+        data['end_date'] = parse_date(data.get('end_date'))
+        template = create_recurring_invoice(data, current_user_id)
+        
+        return jsonify({
+            'success': True,
+            'message': 'Recurring invoice created successfully',
+            'data': template.to_dict(include_items=True)
+        }), 201
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Failed to create recurring invoice: {str(e)}'
+        }), 500
+
+@recurring_invoices_bp.route('/<int:template_id>/status', methods=['PUT'])
+@jwt_required()
+def update_recurring_invoice_status(template_id):
+    """Pause or resume a recurring invoice template"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('sales', 'write'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        template = RecurringInvoice.query.get(template_id)
+        if not template:
+            return jsonify({
+                'success': False,
+                'message': 'Recurring invoice not found'
+            }), 404
+        
+        status = (request.get_json() or {}).get('status')
+        if status not in SETTABLE_STATUSES:
+            return jsonify({
+                'success': False,
+                'message': f"status must be one of {', '.join(SETTABLE_STATUSES)}"
+            }), 400
+        if template.status == 'completed':
+            return jsonify({
+                'success': False,
+                'message': 'Recurring invoice is completed'
+            }), 400
+        
+        template.status = status
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'message': 'Recurring invoice updated successfully',
+            'data': template.to_dict()
+        }), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Failed to update recurring invoice: {str(e)}'
+        }), 500
+
+@recurring_invoices_bp.route('/generate', methods=['POST'])
+@jwt_required()
+def generate_invoices():
+    """Create every invoice due from recurring templates by a run date (default today)"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user.has_permission('sales', 'write'):
+            return jsonify({
+                'success': False,
+                'message': 'Permission denied'
+            }), 403
+        
+        data = request.get_json() or {}
+        counts = generate_recurring_invoices(parse_date(data.get('run_date')))
+        
+        return jsonify({
+            'success': True,
+            'message': f"{counts['invoices']} recurring invoices created",
+            'data': counts
+        }), 200
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'Invalid parameters: {str(e)}'
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Failed to generate recurring invoices: {str(e)}'
+        }), 500
@@ -0,0 +1 @@
+# ERP System Services Package
@@ -0,0 +1,110 @@
+from sqlalchemy import func
+from datetime import timedelta
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import Account, FiscalPeriod, AccountBalanceSnapshot, db
+from app.services.archive import journal_tables
+
+# Reversed entries stay in the ledger; their reversal entry offsets them once posted
+POSTED_STATUSES = ('posted', 'reversed')
+
+def get_movement_query(as_of_date=None, start_date=None, account_ids=None):
+    """Build grouped debit/credit totals per account over posted journal lines"""
+    entries, entry_lines = journal_tables(start_date, as_of_date)
+    
+    query = db.session.query(
+        entry_lines.account_id.label('account_id'),
+        func.coalesce(func.sum(entry_lines.debit_amount), 0.0).label('total_debit'),
+        func.coalesce(func.sum(entry_lines.credit_amount), 0.0).label('total_credit')
+    ).join(
+        entries, entries.id == entry_lines.journal_entry_id
+    ).filter(
+        entries.status.in_(POSTED_STATUSES)
+    )
+    
+    if start_date:
+        query = query.filter(entries.entry_date >= start_date)
+    
+    if as_of_date:
+        query = query.filter(entries.entry_date <= as_of_date)
+    
+    if account_ids is not None:
+        query = query.filter(entry_lines.account_id.in_(account_ids))
+    
+    return query.group_by(entry_lines.account_id)
+
+def signed_balance(normal_balance, debit_amount, credit_amount):
+    """Express a debit/credit movement in the account's normal direction"""
+    if normal_balance == 'debit':
+        return (debit_amount or 0) - (credit_amount or 0)
+    return (credit_amount or 0) - (debit_amount or 0)
+
+def get_snapshot_period(as_of_date=None):
+    """Get the latest closed period whose snapshots can seed a balance query"""
+    query = FiscalPeriod.query.filter(FiscalPeriod.status == 'closed')
+    
+    if as_of_date:
+        query = query.filter(FiscalPeriod.end_date <= as_of_date)
+    
+    return query.order_by(FiscalPeriod.end_date.desc()).first()
+
+def get_snapshot_totals(period, account_ids=None):
+    """Get cumulative debit/credit totals stored for a closed period"""
+    if period is None:
+        return {}
+    
+    query = db.session.query(
+        AccountBalanceSnapshot.account_id,
+        AccountBalanceSnapshot.debit_total,
+        AccountBalanceSnapshot.credit_total
+    ).filter(AccountBalanceSnapshot.period_id == period.id)
+    
+    if account_ids is not None:
+        query = query.filter(AccountBalanceSnapshot.account_id.in_(account_ids))
+    
+    return {row.account_id: (row.debit_total or 0, row.credit_total or 0) for row in query}
+
+def get_account_balances(account_ids=None, as_of_date=None):
+    """Get balances for a set of accounts (or the whole chart) in one query
+    
+    Balances are seeded from the latest closed-period snapshot on or before
+    as_of_date, so only journal lines after that period are aggregated.
+    """
+    period = get_snapshot_period(as_of_date)
+    start_date = period.end_date + timedelta(days=1) if period else None
+    
+    movements = get_movement_query(
+        as_of_date=as_of_date, start_date=start_date, account_ids=account_ids
+    ).subquery()
+    
+    query = db.session.query(
+        Account.id,
+        Account.normal_balance,
+        Account.opening_balance,
+        movements.c.total_debit,
+        movements.c.total_credit
+    ).outerjoin(movements, movements.c.account_id == Account.id)
+    
+    if account_ids is not None:
+        query = query.filter(Account.id.in_(account_ids))
+    
+    snapshot = get_snapshot_totals(period, account_ids)
+    
+    balances = {}
+    for row in query:
+        snapshot_debit, snapshot_credit = snapshot.get(row.id, (0, 0))
+        balances[row.id] = (row.opening_balance or 0) + signed_balance(
+            row.normal_balance,
+            snapshot_debit + (row.total_debit or 0),
+            snapshot_credit + (row.total_credit or 0)
+        )
+    
+    return balances
+
+def get_account_balance(account, as_of_date=None):
+    """Get a single account balance"""
+    return get_account_balances([account.id], as_of_date).get(account.id, account.opening_balance or 0)
@@ -0,0 +1,123 @@
+from sqlalchemy import select, update, func, literal, or_, bindparam, inspect
+from collections import namedtuple
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import Account, db
+
+CODE_SEPARATOR = '.'
+NAME_SEPARATOR = ' > '
+
+AccountPath = namedtuple('AccountPath', ['full_code', 'full_name', 'level'])
+
+def _parent_path(connection, parent_id):
+    if not parent_id:
+        return None
+    accounts = Account.__table__
+    return connection.execute(
+        select(accounts.c.full_code, accounts.c.full_name, accounts.c.level).where(accounts.c.id == parent_id)
+    ).first()
+
+def _build_path(parent, code, name):
+    """Get (full_code, full_name, level) for an account under a parent row"""
+    if parent is None or not parent.full_code:
+        return code, name, 1
+    return (
+        f"{parent.full_code}{CODE_SEPARATOR}{code}",
+        f"{parent.full_name}{NAME_SEPARATOR}{name}",
+        (parent.level or 1) + 1
+    )
+
+def materialize_path(connection, account):
+    """Set an account's materialized path from its parent (before insert)"""
+    parent = _parent_path(connection, account.parent_id)
+    account.full_code, account.full_name, account.level = _build_path(parent, account.code, account.name)
+
+def update_path(connection, account):
+    """Recompute an account's path and rewrite its subtree in one UPDATE (before update)"""
+    state = inspect(account)
+    if account.full_code and not any(
+        state.attrs[attribute].history.has_changes() for attribute in ('code', 'name', 'parent_id')
+    ):
+        return
+    
+    old_code, old_name, old_level = account.full_code, account.full_name, account.level or 1
+    parent = _parent_path(connection, account.parent_id)
+    
+    if parent is not None and old_code and (
+        parent.full_code == old_code or (parent.full_code or '').startswith(old_code + CODE_SEPARATOR)
+    ):
+        raise ValueError(f"Account {account.code} cannot be moved under its own subtree")
+    
+    new_code, new_name, new_level = _build_path(parent, account.code, account.name)
+    account.full_code, account.full_name, account.level = new_code, new_name, new_level
+    
+    if not old_code or (old_code, old_name, old_level) == (new_code, new_name, new_level):
+        return
+    
+    accounts = Account.__table__
+    connection.execute(
+        update(accounts).where(
+            accounts.c.full_code.startswith(old_code + CODE_SEPARATOR, autoescape=True)
+        ).values(
+            full_code=literal(new_code) + func.substr(accounts.c.full_code, len(old_code) + 1),
+            full_name=literal(new_name) + func.substr(accounts.c.full_name, len(old_name or '') + 1),
+            level=accounts.c.level + (new_level - old_level)
+        )
+    )
+
+def rebuild_account_paths(only_missing=False):
+    """Recompute every account path from the parent map in memory and bulk update"""
+    if only_missing and not db.session.query(Account.id).filter(Account.full_code.is_(None)).first():
+        return 0
+    
+    accounts = {
+        account.id: account
+        for account in db.session.query(Account.id, Account.parent_id, Account.code, Account.name).all()
+    }
+    
+    paths = {}
+    for account_id in accounts:
+        chain = []
+        current = account_id
+        while current is not None and current not in paths and current in accounts and current not in chain:
+            chain.append(current)
+            current = accounts[current].parent_id
+        parent = paths.get(current)
+        for node_id in reversed(chain):
+            node = accounts[node_id]
+            paths[node_id] = parent = AccountPath(*_build_path(parent, node.code, node.name))
+    
+    rows = [
+        {'b_account_id': account_id, 'b_full_code': path.full_code, 'b_full_name': path.full_name, 'b_level': path.level}
+        for account_id, path in paths.items()
+    ]
+    
+    if rows:
+        table = Account.__table__
+        try:
+            db.session.execute(
+                update(table).where(table.c.id == bindparam('b_account_id')).values(
+                    full_code=bindparam('b_full_code'),
+                    full_name=bindparam('b_full_name'),
+                    level=bindparam('b_level')
+                ),
+                rows
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    
+    return len(rows)
+
+def subtree_filter(code):
+    """Filter accounts at or below the account with the given code, in one indexed query"""
+    root_path = select(Account.full_code).where(Account.code == code).scalar_subquery()
+    return or_(
+        Account.code == code,
+        Account.full_code.like(root_path + CODE_SEPARATOR + '%')
+    )
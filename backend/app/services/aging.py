@@ -0,0 +1,141 @@
+from sqlalchemy import select, func, case, and_, true
+from datetime import datetime, timedelta
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import db
+from app.models.money import minor_units, from_minor_units
+from app.models.invoice import Invoice
+from app.models.customer import Customer
+from app.models.purchase import Purchase
+from app.models.supplier import Supplier
+from app.services.fx_revaluation import CLOSED_DOCUMENT_STATUSES
+
+# Buckets by days past due on the as-of date: (name, last day in the bucket, None = no limit)
+AGING_BUCKETS = (
+    ('current', 30),
+    ('days_31_60', 60),
+    ('days_61_90', 90),
+    ('over_90', None)
+)
+
+BUCKET_NAMES = tuple(name for name, _ in AGING_BUCKETS)
+
+# Aging sides: (document model, document date column, party model, party foreign key)
+AGING_SIDES = {
+    'receivable': (Invoice, Invoice.invoice_date, Customer, Invoice.customer_id),
+    'payable': (Purchase, Purchase.purchase_date, Supplier, Purchase.supplier_id)
+}
+
+SORT_FIELDS = ('code', 'name', 'total', 'documents', 'oldest_due_date') + BUCKET_NAMES
+
+def _bucket_sums(model, as_of_date):
+    """Sum open balances (base-currency minor units) into one column per bucket with CASE on due_date"""
+    amount = func.round(minor_units(model.balance_due) * func.coalesce(model.exchange_rate, 1.0))
+    sums = {}
+    newer_bound = None
+    for name, last_day in AGING_BUCKETS:
+        conditions = []
+        bound = as_of_date - timedelta(days=last_day) if last_day is not None else None
+        if bound is not None:
+            conditions.append(model.due_date >= bound)
+        if newer_bound is not None:
+            conditions.append(model.due_date < newer_bound)
+        sums[name] = func.sum(case((and_(true(), *conditions), amount), else_=0)).label(name)
+        newer_bound = bound
+    sums['total'] = func.sum(amount).label('total')
+    return sums
+
+def build_aging_query(side, as_of_date, party_ids=None, bucket=None, sort_by='total', descending=True):
+    """Build the single GROUP BY party query behind an aging report"""
+    model, date_column, party, party_column = AGING_SIDES[side]
+    sums = _bucket_sums(model, as_of_date)
+    documents = func.count(model.id).label('documents')
+    oldest_due_date = func.min(model.due_date).label('oldest_due_date')
+    
+    query = select(
+        party_column.label('party_id'), party.code, party.name, *sums.values(), documents, oldest_due_date
+    ).join(
+        party, party.id == party_column
+    ).where(
+        model.balance_due > 0,
+        model.status.notin_(CLOSED_DOCUMENT_STATUSES),
+        date_column <= as_of_date
+    ).group_by(party_column, party.code, party.name)
+    
+    if party_ids is not None:
+        query = query.where(party_column.in_(party_ids))
+    if bucket:
+        if bucket not in BUCKET_NAMES:
+            raise ValueError(f"bucket must be one of {', '.join(BUCKET_NAMES)}")
+        query = query.having(sums[bucket] != 0)
+    
+    if sort_by not in SORT_FIELDS:
+        raise ValueError(f"sort_by must be one of {', '.join(SORT_FIELDS)}")
+    sort_columns = dict(sums, code=party.code, name=party.name, documents=documents, oldest_due_date=oldest_due_date)
+    sort_column = sort_columns[sort_by]
+    return query.order_by(sort_column.desc() if descending else sort_column.asc(), party_column)
+
+def _row_to_dict(row):
+    return {
+        'party_id': row.party_id,
+        'code': row.code,
+        'name': row.name,
+        **{name: from_minor_units(int(getattr(row, name) or 0)) for name in BUCKET_NAMES},
+        'total': from_minor_units(int(row.total or 0)),
+        'documents': row.documents,
+        'oldest_due_date': row.oldest_due_date.isoformat() if row.oldest_due_date else None
+    }
+
+def get_aging_by_party(side, party_ids=None, as_of_date=None):
+    """Get bucket amounts per party id from one grouped query, for serializing many parties at once"""
+    as_of_date = as_of_date or datetime.now().date()
+    aging = {}
+    for row in db.session.execute(build_aging_query(side, as_of_date, party_ids)):
+        aging[row.party_id] = {name: from_minor_units(int(getattr(row, name) or 0)) for name in BUCKET_NAMES}
+    if party_ids is not None:
+        for party_id in party_ids:
+            aging.setdefault(party_id, {name: 0.0 for name in BUCKET_NAMES})
+    return aging
+
+def generate_aging_report(side, as_of_date=None, bucket=None, sort_by='total', descending=True, page=1, per_page=100):
+    """Aging report for every party with open documents, with grand totals per bucket
+    
+    Balances are current open amounts in base currency, bucketed by how
+    far past due they are on as_of_date; documents dated after as_of_date
+    are left out.
+    """
+    as_of_date = as_of_date or datetime.now().date()
+    query = build_aging_query(side, as_of_date, bucket=bucket, sort_by=sort_by, descending=descending)
+    
+    totals = dict.fromkeys(BUCKET_NAMES + ('total',), 0)
+    parties = []
+    start = (page - 1) * per_page
+    count = 0
+    for row in db.session.execute(query):
+        for name in totals:
+            totals[name] += int(getattr(row, name) or 0)
+        if start <= count < start + per_page:
+            parties.append(_row_to_dict(row))
+        count += 1
+    
+    return {
+        'side': side,
+        'as_of_date': as_of_date.isoformat(),
+        'buckets': list(BUCKET_NAMES),
+        'bucket': bucket,
+        'sort_by': sort_by,
+        'parties': parties,
+        'totals': {name: from_minor_units(amount) for name, amount in totals.items()},
+        'pagination': {
+            'page': page,
+            'pages': (count + per_page - 1) // per_page,
+            'per_page': per_page,
+            'total': count,
+            'has_next': start + per_page < count,
+            'has_prev': page > 1
+        }
+    }
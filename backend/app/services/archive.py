@@ -0,0 +1,258 @@
+from sqlalchemy import MetaData, Table, Column, select, insert, delete, union_all, exists, func, text
+from sqlalchemy.orm import aliased
+from flask import current_app, has_app_context
+from datetime import datetime, time
+import threading
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import JournalEntry, JournalEntryLine, FiscalPeriod, ArchivedFiscalYear, db
+from app.models.invoice import Invoice, InvoiceItem
+from app.models.purchase import Purchase
+from app.models.inventory import InventoryMovement
+from app.services.document_numbers import advance_sequence, BOOKS_VERSION
+
+ARCHIVE_SCHEMA_PREFIX = 'archive_'
+DEFAULT_ARCHIVE_DIRECTORY = 'archive'
+
+# Invoices still referenced by open work stay in the hot database
+ARCHIVABLE_INVOICE_STATUSES = ('paid', 'cancelled')
+
+# Archive table copies: same columns, no foreign keys (referenced rows stay in the hot database)
+archive_metadata = MetaData()
+
+def archive_schema(fiscal_year):
+    """Get the schema (attached database) name of a fiscal year archive"""
+    return f"{ARCHIVE_SCHEMA_PREFIX}{int(fiscal_year)}"
+
+def get_archive_directory():
+    if has_app_context():
+        return current_app.config.get('ARCHIVE_DIRECTORY') or DEFAULT_ARCHIVE_DIRECTORY
+    return DEFAULT_ARCHIVE_DIRECTORY
+
+def archive_table(table, schema):
+    """Get the archive copy of a hot table in a schema"""
+    key = f"{schema}.{table.name}"
+    if key in archive_metadata.tables:
+        return archive_metadata.tables[key]
+    return Table(
+        table.name, archive_metadata,
+        *[Column(column.name, column.type, primary_key=column.primary_key) for column in table.columns],
+        schema=schema
+    )
+
+class ArchiveRegistry:
+    """Archived fiscal years with their date ranges, cached per process
+    
+    Every lookup checks the count and latest archived_at of the archived
+    years, so years archived by another worker process are picked up.
+    """
+    
+    def __init__(self):
+        self.years = None
+        self.version = None
+        self.lock = threading.Lock()
+    
+    def get(self):
+        version = tuple(db.session.query(
+            func.count(ArchivedFiscalYear.id), func.max(ArchivedFiscalYear.archived_at)
+        ).one())
+        with self.lock:
+            if self.years is None or self.version != version:
+                self.years = [
+                    (row.fiscal_year, row.start_date, row.end_date, row.schema_name, row.location)
+                    for row in db.session.query(
+                        ArchivedFiscalYear.fiscal_year, ArchivedFiscalYear.start_date, ArchivedFiscalYear.end_date,
+                        ArchivedFiscalYear.schema_name, ArchivedFiscalYear.location
+                    ).order_by(ArchivedFiscalYear.start_date)
+                ]
+                self.version = version
+            return self.years
+    
+    def overlapping(self, start_date=None, end_date=None):
+        """Get archived years that overlap a date range (open-ended when a bound is None)"""
+        return [
+            year for year in self.get()
+            if (start_date is None or year[2] >= start_date) and (end_date is None or year[1] <= end_date)
+        ]
+    
+    def clear(self):
+        with self.lock:
+            self.years = None
+            self.version = None
+
+archive_registry = ArchiveRegistry()
+
+def ensure_attached(connection, schema, location):
+    """Attach a SQLite archive file to the connection, or create the schema on other databases"""
+    if connection.dialect.name == 'sqlite':
+        attached = {row[1] for row in connection.exec_driver_sql('PRAGMA database_list')}
+        if schema not in attached:
+            connection.exec_driver_sql(f'ATTACH DATABASE ? AS "{schema}"', (location,))
+    else:
+        connection.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
+
+def _union_alias(model, archived_years, name):
+    """Alias a model over UNION ALL of its hot table and the archived copies"""
+    table = model.__table__
+    selects = [select(table)] + [select(archive_table(table, schema)) for _, _, _, schema, _ in archived_years]
+    return aliased(model, union_all(*selects).subquery(name))
+
+def _attach_years(archived_years, connection=None):
+    connection = connection if connection is not None else db.session.connection()
+    for _, _, _, schema, location in archived_years:
+        ensure_attached(connection, schema, location)
+
+def journal_tables(start_date=None, end_date=None):
+    """Get (JournalEntry, JournalEntryLine) for reading a date range
+    
+    Ranges inside the hot database get the plain models; ranges reaching
+    into archived fiscal years get aliases that union the archives in.
+    """
+    archived_years = archive_registry.overlapping(start_date, end_date)
+    if not archived_years:
+        return JournalEntry, JournalEntryLine
+    
+    _attach_years(archived_years)
+    return (
+        _union_alias(JournalEntry, archived_years, 'journal_entries_all'),
+        _union_alias(JournalEntryLine, archived_years, 'journal_entry_lines_all')
+    )
+
+def invoice_tables(start_date=None, end_date=None, connection=None):
+    """Get (Invoice, InvoiceItem) for reading a date range, unioning archived years when needed
+    
+    Pass connection when reading outside the session, so the archives are attached to it.
+    """
+    archived_years = archive_registry.overlapping(start_date, end_date)
+    if not archived_years:
+        return Invoice, InvoiceItem
+    
+    _attach_years(archived_years, connection)
+    return (
+        _union_alias(Invoice, archived_years, 'invoices_all'),
+        _union_alias(InvoiceItem, archived_years, 'invoice_items_all')
+    )
+
+def _move_rows(connection, table, schema, ids, id_column=None):
+    """Copy rows to the archive schema and delete them from the hot table"""
+    id_column = id_column if id_column is not None else table.c.id
+    target = archive_table(table, schema)
+    columns = [column.name for column in table.columns]
+    connection.execute(
+        insert(target).prefix_with('OR REPLACE', dialect='sqlite').from_select(
+            columns, select(*[table.c[name] for name in columns]).where(id_column.in_(ids))
+        )
+    )
+    return connection.execute(delete(table).where(id_column.in_(ids))).rowcount
+
+def _archive_chunks(connection, parent, child, child_fk, schema, candidates, chunk_size, counts):
+    """Move parent rows (and their child rows) in chunked transactions"""
+    while True:
+        with connection.begin():
+            ids = connection.execute(candidates.limit(chunk_size)).scalars().all()
+            if not ids:
+                return
+            if child is not None:
+                counts[child.name] += _move_rows(connection, child, schema, ids, child.c[child_fk])
+            counts[parent.name] += _move_rows(connection, parent, schema, ids)
+
+def archive_fiscal_year(fiscal_year, archived_by_user_id=None, chunk_size=5000):
+    """Move a closed fiscal year's journal, invoice and movement history to its archive
+    
+    Every period of the year must be closed, so balance snapshots already
+    carry the year's totals and stay in the hot database. Each chunk moves
+    in its own transaction, so an interrupted run can simply be repeated.
+    """
+    periods = FiscalPeriod.query.filter(FiscalPeriod.fiscal_year == fiscal_year).all()
+    if not periods:
+        raise ValueError(f"No fiscal periods exist for {fiscal_year}")
+    open_periods = [period.name for period in periods if not period.is_closed()]
+    if open_periods:
+        raise ValueError(f"Fiscal year {fiscal_year} has open periods: {', '.join(open_periods)}")
+    
+    start_date = min(period.start_date for period in periods)
+    end_date = max(period.end_date for period in periods)
+    schema = archive_schema(fiscal_year)
+    
+    location = None
+    if db.engine.dialect.name == 'sqlite':
+        directory = get_archive_directory()
+        os.makedirs(directory, exist_ok=True)
+        location = os.path.abspath(os.path.join(directory, f"{schema}.db"))
+    
+    # Register the year first so reads union the archive while rows are moving
+    archived = ArchivedFiscalYear.query.filter_by(fiscal_year=fiscal_year).first()
+    try:
+        if archived is None:
+            archived = ArchivedFiscalYear(
+                fiscal_year=fiscal_year, start_date=start_date, end_date=end_date, schema_name=schema, location=location,
+                archived_by=archived_by_user_id
+            )
+            db.session.add(archived)
+        advance_sequence(db.session.connection(), BOOKS_VERSION)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    archive_registry.clear()
+    
+    # Work on a dedicated connection: ATTACH must run outside a transaction on SQLite
+    counts = {
+        'journal_entries': 0, 'journal_entry_lines': 0, 'invoices': 0, 'invoice_items': 0, 'inventory_movements': 0
+    }
+    with db.engine.connect() as connection:
+        ensure_attached(connection, schema, location)
+        connection.commit()
+        with connection.begin():
+            for table in (JournalEntry.__table__, JournalEntryLine.__table__, Invoice.__table__,
+                          InvoiceItem.__table__, InventoryMovement.__table__):
+                archive_table(table, schema).create(connection, checkfirst=True)
+        
+        invoices = Invoice.__table__
+        _archive_chunks(
+            connection, invoices, InvoiceItem.__table__, 'invoice_id', schema,
+            select(invoices.c.id).where(
+                invoices.c.invoice_date.between(start_date, end_date),
+                invoices.c.status.in_(ARCHIVABLE_INVOICE_STATUSES)
+            ).order_by(invoices.c.id),
+            chunk_size, counts
+        )
+        
+        # Entries still linked from hot invoices or purchases stay behind with them
+        entries = JournalEntry.__table__
+        _archive_chunks(
+            connection, entries, JournalEntryLine.__table__, 'journal_entry_id', schema,
+            select(entries.c.id).where(
+                entries.c.entry_date.between(start_date, end_date),
+                entries.c.status.in_(('posted', 'reversed')),
+                ~exists().where(Invoice.__table__.c.journal_entry_id == entries.c.id),
+                ~exists().where(Purchase.__table__.c.journal_entry_id == entries.c.id)
+            ).order_by(entries.c.id),
+            chunk_size, counts
+        )
+        
+        movements = InventoryMovement.__table__
+        _archive_chunks(
+            connection, movements, None, None, schema,
+            select(movements.c.id).where(
+                movements.c.movement_date >= datetime.combine(start_date, time.min),
+                movements.c.movement_date <= datetime.combine(end_date, time.max)
+            ).order_by(movements.c.id),
+            chunk_size, counts
+        )
+    
+    try:
+        for key, count in counts.items():
+            setattr(archived, key, (getattr(archived, key) or 0) + count)
+        archived.archived_by = archived_by_user_id
+        archived.archived_at = datetime.utcnow()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    
+    return archived.to_dict()
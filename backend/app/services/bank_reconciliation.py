@@ -0,0 +1,305 @@
+from sqlalchemy import insert, update, bindparam
+from datetime import datetime, timedelta
+from bisect import bisect_left, bisect_right
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import Payment, BankStatementLine, db
+from app.models.money import to_minor_units
+
+DEFAULT_DATE_TOLERANCE_DAYS = 3
+
+# Bounds for the many-to-one search so a bad month cannot blow up
+MAX_GROUP_SIZE = 4
+MAX_GROUP_CANDIDATES = 24
+MAX_GROUP_NODES = 20000
+
+def to_cents(amount):
+    return to_minor_units(amount or 0)
+
+def payment_cents(payment):
+    """Signed payment amount in cents as it appears on the statement"""
+    cents = to_cents(payment.amount)
+    return cents if payment.payment_type == 'receipt' else -cents
+
+def import_statement_lines(records, bank_account_id):
+    """Bulk insert parsed statement records (see payment_import parsers)"""
+    now = datetime.utcnow()
+    rows = [
+        {
+            'bank_account_id': bank_account_id,
+            'statement_date': record['payment_date'],
+            'amount': record['amount'] if record['payment_type'] == 'receipt' else -record['amount'],
+            'reference_number': record.get('reference_number'),
+            'check_number': record.get('check_number'),
+            'description': record.get('description'),
+            'status': 'unmatched',
+            'created_at': now
+        }
+        for record in records
+    ]
+    
+    try:
+        if rows:
+            db.session.execute(insert(BankStatementLine), rows)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    
+    return len(rows)
+
+class PaymentIndex:
+    """Unreconciled payments indexed by amount, reference, check number and date"""
+    
+    def __init__(self, payments):
+        self.payments = payments
+        self.used = set()
+        self.by_reference = {}
+        self.by_check = {}
+        self.by_amount = {}
+        
+        for payment in payments:
+            cents = payment_cents(payment)
+            if payment.reference_number:
+                self.by_reference.setdefault((payment.reference_number.strip().upper(), cents), []).append(payment)
+            if payment.check_number:
+                self.by_check.setdefault((payment.check_number.strip().upper(), cents), []).append(payment)
+            self.by_amount.setdefault(cents, []).append(payment)
+        
+        # Each amount bucket is kept sorted by date for tolerance lookups
+        self.amount_days = {}
+        for cents, bucket in self.by_amount.items():
+            bucket.sort(key=lambda payment: (payment.payment_date, payment.id))
+            self.amount_days[cents] = [payment.payment_date.toordinal() for payment in bucket]
+        
+        ordered = sorted(payments, key=lambda payment: (payment.payment_date, payment.id))
+        self.by_date = ordered
+        self.days = [payment.payment_date.toordinal() for payment in ordered]
+    
+    def take(self, payment):
+        self.used.add(payment.id)
+        return payment
+    
+    def first_free(self, candidates):
+        for payment in candidates or ():
+            if payment.id not in self.used:
+                return payment
+        return None
+    
+    def match_reference(self, line):
+        """Match on reference or check number with the same amount"""
+        cents = to_cents(line.amount)
+        
+        if line.reference_number:
+            payment = self.first_free(self.by_reference.get((line.reference_number.strip().upper(), cents)))
+            if payment:
+                return self.take(payment), 'reference'
+        
+        if line.check_number:
+            payment = self.first_free(self.by_check.get((line.check_number.strip().upper(), cents)))
+            if payment:
+                return self.take(payment), 'check'
+        
+        return None, None
+    
+    def match_same_day(self, line):
+        """Match a free payment with the same amount on the same day"""
+        cents = to_cents(line.amount)
+        days = self.amount_days.get(cents)
+        if not days:
+            return None
+        
+        day = line.statement_date.toordinal()
+        bucket = self.by_amount[cents]
+        for position in range(bisect_left(days, day), bisect_right(days, day)):
+            if bucket[position].id not in self.used:
+                return self.take(bucket[position])
+        return None
+    
+    def match_tolerance(self, line, tolerance_days):
+        """Match the free payment with the same amount nearest in date within the tolerance"""
+        cents = to_cents(line.amount)
+        days = self.amount_days.get(cents)
+        if not days:
+            return None
+        
+        day = line.statement_date.toordinal()
+        bucket = self.by_amount[cents]
+        best = None
+        for position in range(bisect_left(days, day - tolerance_days), bisect_right(days, day + tolerance_days)):
+            payment = bucket[position]
+            if payment.id in self.used:
+                continue
+            if best is None or abs(days[position] - day) < abs(best[0] - day):
+                best = (days[position], payment)
+        
+        return self.take(best[1]) if best else None
+    
+    def match_group(self, line, tolerance_days):
+        """Find several free payments in the date window that add up to the line amount"""
+        target = to_cents(line.amount)
+        day = line.statement_date.toordinal()
+        
+        window = self.by_date[bisect_left(self.days, day - tolerance_days):bisect_right(self.days, day + tolerance_days)]
+        candidates = [
+            (payment_cents(payment), payment) for payment in window
+            if payment.id not in self.used and (payment_cents(payment) > 0) == (target > 0)
+        ]
+        if len(candidates) < 2:
+            return None
+        
+        # Closest dates first, then largest amounts first so the running total prunes early
+        candidates.sort(key=lambda item: abs(item[1].payment_date.toordinal() - day))
+        candidates = sorted(candidates[:MAX_GROUP_CANDIDATES], key=lambda item: -abs(item[0]))
+        
+        amounts = [abs(cents) for cents, payment in candidates]
+        target = abs(target)
+        
+        # suffix[i] is the most the remaining candidates can still add
+        suffix = [0] * (len(amounts) + 1)
+        for position in range(len(amounts) - 1, -1, -1):
+            suffix[position] = suffix[position + 1] + amounts[position]
+        
+        chosen = []
+        nodes = [0]
+        
+        def search(start, remaining):
+            if remaining == 0:
+                return len(chosen) >= 2
+            if len(chosen) >= MAX_GROUP_SIZE or nodes[0] >= MAX_GROUP_NODES:
+                return False
+            for position in range(start, len(amounts)):
+                if suffix[position] < remaining:
+                    return False
+                if amounts[position] > remaining:
+                    continue
+                nodes[0] += 1
+                chosen.append(position)
+                if search(position + 1, remaining - amounts[position]):
+                    return True
+                chosen.pop()
+            return False
+        
+        if not search(0, target):
+            return None
+        
+        return [self.take(candidates[position][1]) for position in chosen]
+
+def load_unreconciled_payments(bank_account_id, start_date, end_date):
+    """Load posted, unreconciled payments for the window in one query"""
+    query = Payment.query.filter(
+        Payment.status == 'posted',
+        Payment.statement_line_id.is_(None),
+        Payment.payment_date >= start_date,
+        Payment.payment_date <= end_date
+    )
+    if bank_account_id:
+        query = query.filter(Payment.bank_account_id == bank_account_id)
+    return query.all()
+
+def reconcile_statement(bank_account_id, start_date, end_date, matched_by_user_id,
+                        tolerance_days=DEFAULT_DATE_TOLERANCE_DAYS, match_groups=True):
+    """Match unmatched statement lines in a date range against payments
+    
+    Reference/check matches are taken first across all lines, so a same-day
+    amount match on an earlier line cannot claim a payment another line
+    names; then same-day amount matches, same-amount matches within the
+    date tolerance, and many-to-one groups. All matches are written in one
+    batch.
+    """
+    line_query = BankStatementLine.query.filter(
+        BankStatementLine.status == 'unmatched',
+        BankStatementLine.statement_date >= start_date,
+        BankStatementLine.statement_date <= end_date
+    )
+    if bank_account_id:
+        line_query = line_query.filter(BankStatementLine.bank_account_id == bank_account_id)
+    lines = line_query.order_by(BankStatementLine.statement_date, BankStatementLine.id).all()
+    
+    window = timedelta(days=tolerance_days)
+    index = PaymentIndex(load_unreconciled_payments(bank_account_id, start_date - window, end_date + window))
+    
+    matches = {}
+    for line in lines:
+        payment, match_type = index.match_reference(line)
+        if payment:
+            matches[line.id] = (match_type, [payment])
+    
+    for line in lines:
+        if line.id not in matches:
+            payment = index.match_same_day(line)
+            if payment:
+                matches[line.id] = ('exact', [payment])
+    
+    for line in lines:
+        if line.id not in matches:
+            payment = index.match_tolerance(line, tolerance_days)
+            if payment:
+                matches[line.id] = ('date_tolerance', [payment])
+    
+    if match_groups:
+        for line in lines:
+            if line.id not in matches:
+                payments = index.match_group(line, tolerance_days)
+                if payments:
+                    matches[line.id] = ('group', payments)
+    
+    if matches:
+        now = datetime.utcnow()
+        try:
+            db.session.execute(
+                update(BankStatementLine.__table__).where(
+                    BankStatementLine.__table__.c.id == bindparam('b_line_id')
+                ).values(status='matched', match_type=bindparam('b_match_type'), matched_by=matched_by_user_id, matched_at=now),
+                [{'b_line_id': line_id, 'b_match_type': match_type} for line_id, (match_type, payments) in matches.items()]
+            )
+            db.session.execute(
+                update(Payment.__table__).where(
+                    Payment.__table__.c.id == bindparam('b_payment_id')
+                ).values(statement_line_id=bindparam('b_line_id'), reconciled_at=now),
+                [
+                    {'b_payment_id': payment.id, 'b_line_id': line_id}
+                    for line_id, (match_type, payments) in matches.items()
+                    for payment in payments
+                ]
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    
+    match_counts = {}
+    for match_type, payments in matches.values():
+        match_counts[match_type] = match_counts.get(match_type, 0) + 1
+    
+    return {
+        'lines': len(lines),
+        'matched': len(matches),
+        'unmatched': len(lines) - len(matches),
+        'by_type': match_counts,
+        'matches': [
+            {'statement_line_id': line_id, 'match_type': match_type, 'payment_ids': [payment.id for payment in payments]}
+            for line_id, (match_type, payments) in matches.items()
+        ]
+    }
+
+def unmatch_statement_line(line):
+    """Undo a reconciliation match"""
+    try:
+        Payment.query.filter(Payment.statement_line_id == line.id).update(
+            {'statement_line_id': None, 'reconciled_at': None}, synchronize_session=False
+        )
+        line.status = 'unmatched'
+        line.match_type = None
+        line.matched_by = None
+        line.matched_at = None
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    
+    return line
@@ -0,0 +1,191 @@
+from sqlalchemy import insert, update, bindparam, func
+from datetime import datetime
+import numpy as np
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import Account, AccountMonthlyTotal, Budget, db
+from app.models.money import minor_units, from_minor_units
+from app.services.monthly_totals import DEFAULT_COST_CENTER
+from app.services.financial_statements import INCOME_TYPES
+
+# Income statement types where a variance is favorable or not; spending under budget is favorable
+COST_TYPES = ('expense',)
+
+def save_budgets(budgets, created_by, cost_center=DEFAULT_COST_CENTER):
+    """Insert or update monthly budget amounts in bulk
+    
+    budgets is a list of dicts with account_id, year, month, amount and optional notes.
+    """
+    if not budgets:
+        return 0
+    
+    account_ids = {budget['account_id'] for budget in budgets}
+    found = {row.id for row in db.session.query(Account.id).filter(Account.id.in_(account_ids))}
+    for budget in budgets:
+        if budget['account_id'] not in found:
+            raise ValueError(f"Account {budget['account_id']} does not exist")
+        if not 1 <= budget['month'] <= 12:
+            raise ValueError('month must be between 1 and 12')
+    
+    years = {budget['year'] for budget in budgets}
+    existing = {
+        (row.account_id, row.year, row.month): row.id
+        for row in db.session.query(Budget.id, Budget.account_id, Budget.year, Budget.month).filter(
+            Budget.year.in_(years),
+            Budget.account_id.in_(account_ids),
+            Budget.cost_center == cost_center
+        )
+    }
+    
+    now = datetime.utcnow()
+    new_rows, changed_rows = [], []
+    for budget in budgets:
+        budget_id = existing.get((budget['account_id'], budget['year'], budget['month']))
+        if budget_id:
+            changed_rows.append({'b_budget_id': budget_id, 'b_amount': budget['amount'], 'b_notes': budget.get('notes')})
+        else:
+            new_rows.append({
+                'account_id': budget['account_id'],
+                'year': budget['year'],
+                'month': budget['month'],
+                'cost_center': cost_center,
+                'amount': budget['amount'],
+                'notes': budget.get('notes'),
+                'created_by': created_by,
+                'created_at': now,
+                'updated_at': now
+            })
+    
+    try:
+        if new_rows:
+            db.session.execute(insert(Budget), new_rows)
+        if changed_rows:
+            table = Budget.__table__
+            db.session.execute(
+                update(table).where(table.c.id == bindparam('b_budget_id')).values(
+                    amount=bindparam('b_amount'), notes=bindparam('b_notes'), updated_at=now
+                ),
+                changed_rows
+            )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    
+    return len(new_rows) + len(changed_rows)
+
+def _month_matrices(query, account_index, start_month, months, width):
+    """Scatter (account_id, month, minor units...) rows into account x month arrays"""
+    matrices = [np.zeros((len(account_index), months), dtype=np.int64) for _ in range(width)]
+    for row in query:
+        position = account_index.get(row[0])
+        if position is None:
+            continue
+        for matrix, value in zip(matrices, row[2:]):
+            matrix[position, row[1] - start_month] += int(value or 0)
+    return matrices
+
+def generate_budget_vs_actual(year, start_month=1, end_month=12, account_type=None, cost_center=DEFAULT_COST_CENTER):
+    """Compare monthly budgets with posted actuals per account
+    
+    Reads only the budget table and the monthly totals maintained at
+    posting time, never the journal. Actuals and budgets are in each
+    account's normal direction; variance is actual minus budget.
+    """
+    if not 1 <= start_month <= end_month <= 12:
+        raise ValueError('Months must be between 1 and 12 with start_month <= end_month')
+    
+    accounts_query = db.session.query(
+        Account.id, Account.code, Account.name, Account.name_en, Account.account_type, Account.normal_balance, Account.level
+    )
+    if account_type:
+        accounts_query = accounts_query.filter(Account.account_type == account_type)
+    accounts = accounts_query.order_by(Account.full_code).all()
+    account_index = {account.id: position for position, account in enumerate(accounts)}
+    months = end_month - start_month + 1
+    
+    budget_query = db.session.query(
+        Budget.account_id, Budget.month, minor_units(func.sum(Budget.amount))
+    ).filter(
+        Budget.year == year,
+        Budget.month.between(start_month, end_month),
+        Budget.cost_center == cost_center
+    ).group_by(Budget.account_id, Budget.month)
+    
+    actual_query = db.session.query(
+        AccountMonthlyTotal.account_id,
+        AccountMonthlyTotal.month,
+        minor_units(func.sum(AccountMonthlyTotal.debit_total)),
+        minor_units(func.sum(AccountMonthlyTotal.credit_total))
+    ).filter(
+        AccountMonthlyTotal.year == year,
+        AccountMonthlyTotal.month.between(start_month, end_month),
+        AccountMonthlyTotal.cost_center == cost_center
+    ).group_by(AccountMonthlyTotal.account_id, AccountMonthlyTotal.month)
+    
+    budget, = _month_matrices(budget_query, account_index, start_month, months, 1)
+    debit, credit = _month_matrices(actual_query, account_index, start_month, months, 2)
+    
+    direction = np.array([1 if account.normal_balance == 'debit' else -1 for account in accounts], dtype=np.int64)
+    actual = (debit - credit) * direction[:, None]
+    variance = actual - budget
+    
+    results = []
+    totals = {}
+    for position, account in enumerate(accounts):
+        if not budget[position].any() and not actual[position].any():
+            continue
+        
+        budget_total = int(budget[position].sum())
+        actual_total = int(actual[position].sum())
+        variance_total = actual_total - budget_total
+        favorable = None
+        if account.account_type in INCOME_TYPES:
+            favorable = variance_total <= 0 if account.account_type in COST_TYPES else variance_total >= 0
+        
+        results.append({
+            'account_id': account.id,
+            'code': account.code,
+            'name': account.name,
+            'name_en': account.name_en,
+            'account_type': account.account_type,
+            'level': account.level,
+            'months': [
+                {
+                    'month': start_month + offset,
+                    'budget': from_minor_units(int(budget[position, offset])),
+                    'actual': from_minor_units(int(actual[position, offset])),
+                    'variance': from_minor_units(int(variance[position, offset]))
+                }
+                for offset in range(months)
+            ],
+            'budget': from_minor_units(budget_total),
+            'actual': from_minor_units(actual_total),
+            'variance': from_minor_units(variance_total),
+            'variance_percentage': round(variance_total / budget_total * 100, 2) if budget_total else None,
+            'favorable': favorable
+        })
+        
+        type_totals = totals.setdefault(account.account_type, [0, 0])
+        type_totals[0] += budget_total
+        type_totals[1] += actual_total
+    
+    return {
+        'year': year,
+        'start_month': start_month,
+        'end_month': end_month,
+        'cost_center': cost_center,
+        'accounts': results,
+        'totals': {
+            account_type: {
+                'budget': from_minor_units(budget_total),
+                'actual': from_minor_units(actual_total),
+                'variance': from_minor_units(actual_total - budget_total)
+            }
+            for account_type, (budget_total, actual_total) in totals.items()
+        }
+    }
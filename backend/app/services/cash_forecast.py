@@ -0,0 +1,203 @@
+from sqlalchemy import select, func, event
+from sqlalchemy.orm import Session
+from datetime import date, timedelta
+import threading
+import numpy as np
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import Account, Payment, db
+from app.models.invoice import Invoice
+from app.models.purchase import Purchase
+from app.models.money import minor_units, from_minor_units
+from app.services.account_paths import subtree_filter
+from app.services.posting_rules import posting_accounts
+from app.services.fx_revaluation import CLOSED_DOCUMENT_STATUSES
+
+# Forecast sides: (document model, party foreign key, payment party type)
+FORECAST_SIDES = {
+    'inflow': (Invoice, Invoice.customer_id, 'customer'),
+    'outflow': (Purchase, Purchase.supplier_id, 'supplier')
+}
+
+# Changed document sides wait on the session until the transaction commits
+SESSION_KEY = 'cash_forecast_stale_sides'
+
+def load_open_balances(side):
+    """Group open balances by party and due date with one query, in base-currency minor units"""
+    model, party_column, _ = FORECAST_SIDES[side]
+    rows = db.session.execute(
+        select(
+            party_column,
+            model.due_date,
+            minor_units(func.sum(func.round(model.balance_due * func.coalesce(model.exchange_rate, 1.0))))
+        ).where(
+            model.balance_due != 0,
+            model.status.notin_(CLOSED_DOCUMENT_STATUSES)
+        ).group_by(party_column, model.due_date)
+    ).all()
+    
+    party_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    due_days = np.fromiter((row[1].toordinal() for row in rows), dtype=np.int64, count=len(rows))
+    amounts = np.fromiter((int(row[2] or 0) for row in rows), dtype=np.int64, count=len(rows))
+    return party_ids, due_days, amounts
+
+class PaymentDelays:
+    """Amount-weighted average days late per party, folded in from newly posted payments only"""
+    
+    def __init__(self):
+        self.totals = {}
+        self.last_posted_at = None
+    
+    def refresh(self):
+        last_posted_at = self.last_posted_at
+        for reference_type, (model, party_column, party_type) in (('invoice', FORECAST_SIDES['inflow']), ('purchase', FORECAST_SIDES['outflow'])):
+            query = select(
+                Payment.posted_at, party_column, Payment.payment_date, model.due_date, minor_units(Payment.amount)
+            ).join(
+                model, model.id == Payment.reference_id
+            ).where(
+                Payment.reference_type == reference_type,
+                Payment.status == 'posted'
+            )
+            if last_posted_at is not None:
+                query = query.where(Payment.posted_at > last_posted_at)
+            rows = db.session.execute(query).all()
+            if not rows:
+                continue
+            
+            party_ids = np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows))
+            days_late = np.fromiter(
+                ((row[2] - row[3]).days for row in rows), dtype=np.float64, count=len(rows)
+            )
+            weights = np.fromiter((abs(row[4] or 0) for row in rows), dtype=np.float64, count=len(rows))
+            
+            parties, party_index = np.unique(party_ids, return_inverse=True)
+            weighted_days = np.bincount(party_index, weights=days_late * weights)
+            weight_sums = np.bincount(party_index, weights=weights)
+            for party_id, days, weight in zip(parties, weighted_days, weight_sums):
+                totals = self.totals.setdefault((party_type, int(party_id)), [0.0, 0.0])
+                totals[0] += days
+                totals[1] += weight
+            
+            newest = max((row[0] for row in rows if row[0] is not None), default=None)
+            if newest is not None and (self.last_posted_at is None or newest > self.last_posted_at):
+                self.last_posted_at = newest
+    
+    def get(self, party_type, party_ids):
+        """Get average days late for an array of party ids (0 when unknown)"""
+        averages = {
+            party_id: round(days / weight) if weight else 0
+            for (totals_type, party_id), (days, weight) in self.totals.items()
+            if totals_type == party_type
+        }
+        return np.fromiter((averages.get(int(party_id), 0) for party_id in party_ids), dtype=np.int64, count=len(party_ids))
+
+class ForecastCache:
+    """Open balances per side and payment delays, reloaded only for sides whose documents changed"""
+    
+    def __init__(self):
+        self.balances = {}
+        self.delays = PaymentDelays()
+        self.lock = threading.Lock()
+    
+    def get(self):
+        """Get (balances by side, delays), loading stale sides and new payments"""
+        with self.lock:
+            for side in FORECAST_SIDES:
+                if side not in self.balances:
+                    self.balances[side] = load_open_balances(side)
+            self.delays.refresh()
+            return dict(self.balances), self.delays
+    
+    def invalidate(self, sides):
+        with self.lock:
+            for side in sides:
+                self.balances.pop(side, None)
+    
+    def clear(self):
+        with self.lock:
+            self.balances = {}
+            self.delays = PaymentDelays()
+
+forecast_cache = ForecastCache()
+
+@event.listens_for(Session, 'after_flush')
+def _collect_stale_sides(session, flush_context):
+    sides = session.info.setdefault(SESSION_KEY, set())
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        for side, (model, _, _) in FORECAST_SIDES.items():
+            if isinstance(instance, model):
+                sides.add(side)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_stale_sides(session):
+    sides = session.info.pop(SESSION_KEY, None)
+    if sides:
+        forecast_cache.invalidate(sides)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_stale_sides(session):
+    session.info.pop(SESSION_KEY, None)
+
+def get_cash_balance():
+    """Get the current balance of the cash account and its sub-accounts"""
+    cash_code = posting_accounts.get_codes()['cash']
+    balance = db.session.query(
+        func.sum(Account.current_balance)
+    ).filter(subtree_filter(cash_code), Account.is_active == True).scalar()
+    return balance or 0.0
+
+def generate_cash_forecast(as_of_date=None, weeks=13, use_payment_history=True):
+    """Forecast weekly cash in and out from open receivables and payables
+    
+    Each open balance is expected on its due date shifted by the party's
+    average days late; anything already overdue falls into the first week.
+    """
+    as_of_date = as_of_date or date.today()
+    start = as_of_date.toordinal()
+    balances, delays = forecast_cache.get()
+    
+    flows = {}
+    beyond_horizon = {}
+    overdue = {}
+    for side, (party_ids, due_days, amounts) in balances.items():
+        _, _, party_type = FORECAST_SIDES[side]
+        expected_days = due_days + delays.get(party_type, party_ids) if use_payment_history else due_days
+        
+        week_index = (expected_days - start) // 7
+        in_horizon = week_index < weeks
+        flows[side] = np.bincount(
+            np.clip(week_index[in_horizon], 0, None), weights=amounts[in_horizon], minlength=weeks
+        ).astype(np.int64)
+        beyond_horizon[side] = int(amounts[~in_horizon].sum())
+        overdue[side] = int(amounts[expected_days < start].sum())
+    
+    opening_cash = get_cash_balance()
+    net = flows['inflow'] - flows['outflow']
+    closing = np.cumsum(net)
+    
+    buckets = []
+    for week in range(weeks):
+        week_start = as_of_date + timedelta(days=7 * week)
+        buckets.append({
+            'week': week + 1,
+            'start_date': week_start.isoformat(),
+            'end_date': (week_start + timedelta(days=6)).isoformat(),
+            'inflow': from_minor_units(int(flows['inflow'][week])),
+            'outflow': from_minor_units(int(flows['outflow'][week])),
+            'net': from_minor_units(int(net[week])),
+            'closing_cash': round(opening_cash + from_minor_units(int(closing[week])), 2)
+        })
+    
+    return {
+        'as_of_date': as_of_date.isoformat(),
+        'weeks': weeks,
+        'opening_cash': round(opening_cash, 2),
+        'buckets': buckets,
+        'overdue': {side: from_minor_units(amount) for side, amount in overdue.items()},
+        'beyond_horizon': {side: from_minor_units(amount) for side, amount in beyond_horizon.items()}
+    }
@@ -0,0 +1,55 @@
+from sqlalchemy import insert, update, case
+from sqlalchemy.exc import IntegrityError
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import DocumentSequence, db
+
+# Version sequences, advanced in the transaction that changes what in-process caches hold,
+# so each worker can tell when another one changed the data behind its caches
+LEDGER_VERSION = 'ledger_version'  # journal postings
+BOOKS_VERSION = 'books_version'  # chart of accounts, period closes and archived years
+
+def reserve_numbers(name, count, last_used=0):
+    """Reserve count consecutive numbers from a named sequence and return the first
+    
+    The block is taken with one UPDATE ... RETURNING, so concurrent callers
+    queue on the sequence row and never get overlapping blocks. last_used
+    is the highest number already in use (e.g. read from the last
+    document); the sequence moves past it so numbers issued outside the
+    sequence are never repeated.
+    """
+    table = DocumentSequence.__table__
+    statement = update(table).where(table.c.name == name).values(
+        last_value=case((table.c.last_value > last_used, table.c.last_value), else_=last_used) + count
+    ).returning(table.c.last_value)
+    
+    last_value = db.session.execute(statement).scalar()
+    if last_value is None:
+        # First use: create the row; a concurrent first caller may win the insert
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(table).values(name=name, last_value=0))
+        except IntegrityError:
+            pass
+        last_value = db.session.execute(statement).scalar()
+    return last_value - count + 1
+
+def read_sequences(names):
+    """Get the last values of named sequences with one query, 0 for sequences not used yet"""
+    values = dict(
+        db.session.query(DocumentSequence.name, DocumentSequence.last_value).filter(DocumentSequence.name.in_(names)).all()
+    )
+    return tuple(values.get(name, 0) for name in names)
+
+def advance_sequence(connection, name):
+    """Advance a named sequence by one on a Core connection, e.g. from a mapper event"""
+    table = DocumentSequence.__table__
+    advanced = connection.execute(
+        update(table).where(table.c.name == name).values(last_value=table.c.last_value + 1)
+    ).rowcount
+    if not advanced:
+        connection.execute(insert(table).values(name=name, last_value=1))
@@ -0,0 +1,322 @@
+from sqlalchemy import func, case, and_, event
+from dateutil.relativedelta import relativedelta
+from datetime import timedelta
+from collections import OrderedDict
+import threading
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import Account, db
+from app.models.money import to_minor_units
+from app.services.account_balances import POSTED_STATUSES, get_snapshot_period, get_snapshot_totals, signed_balance
+from app.services.archive import journal_tables
+from app.services.document_numbers import read_sequences, advance_sequence, LEDGER_VERSION, BOOKS_VERSION
+
+INCOME_TYPES = ('revenue', 'expense')
+BALANCE_SHEET_TYPES = ('asset', 'liability', 'equity')
+BASES = ('previous_period', 'previous_year')
+
+class StatementCache:
+    """Cached statements keyed by (statement, period, basis)
+    
+    Postings committed by this process drop only the statements they
+    touch. Every lookup also compares the ledger and books versions with
+    the ones the cache holds, so postings by other worker processes,
+    account changes, period closes and reopens, and archiving drop
+    everything.
+    """
+    
+    def __init__(self, max_entries=256):
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+        self.versions = None
+        self.lock = threading.Lock()
+    
+    def get(self, key):
+        """Get (cached statement or None, versions to store a new statement under)"""
+        versions = read_sequences((LEDGER_VERSION, BOOKS_VERSION))
+        with self.lock:
+            if versions != self.versions:
+                self.entries.clear()
+                self.versions = versions
+            entry = self.entries.get(key)
+            if entry is None:
+                return None, versions
+            self.entries.move_to_end(key)
+            return entry['data'], versions
+    
+    def set(self, key, data, ranges, account_types, versions):
+        """Store a statement with the date ranges and account types it depends on
+        
+        A statement computed before the data changed again is not stored.
+        """
+        with self.lock:
+            if versions != self.versions:
+                return
+            self.entries[key] = {'data': data, 'ranges': ranges, 'account_types': account_types}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+    
+    def invalidate(self, postings, first_version, last_version):
+        """Drop statements whose period and account types a posting touched
+        
+        postings is a list of (entry_date, set of account types posted to),
+        committed as ledger versions first_version to last_version. When
+        another worker posted in between, the next lookup drops everything.
+        """
+        with self.lock:
+            if self.versions is None or self.versions[0] != first_version - 1:
+                return
+            self.versions = (last_version, self.versions[1])
+            for key in list(self.entries):
+                entry = self.entries[key]
+                for entry_date, account_types in postings:
+                    touches_period = any(
+                        (start is None or start <= entry_date) and entry_date <= end
+                        for start, end in entry['ranges']
+                    )
+                    if touches_period and not account_types.isdisjoint(entry['account_types']):
+                        del self.entries[key]
+                        break
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.versions = None
+
+statement_cache = StatementCache()
+
+@event.listens_for(Account, 'after_insert')
+@event.listens_for(Account, 'after_update')
+@event.listens_for(Account, 'after_delete')
+def _advance_books_version(mapper, connection, target):
+    """Account changes alter statements in every worker"""
+    advance_sequence(connection, BOOKS_VERSION)
+
+def get_comparative_range(start_date, end_date, basis):
+    """Get the comparison range for a period"""
+    if basis == 'previous_year':
+        return start_date - relativedelta(years=1), end_date - relativedelta(years=1)
+    
+    length = end_date - start_date
+    comparative_end = start_date - timedelta(days=1)
+    return comparative_end - length, comparative_end
+
+def _build_sections(accounts, amounts, account_types):
+    """Group per-account amounts into sections and subtype subtotals"""
+    sections = {account_type: {'accounts': [], 'subtotals': {}, 'total': [0.0, 0.0]} for account_type in account_types}
+    
+    for account in accounts:
+        current, comparative = amounts.get(account.id, (0.0, 0.0))
+        if not current and not comparative:
+            continue
+        
+        section = sections[account.account_type]
+        section['accounts'].append({
+            'account_id': account.id,
+            'code': account.code,
+            'name': account.name,
+            'name_en': account.name_en,
+            'account_subtype': account.account_subtype,
+            'current': round(current, 2),
+            'comparative': round(comparative, 2)
+        })
+        
+        subtotal = section['subtotals'].setdefault(account.account_subtype or 'other', [0.0, 0.0])
+        subtotal[0] += current
+        subtotal[1] += comparative
+        section['total'][0] += current
+        section['total'][1] += comparative
+    
+    for section in sections.values():
+        section['subtotals'] = {
+            subtype: {'current': round(current, 2), 'comparative': round(comparative, 2)}
+            for subtype, (current, comparative) in section['subtotals'].items()
+        }
+        section['total'] = {'current': round(section['total'][0], 2), 'comparative': round(section['total'][1], 2)}
+    
+    return sections
+
+def _get_accounts(account_types):
+    return db.session.query(
+        Account.id, Account.code, Account.name, Account.name_en,
+        Account.account_type, Account.account_subtype,
+        Account.normal_balance, Account.opening_balance
+    ).filter(Account.account_type.in_(account_types)).order_by(Account.code).all()
+
+def generate_income_statement(start_date, end_date, basis='previous_period'):
+    """Generate an income statement with a comparative column"""
+    key = ('income_statement', start_date, end_date, basis)
+    cached, versions = statement_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    comparative_start, comparative_end = get_comparative_range(start_date, end_date, basis)
+    entries, entry_lines = journal_tables(min(start_date, comparative_start), max(end_date, comparative_end))
+    in_current = and_(entries.entry_date >= start_date, entries.entry_date <= end_date)
+    in_comparative = and_(entries.entry_date >= comparative_start, entries.entry_date <= comparative_end)
+    net_debit = entry_lines.debit_amount - entry_lines.credit_amount
+    
+    # One grouped aggregate covers both columns
+    rows = db.session.query(
+        entry_lines.account_id,
+        func.sum(case((in_current, net_debit), else_=0.0)).label('current'),
+        func.sum(case((in_comparative, net_debit), else_=0.0)).label('comparative')
+    ).join(
+        entries, entries.id == entry_lines.journal_entry_id
+    ).join(
+        Account, Account.id == entry_lines.account_id
+    ).filter(
+        entries.status.in_(POSTED_STATUSES),
+        Account.account_type.in_(INCOME_TYPES),
+        entries.entry_date >= min(start_date, comparative_start),
+        entries.entry_date <= max(end_date, comparative_end)
+    ).group_by(entry_lines.account_id).all()
+    
+    accounts = _get_accounts(INCOME_TYPES)
+    normal_balances = {account.id: account.normal_balance for account in accounts}
+    amounts = {
+        row.account_id: (
+            signed_balance(normal_balances.get(row.account_id), row.current or 0, 0),
+            signed_balance(normal_balances.get(row.account_id), row.comparative or 0, 0)
+        )
+        for row in rows
+    }
+    
+    sections = _build_sections(accounts, amounts, INCOME_TYPES)
+    revenue, expense = sections['revenue']['total'], sections['expense']['total']
+    
+    statement = {
+        'statement': 'income_statement',
+        'basis': basis,
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'comparative_start_date': comparative_start.isoformat(),
+        'comparative_end_date': comparative_end.isoformat(),
+        'sections': sections,
+        'net_income': {
+            'current': round(revenue['current'] - expense['current'], 2),
+            'comparative': round(revenue['comparative'] - expense['comparative'], 2)
+        }
+    }
+    
+    statement_cache.set(
+        key, statement,
+        [(start_date, end_date), (comparative_start, comparative_end)],
+        INCOME_TYPES,
+        versions
+    )
+    return statement
+
+def generate_balance_sheet(as_of_date, basis='previous_period'):
+    """Generate a balance sheet with a comparative column
+    
+    The previous_period basis compares against the end of the prior month.
+    """
+    key = ('balance_sheet', as_of_date, basis)
+    cached, versions = statement_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    if basis == 'previous_year':
+        comparative_date = as_of_date - relativedelta(years=1)
+    else:
+        comparative_date = as_of_date.replace(day=1) - timedelta(days=1)
+    
+    # Seed from the closed-period snapshot that precedes both columns
+    period = get_snapshot_period(min(as_of_date, comparative_date))
+    entries, entry_lines = journal_tables(period.end_date + timedelta(days=1) if period else None, max(as_of_date, comparative_date))
+    net_debit = entry_lines.debit_amount - entry_lines.credit_amount
+    
+    query = db.session.query(
+        entry_lines.account_id,
+        func.sum(case((entries.entry_date <= as_of_date, net_debit), else_=0.0)).label('current'),
+        func.sum(case((entries.entry_date <= comparative_date, net_debit), else_=0.0)).label('comparative')
+    ).join(
+        entries, entries.id == entry_lines.journal_entry_id
+    ).filter(
+        entries.status.in_(POSTED_STATUSES),
+        entries.entry_date <= max(as_of_date, comparative_date)
+    )
+    
+    if period:
+        query = query.filter(entries.entry_date > period.end_date)
+    
+    net_debits = {}
+    for account_id, (debit, credit) in get_snapshot_totals(period).items():
+        net_debits[account_id] = [debit - credit, debit - credit]
+    
+    for row in query.group_by(entry_lines.account_id):
+        totals = net_debits.setdefault(row.account_id, [0.0, 0.0])
+        totals[0] += row.current or 0
+        totals[1] += row.comparative or 0
+    
+    accounts = _get_accounts(BALANCE_SHEET_TYPES + INCOME_TYPES)
+    amounts = {}
+    retained_earnings = [0.0, 0.0]
+    for account in accounts:
+        current, comparative = net_debits.get(account.id, (0.0, 0.0))
+        opening = account.opening_balance or 0
+        balances = (
+            opening + signed_balance(account.normal_balance, current, 0),
+            opening + signed_balance(account.normal_balance, comparative, 0)
+        )
+        if account.account_type in INCOME_TYPES:
+            # Unclosed revenue and expense roll into equity as retained earnings
+            sign = 1 if account.account_type == 'revenue' else -1
+            retained_earnings[0] += sign * balances[0]
+            retained_earnings[1] += sign * balances[1]
+        else:
+            amounts[account.id] = balances
+    
+    sections = _build_sections(
+        [account for account in accounts if account.account_type in BALANCE_SHEET_TYPES],
+        amounts, BALANCE_SHEET_TYPES
+    )
+    
+    equity = sections['equity']
+    equity['accounts'].append({
+        'account_id': None,
+        'code': None,
+        'name': 'الأرباح المحتجزة',
+        'name_en': 'Retained Earnings',
+        'account_subtype': 'retained_earnings',
+        'current': round(retained_earnings[0], 2),
+        'comparative': round(retained_earnings[1], 2)
+    })
+    equity['subtotals']['retained_earnings'] = {
+        'current': round(retained_earnings[0], 2),
+        'comparative': round(retained_earnings[1], 2)
+    }
+    equity['total'] = {
+        'current': round(equity['total']['current'] + retained_earnings[0], 2),
+        'comparative': round(equity['total']['comparative'] + retained_earnings[1], 2)
+    }
+    
+    assets = sections['asset']['total']
+    liabilities = sections['liability']['total']
+    
+    statement = {
+        'statement': 'balance_sheet',
+        'basis': basis,
+        'as_of_date': as_of_date.isoformat(),
+        'comparative_date': comparative_date.isoformat(),
+        'sections': sections,
+        'total_liabilities_and_equity': {
+            'current': round(liabilities['current'] + equity['total']['current'], 2),
+            'comparative': round(liabilities['comparative'] + equity['total']['comparative'], 2)
+        },
+        'is_balanced': to_minor_units(assets['current']) == to_minor_units(liabilities['current']) + to_minor_units(equity['total']['current'])
+    }
+    
+    statement_cache.set(
+        key, statement,
+        [(None, max(as_of_date, comparative_date))],
+        BALANCE_SHEET_TYPES + INCOME_TYPES,
+        versions
+    )
+    return statement
@@ -0,0 +1,270 @@
+from sqlalchemy import select, update, bindparam, insert
+from datetime import datetime, timedelta
+from bisect import bisect_right
+import threading
+import numpy as np
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import ExchangeRate, JournalEntry, db
+from app.models.company import Company
+from app.models.invoice import Invoice
+from app.models.purchase import Purchase
+from app.models.money import minor_units, from_minor_units
+from app.services.journal_posting import post_journal_batch
+from app.services.posting_rules import posting_accounts
+
+DEFAULT_BASE_CURRENCY = 'SAR'
+
+# Open foreign-currency documents by type: (model, date column, control account role)
+OPEN_DOCUMENTS = {
+    'invoice': (Invoice, Invoice.invoice_date, 'receivable'),
+    'purchase': (Purchase, Purchase.purchase_date, 'payable')
+}
+
+CLOSED_DOCUMENT_STATUSES = ('draft', 'cancelled')
+
+class RateTable:
+    """Exchange rates per currency as sorted date ordinals, loaded once and cached"""
+    
+    def __init__(self):
+        self.currencies = None
+        self.lock = threading.Lock()
+    
+    def load(self):
+        currencies = {}
+        rows = db.session.query(
+            ExchangeRate.currency, ExchangeRate.rate_date, ExchangeRate.rate
+        ).order_by(ExchangeRate.currency, ExchangeRate.rate_date).all()
+        for currency, rate_date, rate in rows:
+            days, rates = currencies.setdefault(currency, ([], []))
+            days.append(rate_date.toordinal())
+            rates.append(rate)
+        return currencies
+    
+    def rate_on(self, currency, rate_date):
+        """Get the latest rate on or before a date, or None when there is none"""
+        currencies = self.currencies
+        if currencies is None:
+            with self.lock:
+                if self.currencies is None:
+                    self.currencies = self.load()
+                currencies = self.currencies
+        
+        if currency not in currencies:
+            return None
+        days, rates = currencies[currency]
+        position = bisect_right(days, rate_date.toordinal())
+        return rates[position - 1] if position else None
+    
+    def clear(self):
+        with self.lock:
+            self.currencies = None
+
+exchange_rates = RateTable()
+
+def get_base_currency():
+    """Get the base currency from the company settings"""
+    company = Company.query.first()
+    return company.currency if company is not None and company.currency else DEFAULT_BASE_CURRENCY
+
+def get_rate(currency, rate_date, base_currency=None):
+    """Get the rate to convert one unit of currency into the base currency"""
+    if currency == (base_currency or get_base_currency()):
+        return 1.0
+    return exchange_rates.rate_on(currency, rate_date)
+
+def save_rates(rates, source=None):
+    """Insert or update exchange rates in bulk
+    
+    rates is a list of dicts with currency, rate_date and rate.
+    """
+    if not rates:
+        return 0
+    
+    keys = {(rate['currency'], rate['rate_date']) for rate in rates}
+    existing = {
+        (row.currency, row.rate_date): row.id
+        for row in db.session.query(ExchangeRate.id, ExchangeRate.currency, ExchangeRate.rate_date).filter(
+            ExchangeRate.currency.in_({currency for currency, _ in keys}),
+            ExchangeRate.rate_date.in_({rate_date for _, rate_date in keys})
+        )
+    }
+    
+    now = datetime.utcnow()
+    new_rows, changed_rows = [], []
+    for rate in rates:
+        rate_id = existing.get((rate['currency'], rate['rate_date']))
+        if rate_id:
+            changed_rows.append({'b_rate_id': rate_id, 'b_rate': rate['rate'], 'b_source': source})
+        else:
+            new_rows.append({
+                'currency': rate['currency'],
+                'rate_date': rate['rate_date'],
+                'rate': rate['rate'],
+                'source': source,
+                'created_at': now,
+                'updated_at': now
+            })
+    
+    try:
+        if new_rows:
+            db.session.execute(insert(ExchangeRate), new_rows)
+        if changed_rows:
+            table = ExchangeRate.__table__
+            db.session.execute(
+                update(table).where(table.c.id == bindparam('b_rate_id')).values(
+                    rate=bindparam('b_rate'), source=bindparam('b_source'), updated_at=now
+                ),
+                changed_rows
+            )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    
+    exchange_rates.clear()
+    return len(new_rows) + len(changed_rows)
+
+def load_open_items(document_type, as_of_date, base_currency):
+    """Load open foreign-currency documents as arrays (balance in minor units, currency, booking rate)"""
+    model, date_column, _ = OPEN_DOCUMENTS[document_type]
+    rows = db.session.execute(
+        select(
+            minor_units(model.balance_due), model.currency, model.exchange_rate
+        ).where(
+            model.currency != base_currency,
+            model.balance_due != 0,
+            model.status.notin_(CLOSED_DOCUMENT_STATUSES),
+            date_column <= as_of_date
+        ).execution_options(yield_per=50000)
+    ).all()
+    
+    balances = np.fromiter((row[0] or 0 for row in rows), dtype=np.int64, count=len(rows))
+    currencies = [row[1] for row in rows]
+    booked_rates = np.fromiter((row[2] or 1.0 for row in rows), dtype=np.float64, count=len(rows))
+    return balances, currencies, booked_rates
+
+def compute_revaluation(balances, currencies, booked_rates, as_of_date, base_currency):
+    """Compute unrealized differences per currency in minor units
+    
+    Every open item is valued at its booking rate and at the closing rate;
+    the difference is the unrealized gain (positive) or loss (negative) on
+    the balance in base currency.
+    """
+    if not len(balances):
+        return {}
+    
+    codes, currency_index = np.unique(np.array(currencies, dtype='U3'), return_inverse=True)
+    closing = []
+    for currency in codes:
+        rate = get_rate(currency, as_of_date, base_currency)
+        if rate is None:
+            raise ValueError(f"No exchange rate for {currency} on or before {as_of_date.isoformat()}")
+        closing.append(rate)
+    closing_rates = np.asarray(closing, dtype=np.float64)[currency_index]
+    
+    booked = np.rint(balances * booked_rates).astype(np.int64)
+    revalued = np.rint(balances * closing_rates).astype(np.int64)
+    differences = np.bincount(currency_index, weights=revalued - booked, minlength=len(codes))
+    counts = np.bincount(currency_index, minlength=len(codes))
+    
+    return {
+        str(currency): {
+            'items': int(count),
+            'closing_rate': float(rate),
+            'difference': int(round(difference))
+        }
+        for currency, rate, difference, count in zip(codes, closing, differences, counts)
+    }
+
+def revalue_open_items(as_of_date, posted_by_user_id, post=True, base_currency=None):
+    """Month-end revaluation of open foreign-currency receivables and payables
+    
+    Posts one adjustment entry at as_of_date and its reversal on the next
+    day, so every run is measured against the original booking rates.
+    """
+    base_currency = base_currency or get_base_currency()
+    posting_accounts.refresh()
+    
+    results = {}
+    lines = []
+    net_gain = 0
+    for document_type, (_, _, role) in OPEN_DOCUMENTS.items():
+        by_currency = compute_revaluation(*load_open_items(document_type, as_of_date, base_currency), as_of_date, base_currency)
+        difference = sum(item['difference'] for item in by_currency.values())
+        results[document_type] = {
+            'currencies': {
+                currency: dict(item, difference=from_minor_units(item['difference']))
+                for currency, item in by_currency.items()
+            },
+            'difference': from_minor_units(difference)
+        }
+        if not difference:
+            continue
+        
+        # A higher receivable is a gain; a higher payable is a loss
+        gain = difference if role == 'receivable' else -difference
+        net_gain += gain
+        amount = from_minor_units(abs(difference))
+        increases = difference > 0
+        debit = increases if role == 'receivable' else not increases
+        lines.append({
+            'account_id': posting_accounts.resolve(role),
+            'debit_amount': amount if debit else 0,
+            'credit_amount': 0 if debit else amount
+        })
+    
+    if net_gain:
+        amount = from_minor_units(abs(net_gain))
+        lines.append({
+            'account_id': posting_accounts.resolve('fx_gain' if net_gain > 0 else 'fx_loss'),
+            'debit_amount': 0 if net_gain > 0 else amount,
+            'credit_amount': amount if net_gain > 0 else 0
+        })
+    
+    summary = {
+        'as_of_date': as_of_date.isoformat(),
+        'base_currency': base_currency,
+        'documents': results,
+        'net_gain': from_minor_units(net_gain),
+        'journal_entry_ids': []
+    }
+    
+    if not post or not lines:
+        return summary
+    
+    already_posted = db.session.query(JournalEntry.id).filter(
+        JournalEntry.reference_type == 'fx_revaluation',
+        JournalEntry.entry_date == as_of_date,
+        JournalEntry.status == 'posted'
+    ).first()
+    if already_posted:
+        raise ValueError(f"Foreign currency revaluation for {as_of_date.isoformat()} is already posted")
+    
+    reversal_lines = [
+        {'account_id': line['account_id'], 'debit_amount': line['credit_amount'], 'credit_amount': line['debit_amount']}
+        for line in lines
+    ]
+    reference_number = f"FX-{as_of_date.strftime('%Y%m%d')}"
+    summary['journal_entry_ids'] = post_journal_batch([
+        {
+            'entry_date': as_of_date,
+            'description': f"Foreign currency revaluation {as_of_date.isoformat()}",
+            'reference_type': 'fx_revaluation',
+            'reference_number': reference_number,
+            'lines': lines
+        },
+        {
+            'entry_date': as_of_date + timedelta(days=1),
+            'description': f"Reversal of foreign currency revaluation {as_of_date.isoformat()}",
+            'reference_type': 'fx_revaluation_reversal',
+            'reference_number': reference_number,
+            'lines': reversal_lines
+        }
+    ], posted_by_user_id)
+    
+    return summary
@@ -0,0 +1,147 @@
+from sqlalchemy import select, func, case, tuple_
+from datetime import timedelta, datetime
+import base64
+import csv
+import io
+import json
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import Account, db
+from app.services.account_balances import POSTED_STATUSES, get_account_balances
+from app.services.archive import journal_tables
+
+LEDGER_COLUMNS = [
+    'line_id', 'account_id', 'account_code', 'account_name', 'journal_entry_id', 'entry_number',
+    'entry_date', 'entry_description', 'line_description', 'reference_type', 'reference_number',
+    'debit_amount', 'credit_amount', 'running_balance'
+]
+
+def build_ledger_query(start_date, end_date, account_ids=None):
+    """Select posted lines joined to headers and accounts with a running balance per account"""
+    entries, entry_lines = journal_tables(start_date, end_date)
+    
+    signed_amount = case(
+        (Account.normal_balance == 'debit', entry_lines.debit_amount - entry_lines.credit_amount),
+        else_=entry_lines.credit_amount - entry_lines.debit_amount
+    )
+    
+    query = select(
+        entry_lines.id.label('line_id'),
+        entry_lines.account_id,
+        Account.code.label('account_code'),
+        Account.name.label('account_name'),
+        entries.id.label('journal_entry_id'),
+        entries.entry_number,
+        entries.entry_date,
+        entries.description.label('entry_description'),
+        entry_lines.description.label('line_description'),
+        entries.reference_type,
+        entries.reference_number,
+        entry_lines.debit_amount,
+        entry_lines.credit_amount,
+        func.sum(signed_amount).over(
+            partition_by=entry_lines.account_id,
+            order_by=(entries.entry_date, entry_lines.id)
+        ).label('period_balance')
+    ).join(
+        entries, entries.id == entry_lines.journal_entry_id
+    ).join(
+        Account, Account.id == entry_lines.account_id
+    ).where(
+        entries.status.in_(POSTED_STATUSES),
+        entries.entry_date >= start_date,
+        entries.entry_date <= end_date
+    )
+    
+    if account_ids:
+        query = query.where(entry_lines.account_id.in_(account_ids))
+    
+    return query.subquery()
+
+def _row_to_dict(row, opening_balances):
+    return {
+        'line_id': row.line_id,
+        'account_id': row.account_id,
+        'account_code': row.account_code,
+        'account_name': row.account_name,
+        'journal_entry_id': row.journal_entry_id,
+        'entry_number': row.entry_number,
+        'entry_date': row.entry_date.isoformat(),
+        'entry_description': row.entry_description,
+        'line_description': row.line_description,
+        'reference_type': row.reference_type,
+        'reference_number': row.reference_number,
+        'debit_amount': row.debit_amount,
+        'credit_amount': row.credit_amount,
+        'running_balance': round(opening_balances.get(row.account_id, 0) + (row.period_balance or 0), 2)
+    }
+
+def encode_cursor(row):
+    """Encode the keyset position of a ledger row"""
+    value = f"{row['account_code']}|{row['entry_date']}|{row['line_id']}"
+    return base64.urlsafe_b64encode(value.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """Decode a keyset position produced by encode_cursor"""
+    account_code, entry_date, line_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').rsplit('|', 2)
+    return account_code, datetime.strptime(entry_date, '%Y-%m-%d').date(), int(line_id)
+
+def _ordered(ledger, cursor=None):
+    query = select(ledger)
+    if cursor:
+        query = query.where(
+            tuple_(ledger.c.account_code, ledger.c.entry_date, ledger.c.line_id) > tuple_(*decode_cursor(cursor))
+        )
+    return query.order_by(ledger.c.account_code, ledger.c.entry_date, ledger.c.line_id)
+
+def get_ledger_page(start_date, end_date, account_ids=None, cursor=None, limit=100):
+    """Get one page of the general ledger using keyset pagination"""
+    ledger = build_ledger_query(start_date, end_date, account_ids)
+    rows = db.session.execute(_ordered(ledger, cursor).limit(limit + 1)).all()
+    
+    page_account_ids = list({row.account_id for row in rows})
+    opening_balances = get_account_balances(page_account_ids, start_date - timedelta(days=1)) if rows else {}
+    
+    lines = [_row_to_dict(row, opening_balances) for row in rows[:limit]]
+    
+    return {
+        'lines': lines,
+        'opening_balances': {str(account_id): round(balance, 2) for account_id, balance in opening_balances.items()},
+        'next_cursor': encode_cursor(lines[-1]) if len(rows) > limit else None,
+        'has_next': len(rows) > limit
+    }
+
+def iter_ledger_rows(start_date, end_date, account_ids=None, batch_size=1000):
+    """Stream the general ledger through a server-side cursor"""
+    opening_balances = get_account_balances(account_ids, start_date - timedelta(days=1))
+    ledger = build_ledger_query(start_date, end_date, account_ids)
+    
+    result = db.session.execute(
+        _ordered(ledger).execution_options(stream_results=True, yield_per=batch_size)
+    )
+    for row in result:
+        yield _row_to_dict(row, opening_balances)
+
+def iter_ndjson(rows):
+    """Serialize ledger rows as newline-delimited JSON"""
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+def iter_csv(rows, chunk_size=500, columns=LEDGER_COLUMNS):
+    """Serialize ledger rows as CSV in chunks"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    writer.writeheader()
+    
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    
+    yield buffer.getvalue()
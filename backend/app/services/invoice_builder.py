@@ -0,0 +1,434 @@
+from sqlalchemy import insert, update, bindparam, func
+from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+import numpy as np
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import db
+from app.models.money import Money, to_minor_units, from_minor_units
+from app.models.invoice import Invoice, InvoiceItem
+from app.models.customer import Customer
+from app.models.product import Product
+from app.models.company import Company
+from app.models.inventory import InventoryMovement
+from app.services.document_numbers import reserve_numbers
+from app.services.sales_cube import collect_sales_deltas, apply_sales_deltas
+
+# Drafts and cancelled invoices neither move stock nor change what the customer owes
+UNISSUED_STATUSES = ('draft', 'cancelled')
+
+DEFAULT_INVOICE_PREFIX = 'INV'
+
+def _percentage_of(minor, percentage):
+    """Get a percentage of a minor-unit amount, rounded half up to whole minor units"""
+    if not percentage:
+        return 0
+    return int((Decimal(minor) * Decimal(str(percentage)) / 100).to_integral_value(rounding=ROUND_HALF_UP))
+
+def allocate_invoice_numbers(count):
+    """Reserve a block of invoice numbers from the company counter with one UPDATE ... RETURNING"""
+    company = db.session.query(Company.id, Company.invoice_prefix).first()
+    year = datetime.now().year
+    if company is None:
+        last_invoice = db.session.query(Invoice.invoice_number).order_by(Invoice.id.desc()).first()
+        last_number = int(last_invoice.invoice_number.rsplit('-', 1)[1]) if last_invoice else 0
+        first_number = reserve_numbers('invoice', count, last_number)
+        return [f"{DEFAULT_INVOICE_PREFIX}-{year}-{str(first_number + offset).zfill(3)}" for offset in range(count)]
+    
+    # The counter holds the next number to issue; the row lock makes concurrent blocks queue
+    table = Company.__table__
+    next_counter = db.session.execute(
+        update(table).where(table.c.id == company.id).values(
+            invoice_counter=func.coalesce(table.c.invoice_counter, 1) + count
+        ).returning(table.c.invoice_counter)
+    ).scalar()
+    first_number = next_counter - count
+    prefix = company.invoice_prefix or DEFAULT_INVOICE_PREFIX
+    return [f"{prefix}-{year}-{str(first_number + offset).zfill(3)}" for offset in range(count)]
+
+def calculate_item_totals(item, product=None):
+    """Compute one line's amounts in minor units, defaulting name, price and tax from its product"""
+    quantity = item['quantity']
+    if not quantity or quantity <= 0:
+        raise ValueError('Item quantity must be greater than zero')
+    
+    unit_price = item.get('unit_price')
+    if unit_price is None:
+        if product is None:
+            raise ValueError('unit_price is required for items without a product')
+        unit_price = product.selling_price or 0
+    is_taxable = item.get('is_taxable')
+    if is_taxable is None:
+        is_taxable = product.is_taxable if product is not None else True
+    tax_rate = item.get('tax_rate')
+    if tax_rate is None:
+        tax_rate = product.tax_rate if product is not None else 15.0
+    
+    subtotal = to_minor_units(quantity * unit_price)
+    discount_percentage = item.get('discount_percentage') or 0
+    if discount_percentage > 0:
+        discount = _percentage_of(subtotal, discount_percentage)
+    else:
+        discount = to_minor_units(item.get('discount_amount') or 0)
+    tax = _percentage_of(subtotal - discount, tax_rate) if is_taxable else 0
+    
+    return {
+        'product_id': item.get('product_id'),
+        'item_name': item.get('item_name') or (product.name if product is not None else None),
+        'item_description': item.get('item_description'),
+        'quantity': quantity,
+        'unit': item.get('unit') or (product.unit if product is not None else 'piece'),
+        'unit_price': unit_price,
+        'discount_percentage': discount_percentage,
+        'discount_amount': discount,
+        'is_taxable': is_taxable,
+        'tax_rate': tax_rate,
+        'tax_amount': tax,
+        'subtotal': subtotal,
+        'total_amount': subtotal - discount + tax
+    }
+
+def _percentages_of(minor, percentages):
+    """Vectorized _percentage_of: percentages are taken to four decimals, ties round away from zero"""
+    basis_points = np.rint(percentages * 10000).astype(np.int64)
+    return np.sign(minor) * ((np.abs(minor) * basis_points + 500000) // 1000000)
+
+def _amounts_to_minor_units(amounts):
+    """Vectorized to_minor_units; each distinct amount is converted once, so results match exactly"""
+    values, inverse = np.unique(amounts, return_inverse=True)
+    return np.array([to_minor_units(value) for value in values.tolist()], dtype=np.int64)[inverse]
+
+def calculate_items_totals(items, products):
+    """Compute many lines' amounts at once; same results as calculate_item_totals per item
+    
+    Defaults are resolved per item, then subtotals, discounts and taxes
+    are computed as integer arrays across all items.
+    """
+    lines = []
+    for item in items:
+        product = products.get(item.get('product_id'))
+        quantity = item['quantity']
+        if not quantity or quantity <= 0:
+            raise ValueError('Item quantity must be greater than zero')
+        unit_price = item.get('unit_price')
+        if unit_price is None:
+            if product is None:
+                raise ValueError('unit_price is required for items without a product')
+            unit_price = product.selling_price or 0
+        is_taxable = item.get('is_taxable')
+        tax_rate = item.get('tax_rate')
+        lines.append({
+            'product_id': item.get('product_id'),
+            'item_name': item.get('item_name') or (product.name if product is not None else None),
+            'item_description': item.get('item_description'),
+            'quantity': quantity,
+            'unit': item.get('unit') or (product.unit if product is not None else 'piece'),
+            'unit_price': unit_price,
+            'discount_percentage': item.get('discount_percentage') or 0,
+            'is_taxable': is_taxable if is_taxable is not None else (product.is_taxable if product is not None else True),
+            'tax_rate': tax_rate if tax_rate is not None else (product.tax_rate if product is not None else 15.0)
+        })
+    if not lines:
+        return lines
+    
+    count = len(lines)
+    quantities = np.fromiter((line['quantity'] for line in lines), dtype=np.float64, count=count)
+    unit_prices = np.fromiter((line['unit_price'] for line in lines), dtype=np.float64, count=count)
+    discount_percentages = np.fromiter((line['discount_percentage'] for line in lines), dtype=np.float64, count=count)
+    discount_amounts = np.fromiter((item.get('discount_amount') or 0 for item in items), dtype=np.float64, count=count)
+    taxable = np.fromiter((bool(line['is_taxable']) for line in lines), dtype=bool, count=count)
+    tax_rates = np.fromiter((line['tax_rate'] or 0 for line in lines), dtype=np.float64, count=count)
+    
+    subtotals = _amounts_to_minor_units(quantities * unit_prices)
+    discounts = np.where(
+        discount_percentages > 0,
+        _percentages_of(subtotals, discount_percentages),
+        _amounts_to_minor_units(discount_amounts)
+    )
+    taxes = np.where(taxable, _percentages_of(subtotals - discounts, tax_rates), 0)
+    totals = subtotals - discounts + taxes
+    
+    for line, subtotal, discount, tax, total in zip(lines, subtotals.tolist(), discounts.tolist(), taxes.tolist(), totals.tolist()):
+        line['subtotal'] = subtotal
+        line['discount_amount'] = discount
+        line['tax_amount'] = tax
+        line['total_amount'] = total
+    return lines
+
+def calculate_invoice_totals(invoice, lines):
+    """Compute header amounts in minor units from already calculated lines
+    
+    The subtotal is the lines' net amount after line discounts; tax is the
+    sum of line taxes, so a header discount does not reduce VAT.
+    """
+    subtotal = sum(line['subtotal'] - line['discount_amount'] for line in lines)
+    discount_percentage = invoice.get('discount_percentage') or 0
+    if discount_percentage > 0:
+        discount = _percentage_of(subtotal, discount_percentage)
+    else:
+        discount = to_minor_units(invoice.get('discount_amount') or 0)
+    tax = sum(line['tax_amount'] for line in lines)
+    total = subtotal - discount + tax
+    paid = to_minor_units(invoice.get('paid_amount') or 0)
+    
+    return {
+        'subtotal': subtotal,
+        'discount_percentage': discount_percentage,
+        'discount_amount': discount,
+        'tax_amount': tax,
+        'total_amount': total,
+        'paid_amount': paid,
+        'balance_due': total - paid
+    }
+
+def load_products(item_groups):
+    """Load the products named by groups of items or lines, keyed by id"""
+    product_ids = {item['product_id'] for items in item_groups for item in items if item.get('product_id')}
+    if not product_ids:
+        return {}
+    products = db.session.query(
+        Product.id, Product.name, Product.unit, Product.type, Product.category_id, Product.selling_price, Product.cost_price,
+        Product.is_taxable, Product.tax_rate, Product.track_inventory, Product.allow_negative_stock
+    ).filter(Product.id.in_(product_ids)).all()
+    found = {product.id: product for product in products}
+    for product_id in product_ids:
+        if product_id not in found:
+            raise ValueError(f"Product {product_id} does not exist")
+    return found
+
+def _load_customers(invoices):
+    customer_ids = {invoice['customer_id'] for invoice in invoices}
+    customers = db.session.query(
+        Customer.id, Customer.name, Customer.payment_terms, Customer.currency, Customer.status
+    ).filter(Customer.id.in_(customer_ids)).all()
+    found = {customer.id: customer for customer in customers}
+    for customer_id in customer_ids:
+        customer = found.get(customer_id)
+        if customer is None:
+            raise ValueError(f"Customer {customer_id} does not exist")
+        if customer.status == 'blocked':
+            raise ValueError(f"Customer {customer_id} is blocked")
+    return found
+
+def _take_stock(stock_deltas, products, now):
+    """Decrement stock where enough is left and return each product's stock before the batch
+    
+    The check is part of each UPDATE, so concurrent sales queue on the
+    product row and cannot both take the last units. Products are updated
+    in id order so concurrent batches lock them in the same order.
+    """
+    table = Product.__table__
+    current_stock = func.coalesce(table.c.current_stock, 0)
+    stock = {}
+    for product_id in sorted(stock_deltas):
+        quantity = stock_deltas[product_id]
+        new_stock = db.session.execute(
+            update(table).where(
+                table.c.id == product_id,
+                table.c.allow_negative_stock.is_(True) | (current_stock >= quantity)
+            ).values(current_stock=current_stock - quantity, updated_at=now).returning(table.c.current_stock)
+        ).scalar()
+        if new_stock is None:
+            raise ValueError(f"Insufficient stock for {products[product_id].name}")
+        stock[product_id] = new_stock + quantity
+    return stock
+
+def create_invoices(invoices, created_by, commit=True, calculated_lines=None):
+    """Create a batch of invoices with their items in one transaction
+    
+    Each invoice is a dict with customer_id, items and optional invoice_date,
+    due_date, status (default 'sent'), discount_percentage/discount_amount,
+    notes, terms_conditions, reference, currency and exchange_rate. Items
+    take product_id and/or item_name, quantity and optional unit_price,
+    discounts and tax settings (defaulting from the product).
+    
+    All totals are computed in memory; headers, items and stock movements
+    are bulk inserted, each product's stock is checked and decremented by
+    one conditional UPDATE, and customer balances and the sales cube are
+    updated with one executemany statement each, so the batch costs one
+    commit.
+    """
+    if not invoices:
+        return []
+    
+    try:
+        products = load_products(calculated_lines if calculated_lines is not None else [invoice.get('items') or [] for invoice in invoices])
+        customers = _load_customers(invoices)
+        
+        today = datetime.now().date()
+        now = datetime.utcnow()
+        invoice_numbers = allocate_invoice_numbers(len(invoices))
+        
+        header_rows, line_groups = [], []
+        for index, (invoice, invoice_number) in enumerate(zip(invoices, invoice_numbers)):
+            if calculated_lines is not None:
+                lines = calculated_lines[index]
+            elif invoice.get('items'):
+                lines = [calculate_item_totals(item, products.get(item.get('product_id'))) for item in invoice['items']]
+            else:
+                lines = None
+            if not lines:
+                raise ValueError(f"Invoice {invoice_number} has no items")
+            
+            for line in lines:
+                if not line['item_name']:
+                    raise ValueError(f"Invoice {invoice_number} has an item without a name")
+            totals = calculate_invoice_totals(invoice, lines)
+            
+            customer = customers[invoice['customer_id']]
+            invoice_date = invoice.get('invoice_date') or today
+            status = invoice.get('status') or 'sent'
+            if totals['balance_due'] <= 0 and status not in UNISSUED_STATUSES:
+                status, payment_status = 'paid', 'paid'
+            else:
+                payment_status = 'partial' if totals['paid_amount'] > 0 else 'unpaid'
+            
+            header_rows.append({
+                'invoice_number': invoice_number,
+                'customer_id': customer.id,
+                'invoice_date': invoice_date,
+                'due_date': invoice.get('due_date') or invoice_date + timedelta(days=customer.payment_terms or 0),
+                'subtotal': from_minor_units(totals['subtotal']),
+                'discount_amount': from_minor_units(totals['discount_amount']),
+                'discount_percentage': totals['discount_percentage'],
+                'tax_amount': from_minor_units(totals['tax_amount']),
+                'total_amount': from_minor_units(totals['total_amount']),
+                'paid_amount': from_minor_units(totals['paid_amount']),
+                'balance_due': from_minor_units(totals['balance_due']),
+                'status': status,
+                'payment_status': payment_status,
+                'notes': invoice.get('notes'),
+                'terms_conditions': invoice.get('terms_conditions'),
+                'reference': invoice.get('reference'),
+                'currency': invoice.get('currency') or customer.currency or 'SAR',
+                'exchange_rate': invoice.get('exchange_rate') or 1.0,
+                'created_by': created_by,
+                'created_at': now,
+                'updated_at': now
+            })
+            line_groups.append(lines)
+        
+        result = db.session.execute(
+            insert(Invoice).returning(Invoice.id, Invoice.invoice_number),
+            header_rows
+        )
+        invoice_ids = {row.invoice_number: row.id for row in result}
+        
+        item_rows, movement_rows = [], []
+        stock_deltas, customer_deltas, sales_deltas = {}, {}, {}
+        for header, lines in zip(header_rows, line_groups):
+            invoice_id = invoice_ids[header['invoice_number']]
+            issued = header['status'] not in UNISSUED_STATUSES
+            
+            for line in lines:
+                item_rows.append(dict(
+                    line,
+                    invoice_id=invoice_id,
+                    discount_amount=from_minor_units(line['discount_amount']),
+                    tax_amount=from_minor_units(line['tax_amount']),
+                    subtotal=from_minor_units(line['subtotal']),
+                    total_amount=from_minor_units(line['total_amount']),
+                    created_at=now,
+                    updated_at=now
+                ))
+                
+                product = products.get(line['product_id'])
+                if not issued or product is None or not product.track_inventory or product.type == 'service':
+                    continue
+                stock_deltas[product.id] = stock_deltas.get(product.id, 0) + line['quantity']
+                movement_rows.append({
+                    'product_id': product.id,
+                    'movement_type': 'sale',
+                    'quantity': line['quantity'],
+                    'unit_cost': product.cost_price or 0,
+                    'reference_type': 'invoice',
+                    'reference_id': invoice_id,
+                    'reference': header['invoice_number'],
+                    'created_by': created_by,
+                    'movement_date': now,
+                    'created_at': now
+                })
+            
+            if issued:
+                balance, purchases, last_date = customer_deltas.get(header['customer_id'], (0.0, 0.0, header['invoice_date']))
+                customer_deltas[header['customer_id']] = (
+                    balance + header['balance_due'],
+                    purchases + header['total_amount'],
+                    max(last_date, header['invoice_date'])
+                )
+                collect_sales_deltas(header, lines, products, sales_deltas)
+        
+        db.session.execute(insert(InvoiceItem), item_rows)
+        if movement_rows:
+            stock = _take_stock(stock_deltas, products, now)
+            for movement in movement_rows:
+                movement['old_stock'] = stock[movement['product_id']]
+                movement['new_stock'] = stock[movement['product_id']] = movement['old_stock'] - movement['quantity']
+            db.session.execute(insert(InventoryMovement), movement_rows)
+        
+        if customer_deltas:
+            customers_table = Customer.__table__
+            db.session.execute(
+                update(customers_table).where(customers_table.c.id == bindparam('b_customer_id')).values(
+                    current_balance=customers_table.c.current_balance + bindparam('b_balance', type_=Money()),
+                    total_purchases=customers_table.c.total_purchases + bindparam('b_purchases', type_=Money()),
+                    last_purchase_date=bindparam('b_last_date'),
+                    updated_at=now
+                ),
+                [
+                    {'b_customer_id': customer_id, 'b_balance': balance, 'b_purchases': purchases, 'b_last_date': last_date}
+                    for customer_id, (balance, purchases, last_date) in customer_deltas.items()
+                ]
+            )
+        
+        apply_sales_deltas(sales_deltas)
+        
+        if commit:
+            db.session.commit()
+    except Exception:
+        if commit:
+            db.session.rollback()
+        raise
+    
+    return [
+        {
+            'id': invoice_ids[header['invoice_number']],
+            'invoice_number': header['invoice_number'],
+            'customer_id': header['customer_id'],
+            'customer_name': customers[header['customer_id']].name,
+            'invoice_date': header['invoice_date'].isoformat(),
+            'due_date': header['due_date'].isoformat(),
+            'status': header['status'],
+            'payment_status': header['payment_status'],
+            'currency': header['currency'],
+            'subtotal': header['subtotal'],
+            'discount_amount': header['discount_amount'],
+            'tax_amount': header['tax_amount'],
+            'total_amount': header['total_amount'],
+            'paid_amount': header['paid_amount'],
+            'balance_due': header['balance_due'],
+            'items': [
+                {
+                    'product_id': line['product_id'],
+                    'item_name': line['item_name'],
+                    'quantity': line['quantity'],
+                    'unit': line['unit'],
+                    'unit_price': line['unit_price'],
+                    'discount_amount': from_minor_units(line['discount_amount']),
+                    'tax_rate': line['tax_rate'] if line['is_taxable'] else 0,
+                    'tax_amount': from_minor_units(line['tax_amount']),
+                    'total_amount': from_minor_units(line['total_amount'])
+                }
+                for line in lines
+            ]
+        }
+        for header, lines in zip(header_rows, line_groups)
+    ]
+
+def create_invoice(invoice, created_by, commit=True):
+    """Create one invoice with its items in a single transaction"""
+    return create_invoices([invoice], created_by, commit=commit)[0]
@@ -0,0 +1,332 @@
+from flask import current_app, has_app_context
+from sqlalchemy import select
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import threading
+import hashlib
+import json
+import zipfile
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import Payment, db
+from app.models.invoice import Invoice, InvoiceItem
+from app.models.customer import Customer
+from app.models.company import Company
+from app.services.pdf_rendering import init_resources, render_document
+
+# Bump when the layout changes so cached PDFs are rendered again
+RENDER_VERSION = 1
+
+DEFAULT_PDF_CACHE_DIRECTORY = 'pdf_cache'
+
+DOCUMENT_KINDS = ('invoice', 'receipt')
+
+# Below this many uncached documents rendering stays in the request's process
+POOL_THRESHOLD = 8
+
+# Documents loaded from the database per round of pool rendering
+LOAD_CHUNK_SIZE = 200
+
+def _config(name, default=None):
+    if has_app_context():
+        return current_app.config.get(name) or default
+    return default
+
+def get_resource_paths(company=None):
+    """Get (font, bold font, logo) file paths; the logo defaults to the company's"""
+    logo_path = _config('PDF_LOGO_PATH') or (company.logo_path if company is not None else None)
+    return _config('PDF_FONT_PATH'), _config('PDF_BOLD_FONT_PATH'), logo_path
+
+class PdfCache:
+    """Rendered PDFs on disk, named by a hash of the document as it is rendered
+    
+    A change to the document, its customer, items or the company gives a
+    new key, so entries never need invalidating and repeat downloads skip
+    rendering.
+    """
+    
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.lock = threading.Lock()
+    
+    def get_directory(self):
+        return self.directory or _config('PDF_CACHE_DIRECTORY', DEFAULT_PDF_CACHE_DIRECTORY)
+    
+    def path(self, key):
+        return os.path.join(self.get_directory(), key[:2], f"{key}.pdf")
+    
+    def get(self, key):
+        path = self.path(key)
+        return path if os.path.exists(path) else None
+    
+    def put(self, key, data):
+        """Store a rendered PDF; written to a temporary name first so readers never see half a file"""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary_path, 'wb') as output:
+            output.write(data)
+        os.replace(temporary_path, path)
+        return path
+    
+    def clear(self):
+        with self.lock:
+            directory = self.get_directory()
+            if not os.path.isdir(directory):
+                return
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    if name.endswith('.pdf') or name.endswith('.tmp'):
+                        os.remove(os.path.join(root, name))
+
+pdf_cache = PdfCache()
+
+class RenderPool:
+    """Process pool for bulk rendering, kept between jobs so workers load fonts and logo once"""
+    
+    def __init__(self):
+        self.executor = None
+        self.resource_paths = None
+        self.lock = threading.Lock()
+    
+    def get(self, resource_paths):
+        with self.lock:
+            if self.executor is not None and self.resource_paths != resource_paths:
+                self.executor.shutdown(wait=True)
+                self.executor = None
+            if self.executor is None:
+                # Spawned workers start clean instead of inheriting the server's threads and database connections
+                self.executor = ProcessPoolExecutor(
+                    max_workers=_config('PDF_RENDER_WORKERS') or os.cpu_count(),
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=init_resources,
+                    initargs=resource_paths
+                )
+                self.resource_paths = resource_paths
+            return self.executor
+    
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=True)
+                self.executor = None
+
+render_pool = RenderPool()
+
+def _cache_key(kind, document_id, document):
+    """Hash everything the PDF is rendered from"""
+    content = json.dumps(document, sort_keys=True, default=str)
+    return hashlib.sha256(f"{kind}:{document_id}:{RENDER_VERSION}:{content}".encode()).hexdigest()
+
+def _load_company():
+    return db.session.query(Company).first()
+
+def _company_dict(company):
+    if company is None:
+        return {}
+    return {
+        'name': company.name,
+        'name_en': company.name_en,
+        'address': company.address,
+        'vat_number': company.vat_number or company.tax_number,
+        'commercial_register': company.commercial_register,
+        'phone': company.phone,
+        'email': company.email
+    }
+
+def _load_invoice_documents(invoice_ids, company):
+    """Load invoices, their customers and items as plain dicts with three queries"""
+    invoices = db.session.execute(
+        select(Invoice, Customer.name, Customer.name_en, Customer.tax_number, Customer.address, Customer.phone).join(
+            Customer, Customer.id == Invoice.customer_id
+        ).where(Invoice.id.in_(invoice_ids))
+    ).all()
+    items = {}
+    for item in db.session.execute(
+        select(InvoiceItem).where(InvoiceItem.invoice_id.in_(invoice_ids)).order_by(InvoiceItem.invoice_id, InvoiceItem.id)
+    ).scalars():
+        items.setdefault(item.invoice_id, []).append({
+            'item_name': item.item_name,
+            'quantity': item.quantity,
+            'unit': item.unit,
+            'unit_price': item.unit_price,
+            'discount_amount': item.discount_amount,
+            'tax_rate': item.tax_rate if item.is_taxable else 0,
+            'tax_amount': item.tax_amount,
+            'total_amount': item.total_amount
+        })
+    
+    documents = {}
+    for invoice, name, name_en, tax_number, address, phone in invoices:
+        documents[invoice.id] = {
+            'kind': 'invoice',
+            'number': invoice.invoice_number,
+            'date': invoice.invoice_date.isoformat(),
+            'due_date': invoice.due_date.isoformat() if invoice.due_date else None,
+            'reference': invoice.reference,
+            'currency': invoice.currency,
+            'status': invoice.status,
+            'subtotal': invoice.subtotal,
+            'discount_amount': invoice.discount_amount,
+            'tax_amount': invoice.tax_amount,
+            'total_amount': invoice.total_amount,
+            'paid_amount': invoice.paid_amount,
+            'balance_due': invoice.balance_due,
+            'notes': invoice.notes,
+            'terms_conditions': invoice.terms_conditions,
+            'customer': {'name': name, 'name_en': name_en, 'tax_number': tax_number, 'address': address, 'phone': phone},
+            'items': items.get(invoice.id, []),
+            'company': company
+        }
+    return documents
+
+def _load_receipt_documents(payment_ids, company):
+    payments = db.session.execute(
+        select(Payment).where(Payment.id.in_(payment_ids), Payment.payment_type == 'receipt')
+    ).scalars()
+    return {
+        payment.id: {
+            'kind': 'receipt',
+            'number': payment.payment_number,
+            'date': payment.payment_date.isoformat(),
+            'amount': payment.amount,
+            'currency': payment.currency,
+            'party_name': payment.party_name,
+            'payment_method': payment.payment_method,
+            'check_number': payment.check_number,
+            'bank_name': payment.bank_name,
+            'reference_number': payment.reference_number,
+            'description': payment.description,
+            'company': company
+        }
+        for payment in payments
+    }
+
+DOCUMENT_LOADERS = {
+    'invoice': _load_invoice_documents,
+    'receipt': _load_receipt_documents
+}
+
+def _filename(kind, number):
+    safe_number = ''.join(character if character.isalnum() or character in '-_' else '_' for character in number)
+    return f"{kind}-{safe_number}.pdf"
+
+def get_document_pdf(kind, document_id):
+    """Get (filename, PDF bytes) for one invoice or receipt, rendering it only when not cached"""
+    if kind not in DOCUMENT_KINDS:
+        raise ValueError(f"kind must be one of {', '.join(DOCUMENT_KINDS)}")
+    company = _load_company()
+    document = DOCUMENT_LOADERS[kind]([document_id], _company_dict(company)).get(document_id)
+    if document is None:
+        return None
+    
+    key = _cache_key(kind, document_id, document)
+    path = pdf_cache.get(key)
+    if path is None:
+        init_resources(*get_resource_paths(company))
+        path = pdf_cache.put(key, render_document(document))
+    
+    with open(path, 'rb') as cached:
+        return _filename(kind, document['number']), cached.read()
+
+def iter_document_pdfs(kind, document_ids):
+    """Yield (filename, cached PDF path) for many documents, rendering the uncached ones in the pool
+    
+    Documents are loaded from the database in chunks. Within a chunk the
+    cached ones come first; the rest are rendered by the worker processes,
+    each written to the cache as it arrives.
+    """
+    if kind not in DOCUMENT_KINDS:
+        raise ValueError(f"kind must be one of {', '.join(DOCUMENT_KINDS)}")
+    company = _load_company()
+    resource_paths = get_resource_paths(company)
+    company_dict = _company_dict(company)
+    executor = None
+    
+    for start in range(0, len(document_ids), LOAD_CHUNK_SIZE):
+        chunk_ids = document_ids[start:start + LOAD_CHUNK_SIZE]
+        documents = DOCUMENT_LOADERS[kind](chunk_ids, company_dict)
+        
+        missing = []
+        for document_id in chunk_ids:
+            document = documents.get(document_id)
+            if document is None:
+                continue
+            key = _cache_key(kind, document_id, document)
+            path = pdf_cache.get(key)
+            if path is not None:
+                yield _filename(kind, document['number']), path
+            else:
+                missing.append((document, key))
+        if not missing:
+            continue
+        
+        if executor is None and len(missing) >= POOL_THRESHOLD:
+            executor = render_pool.get(resource_paths)
+        if executor is None:
+            init_resources(*resource_paths)
+        
+        batch = [document for document, _ in missing]
+        rendered = executor.map(render_document, batch, chunksize=4) if executor else map(render_document, batch)
+        for (document, key), data in zip(missing, rendered):
+            yield _filename(kind, document['number']), pdf_cache.put(key, data)
+
+class _ZipStream:
+    """Write-only file object that hands written bytes back to a generator"""
+    
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+    
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self.position
+    
+    def flush(self):
+        pass
+    
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def iter_zip(files):
+    """Stream (filename, path) pairs as a ZIP archive, one file at a time
+    
+    PDFs are already compressed, so entries are stored as they are.
+    """
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for filename, path in files:
+            archive.write(path, filename)
+            yield stream.drain()
+    yield stream.drain()
+
+def find_document_ids(kind, start_date=None, end_date=None, customer_id=None):
+    """Get the ids of issued invoices or posted receipts in a date range, for bulk jobs"""
+    if kind == 'invoice':
+        query = select(Invoice.id).where(Invoice.status != 'draft')
+        if start_date:
+            query = query.where(Invoice.invoice_date >= start_date)
+        if end_date:
+            query = query.where(Invoice.invoice_date <= end_date)
+        if customer_id:
+            query = query.where(Invoice.customer_id == customer_id)
+        return list(db.session.execute(query.order_by(Invoice.id)).scalars())
+    
+    query = select(Payment.id).where(Payment.payment_type == 'receipt', Payment.status == 'posted')
+    if start_date:
+        query = query.where(Payment.payment_date >= start_date)
+    if end_date:
+        query = query.where(Payment.payment_date <= end_date)
+    if customer_id:
+        query = query.where(Payment.party_type == 'customer', Payment.party_id == customer_id)
+    return list(db.session.execute(query.order_by(Payment.id)).scalars())
@@ -0,0 +1,236 @@
+from sqlalchemy import insert, case, bindparam, event
+from sqlalchemy.orm import Session
+from datetime import datetime
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import Account, JournalEntry, JournalEntryLine, db
+from app.models.money import Money, to_minor_units, from_minor_units
+from app.services.document_numbers import reserve_numbers, LEDGER_VERSION
+from app.services.period_close import check_dates_open
+from app.services.ledger_index import ledger_index
+from app.services.financial_statements import statement_cache
+from app.services.monthly_totals import collect_monthly_deltas, apply_monthly_deltas
+
+# Posted (entry_date, deltas) pairs wait on the session until the transaction commits
+SESSION_KEY = 'posted_journal_deltas'
+
+# First and last ledger versions written by the transaction
+VERSION_KEY = 'posted_ledger_versions'
+
+def allocate_entry_numbers(count):
+    """Reserve a block of consecutive journal entry numbers from the journal entry sequence"""
+    last_entry = db.session.query(JournalEntry.entry_number).order_by(JournalEntry.id.desc()).first()
+    last_number = int(last_entry.entry_number.split('-')[1]) if last_entry else 0
+    first_number = reserve_numbers('journal_entry', count, last_number)
+    return [f"JE-{str(first_number + offset).zfill(6)}" for offset in range(count)]
+
+def _validate_lines(lines, label):
+    """Validate that a set of lines balances and return its totals"""
+    if not lines:
+        raise ValueError(f"Journal entry {label} has no lines")
+    
+    # Compare in integer minor units so balancing is exact
+    total_debit = sum(to_minor_units(line['debit_amount'] or 0) for line in lines)
+    total_credit = sum(to_minor_units(line['credit_amount'] or 0) for line in lines)
+    
+    if total_debit != total_credit:
+        raise ValueError(f"Journal entry {label} is not balanced")
+    
+    return from_minor_units(total_debit), from_minor_units(total_credit)
+
+def _validate_accounts(account_ids):
+    """Check every account exists and accepts postings, in one query"""
+    accounts = db.session.query(
+        Account.id, Account.account_type, Account.is_active, Account.allow_posting
+    ).filter(Account.id.in_(account_ids)).all()
+    found = {account.id: account for account in accounts}
+    
+    for account_id in account_ids:
+        account = found.get(account_id)
+        if account is None:
+            raise ValueError(f"Account {account_id} does not exist")
+        if not account.is_active or not account.allow_posting:
+            raise ValueError(f"Account {account_id} does not allow posting")
+    
+    return {account.id: account.account_type for account in accounts}
+
+def _collect_deltas(lines, deltas=None):
+    """Sum debit/credit per account in minor units, so long batches do not accumulate float error"""
+    if deltas is None:
+        deltas = {}
+    for line in lines:
+        totals = deltas.setdefault(line['account_id'], [0, 0])
+        totals[0] += to_minor_units(line['debit_amount'] or 0)
+        totals[1] += to_minor_units(line['credit_amount'] or 0)
+    return deltas
+
+def _queue_committed(entry_date, deltas, account_types):
+    """Remember a posting so in-process indexes and caches see it after commit"""
+    touched_types = {account_types.get(account_id) for account_id in deltas}
+    db.session.info.setdefault(SESSION_KEY, []).append((entry_date, deltas, touched_types))
+
+def _advance_ledger_version():
+    """Advance the ledger version in the posting's transaction so other workers' caches notice it"""
+    version = reserve_numbers(LEDGER_VERSION, 1)
+    db.session.info.setdefault(VERSION_KEY, [version, version])[1] = version
+
+@event.listens_for(Session, 'after_commit')
+def _apply_committed_postings(session):
+    postings = session.info.pop(SESSION_KEY, [])
+    versions = session.info.pop(VERSION_KEY, None)
+    if not postings:
+        return
+    
+    ledger_index.apply([(entry_date, deltas) for entry_date, deltas, _ in postings], *versions)
+    statement_cache.invalidate([(entry_date, touched_types) for entry_date, _, touched_types in postings], *versions)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_committed_postings(session):
+    session.info.pop(SESSION_KEY, None)
+    session.info.pop(VERSION_KEY, None)
+
+def apply_account_deltas(deltas):
+    """Apply per-account debit/credit deltas (minor units) with one executemany UPDATE"""
+    if not deltas:
+        return
+    
+    accounts = Account.__table__
+    statement = accounts.update().where(
+        accounts.c.id == bindparam('b_account_id')
+    ).values(
+        current_balance=accounts.c.current_balance + case(
+            (accounts.c.normal_balance == 'debit', bindparam('b_debit', type_=Money()) - bindparam('b_credit', type_=Money())),
+            else_=bindparam('b_credit', type_=Money()) - bindparam('b_debit', type_=Money())
+        ),
+        updated_at=datetime.utcnow()
+    )
+    
+    db.session.execute(statement, [
+        {'b_account_id': account_id, 'b_debit': from_minor_units(debit), 'b_credit': from_minor_units(credit)}
+        for account_id, (debit, credit) in deltas.items()
+    ])
+
+def post_journal_entry(entry, posted_by_user_id, commit=True):
+    """Validate and post one journal entry in a single transaction"""
+    # Posted, reversed and cancelled entries are final
+    if entry.status != 'draft':
+        raise ValueError(f"Journal entry {entry.entry_number} is {entry.status}; only draft entries can be posted")
+    
+    lines = [
+        {'account_id': line.account_id, 'debit_amount': line.debit_amount, 'credit_amount': line.credit_amount}
+        for line in entry.entries
+    ]
+    
+    try:
+        entry.total_debit, entry.total_credit = _validate_lines(lines, entry.entry_number)
+        deltas = _collect_deltas(lines)
+        account_types = _validate_accounts(list(deltas))
+        check_dates_open([entry.entry_date])
+        
+        entry.status = 'posted'
+        entry.posted_by = posted_by_user_id
+        entry.posted_at = datetime.utcnow()
+        
+        db.session.flush()
+        apply_account_deltas(deltas)
+        apply_monthly_deltas(collect_monthly_deltas(entry.entry_date, lines))
+        _advance_ledger_version()
+        _queue_committed(entry.entry_date, deltas, account_types)
+        
+        if commit:
+            db.session.commit()
+    except Exception:
+        if commit:
+            db.session.rollback()
+        raise
+    
+    return entry
+
+def post_journal_batch(entries_data, posted_by_user_id, commit=True):
+    """Create and post a batch of journal entries with bulk inserts
+    
+    Each item in entries_data is a dict with entry_date, description, optional
+    reference_type/reference_id/reference_number and a list of lines, each
+    with account_id, debit_amount, credit_amount and optional description
+    and reference. An item with a status must be a draft.
+    """
+    if not entries_data:
+        return []
+    
+    try:
+        deltas = {}
+        daily_deltas = {}
+        monthly_deltas = {}
+        totals = []
+        for index, entry_data in enumerate(entries_data):
+            label = entry_data.get('reference_number') or f"#{index + 1}"
+            status = entry_data.get('status', 'draft')
+            if status != 'draft':
+                raise ValueError(f"Journal entry {label} is {status}; only draft entries can be posted")
+            totals.append(_validate_lines(entry_data['lines'], label))
+            _collect_deltas(entry_data['lines'], deltas)
+            _collect_deltas(entry_data['lines'], daily_deltas.setdefault(entry_data['entry_date'], {}))
+            collect_monthly_deltas(entry_data['entry_date'], entry_data['lines'], monthly_deltas)
+        
+        account_types = _validate_accounts(list(deltas))
+        check_dates_open(entry_data['entry_date'] for entry_data in entries_data)
+        
+        now = datetime.utcnow()
+        entry_numbers = allocate_entry_numbers(len(entries_data))
+        
+        header_rows = []
+        for entry_data, entry_number, (total_debit, total_credit) in zip(entries_data, entry_numbers, totals):
+            header_rows.append({
+                'entry_number': entry_number,
+                'entry_date': entry_data['entry_date'],
+                'description': entry_data['description'],
+                'reference_type': entry_data.get('reference_type'),
+                'reference_id': entry_data.get('reference_id'),
+                'reference_number': entry_data.get('reference_number'),
+                'total_debit': total_debit,
+                'total_credit': total_credit,
+                'status': 'posted',
+                'created_by': entry_data.get('created_by', posted_by_user_id),
+                'posted_by': posted_by_user_id,
+                'created_at': now,
+                'posted_at': now
+            })
+        
+        result = db.session.execute(
+            insert(JournalEntry).returning(JournalEntry.id, JournalEntry.entry_number),
+            header_rows
+        )
+        entry_ids = {row.entry_number: row.id for row in result}
+        
+        line_rows = []
+        for entry_data, entry_number in zip(entries_data, entry_numbers):
+            for line in entry_data['lines']:
+                line_rows.append({
+                    'journal_entry_id': entry_ids[entry_number],
+                    'account_id': line['account_id'],
+                    'description': line.get('description') or entry_data['description'],
+                    'debit_amount': line['debit_amount'] or 0,
+                    'credit_amount': line['credit_amount'] or 0,
+                    'reference': line.get('reference'),
+                    'created_at': now
+                })
+        
+        db.session.execute(insert(JournalEntryLine), line_rows)
+        apply_account_deltas(deltas)
+        apply_monthly_deltas(monthly_deltas)
+        _advance_ledger_version()
+        for entry_date, entry_deltas in daily_deltas.items():
+            _queue_committed(entry_date, entry_deltas, account_types)
+        
+        if commit:
+            db.session.commit()
+    except Exception:
+        if commit:
+            db.session.rollback()
+        raise
+    
+    return [entry_ids[entry_number] for entry_number in entry_numbers]
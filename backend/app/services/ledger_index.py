@@ -0,0 +1,259 @@
+from sqlalchemy import func
+from datetime import date
+import threading
+import numpy as np
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import Account, db
+from app.models.money import minor_units, from_minor_units
+from app.services.account_balances import POSTED_STATUSES, get_movement_query, signed_balance
+from app.services.archive import journal_tables
+from app.services.document_numbers import read_sequences, LEDGER_VERSION
+
+# int32 day ordinal + int64 cumulative debit + int64 cumulative credit (minor units, exact)
+BYTES_PER_DAY = 20
+BYTES_PER_ACCOUNT = 400
+
+# New postings are buffered per account and merged into the arrays past this size
+MAX_PENDING = 256
+
+class AccountLedger:
+    """Per-account daily totals as sorted dates with prefix sums"""
+    
+    def __init__(self, days, debits, credits):
+        self.days = np.asarray(days, dtype=np.int32)
+        self.cum_debit = np.concatenate(([0], np.cumsum(debits, dtype=np.int64))).astype(np.int64)
+        self.cum_credit = np.concatenate(([0], np.cumsum(credits, dtype=np.int64))).astype(np.int64)
+        self.pending = []
+    
+    def nbytes(self):
+        return self.days.nbytes + self.cum_debit.nbytes + self.cum_credit.nbytes + len(self.pending) * BYTES_PER_DAY
+    
+    def add(self, day, debit, credit):
+        """Record a posting (minor units) in the buffer; the arrays are rebuilt once it fills up"""
+        self.pending.append((day, debit, credit))
+        if len(self.pending) > MAX_PENDING:
+            self.merge_pending()
+    
+    def merge_pending(self):
+        """Fold buffered postings back into the sorted prefix-sum arrays"""
+        pending_days = np.array([item[0] for item in self.pending], dtype=np.int32)
+        days = np.concatenate((self.days, pending_days))
+        debits = np.concatenate((np.diff(self.cum_debit), np.array([item[1] for item in self.pending], dtype=np.int64)))
+        credits = np.concatenate((np.diff(self.cum_credit), np.array([item[2] for item in self.pending], dtype=np.int64)))
+        
+        unique_days, positions = np.unique(days, return_inverse=True)
+        daily_debits = np.zeros(len(unique_days), dtype=np.int64)
+        daily_credits = np.zeros(len(unique_days), dtype=np.int64)
+        np.add.at(daily_debits, positions, debits)
+        np.add.at(daily_credits, positions, credits)
+        
+        self.days = unique_days.astype(np.int32)
+        self.cum_debit = np.concatenate(([0], np.cumsum(daily_debits))).astype(np.int64)
+        self.cum_credit = np.concatenate(([0], np.cumsum(daily_credits))).astype(np.int64)
+        self.pending = []
+    
+    def totals(self, start_day=None, end_day=None):
+        """Get debit/credit totals between two day ordinals (inclusive)"""
+        low = 0 if start_day is None else int(np.searchsorted(self.days, start_day, side='left'))
+        high = len(self.days) if end_day is None else int(np.searchsorted(self.days, end_day, side='right'))
+        
+        debit = int(self.cum_debit[high] - self.cum_debit[low]) if high > low else 0
+        credit = int(self.cum_credit[high] - self.cum_credit[low]) if high > low else 0
+        
+        for day, pending_debit, pending_credit in self.pending:
+            if (start_day is None or day >= start_day) and (end_day is None or day <= end_day):
+                debit += pending_debit
+                credit += pending_credit
+        
+        return from_minor_units(debit), from_minor_units(credit)
+
+class LedgerIndex:
+    """In-process index of posted journal lines for range balance queries
+    
+    The index holds the ledger version it was built at plus every posting
+    this process committed since. It only answers while that version is
+    current, so with several workers a posting by another process sends
+    queries to SQL; the next local posting finds the gap and drops the
+    index until it is rebuilt.
+    """
+    
+    def __init__(self):
+        self.ledgers = {}
+        self.is_warm = False
+        self.version = None
+        self.memory_budget = 0
+        self.used_bytes = 0
+        self.lock = threading.Lock()
+    
+    def build(self, memory_budget):
+        """Load daily per-account totals from journal_entry_lines in one query"""
+        # Read before the rows: a posting committed in between only makes the index look stale
+        version = read_sequences((LEDGER_VERSION,))[0]
+        entries, entry_lines = journal_tables()
+        
+        rows = db.session.query(
+            entry_lines.account_id,
+            entries.entry_date,
+            minor_units(func.sum(entry_lines.debit_amount)),
+            minor_units(func.sum(entry_lines.credit_amount))
+        ).join(
+            entries, entries.id == entry_lines.journal_entry_id
+        ).filter(
+            entries.status.in_(POSTED_STATUSES)
+        ).group_by(
+            entry_lines.account_id, entries.entry_date
+        ).order_by(
+            entry_lines.account_id, entries.entry_date
+        ).yield_per(10000)
+        
+        account_ids, days, debits, credits = [], [], [], []
+        used = 0
+        for account_id, entry_date, debit, credit in rows:
+            used += BYTES_PER_DAY
+            if used > memory_budget:
+                # Too big for the budget: stay cold and let callers use SQL
+                with self.lock:
+                    self.ledgers = {}
+                    self.is_warm = False
+                return False
+            account_ids.append(account_id)
+            days.append(entry_date.toordinal())
+            debits.append(int(round(debit or 0)))
+            credits.append(int(round(credit or 0)))
+        
+        account_ids = np.asarray(account_ids, dtype=np.int64)
+        days = np.asarray(days, dtype=np.int32)
+        debits = np.asarray(debits, dtype=np.int64)
+        credits = np.asarray(credits, dtype=np.int64)
+        
+        ledgers = {}
+        # Rows are ordered by account, so each account is one contiguous slice
+        unique_ids, starts = np.unique(account_ids, return_index=True)
+        ends = np.append(starts[1:], len(account_ids))
+        for account_id, start, end in zip(unique_ids, starts, ends):
+            ledgers[int(account_id)] = AccountLedger(days[start:end], debits[start:end], credits[start:end])
+        
+        with self.lock:
+            self.ledgers = ledgers
+            self.version = version
+            self.memory_budget = memory_budget
+            self.used_bytes = self.memory_usage()
+            self.is_warm = True
+        return True
+    
+    def clear(self):
+        """Drop the index and fall back to SQL"""
+        with self.lock:
+            self.ledgers = {}
+            self.is_warm = False
+    
+    def memory_usage(self):
+        """Approximate bytes held by the index"""
+        return sum(ledger.nbytes() + BYTES_PER_ACCOUNT for ledger in self.ledgers.values())
+    
+    def apply(self, postings, first_version, last_version):
+        """Apply committed (entry_date, per-account debit/credit deltas in minor units) postings
+        
+        The postings were committed as ledger versions first_version to
+        last_version; when the index missed a version in between it is
+        dropped instead.
+        """
+        if not self.is_warm:
+            return
+        
+        with self.lock:
+            if self.version != first_version - 1:
+                self.ledgers = {}
+                self.is_warm = False
+                return
+            self.version = last_version
+            
+            for entry_date, deltas in postings:
+                day = entry_date.toordinal()
+                for account_id, (debit, credit) in deltas.items():
+                    ledger = self.ledgers.get(account_id)
+                    if ledger is None:
+                        ledger = self.ledgers[account_id] = AccountLedger([], [], [])
+                        self.used_bytes += BYTES_PER_ACCOUNT
+                    ledger.add(day, debit, credit)
+                self.used_bytes += BYTES_PER_DAY * len(deltas)
+            
+            if self.used_bytes > self.memory_budget:
+                self.ledgers = {}
+                self.is_warm = False
+    
+    def range_totals(self, account_ids, start_date=None, end_date=None, version=None):
+        """Get debit/credit totals per account, or None when the index is cold or not at the ledger version"""
+        if not self.is_warm:
+            return None
+        
+        start_day = start_date.toordinal() if start_date else None
+        end_day = end_date.toordinal() if end_date else None
+        
+        with self.lock:
+            if not self.is_warm or self.version != version:
+                return None
+            totals = {}
+            for account_id in account_ids:
+                ledger = self.ledgers.get(account_id)
+                totals[account_id] = ledger.totals(start_day, end_day) if ledger else (0.0, 0.0)
+            return totals
+
+ledger_index = LedgerIndex()
+
+def init_ledger_index(app):
+    """Build the ledger index at startup when enabled in the app config"""
+    if not app.config.get('LEDGER_INDEX_ENABLED'):
+        return False
+    
+    with app.app_context():
+        return ledger_index.build(app.config.get('LEDGER_INDEX_MEMORY_MB', 256) * 1024 * 1024)
+
+def get_range_totals(account_ids, start_date=None, end_date=None, version=None):
+    """Get (debit/credit totals per account, source): from the index when it is current, else SQL"""
+    if version is None:
+        version = read_sequences((LEDGER_VERSION,))[0]
+    totals = ledger_index.range_totals(account_ids, start_date, end_date, version)
+    if totals is not None:
+        return totals, 'index'
+    
+    totals = {account_id: (0.0, 0.0) for account_id in account_ids}
+    for row in get_movement_query(as_of_date=end_date, start_date=start_date, account_ids=account_ids):
+        totals[row.account_id] = (row.total_debit or 0.0, row.total_credit or 0.0)
+    return totals, 'sql'
+
+def get_range_balances(account_ids, start_date, end_date):
+    """Get opening, movement and closing balances per account for a date range"""
+    accounts = db.session.query(
+        Account.id, Account.code, Account.name, Account.normal_balance, Account.opening_balance
+    ).filter(Account.id.in_(account_ids)).all()
+    ids = [account.id for account in accounts]
+    
+    version = read_sequences((LEDGER_VERSION,))[0]
+    before, before_source = get_range_totals(ids, None, date.fromordinal(start_date.toordinal() - 1), version)
+    during, during_source = get_range_totals(ids, start_date, end_date, version)
+    
+    results = []
+    for account in accounts:
+        before_debit, before_credit = before[account.id]
+        debit, credit = during[account.id]
+        opening = (account.opening_balance or 0) + signed_balance(account.normal_balance, before_debit, before_credit)
+        results.append({
+            'account_id': account.id,
+            'code': account.code,
+            'name': account.name,
+            'opening_balance': round(opening, 2),
+            'debit_amount': round(debit, 2),
+            'credit_amount': round(credit, 2),
+            'closing_balance': round(opening + signed_balance(account.normal_balance, debit, credit), 2)
+        })
+    
+    return {
+        'source': 'index' if before_source == during_source == 'index' else 'sql',
+        'accounts': results
+    }
@@ -0,0 +1,96 @@
+from sqlalchemy import MetaData, Table, Column, String, DateTime, Integer, inspect, select, insert, text
+from datetime import datetime
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.money import Money, MINOR_UNITS
+from app.models.accounting import (
+    Account, JournalEntry, JournalEntryLine, Payment, AccountBalanceSnapshot, BankStatementLine, AccountMonthlyTotal, Budget, db
+)
+from app.models.invoice import Invoice, InvoiceItem, SalesDailyTotal, RecurringInvoice, RecurringInvoiceItem
+from app.models.purchase import Purchase, PurchaseItem
+from app.models.customer import Customer
+from app.models.supplier import Supplier
+
+MONEY_MODELS = [
+    Account, JournalEntry, JournalEntryLine, Payment, AccountBalanceSnapshot, BankStatementLine,
+    AccountMonthlyTotal, Budget, Invoice, InvoiceItem, SalesDailyTotal, RecurringInvoice,
+    RecurringInvoiceItem, Purchase, PurchaseItem, Customer, Supplier
+]
+
+# Records which columns already hold minor units so the migration runs once
+migration_metadata = MetaData()
+money_column_migrations = Table(
+    'money_column_migrations', migration_metadata,
+    Column('table_name', String(100), primary_key=True),
+    Column('column_name', String(100), primary_key=True),
+    Column('migrated_at', DateTime, nullable=False)
+)
+
+def get_money_columns():
+    """Get (table, column) pairs for every Money column"""
+    return [
+        (model.__tablename__, column.name)
+        for model in MONEY_MODELS
+        for column in model.__table__.columns
+        if isinstance(column.type, Money)
+    ]
+
+def _convert_column(connection, table_name, column_name):
+    dialect = connection.dialect.name
+    preparer = connection.dialect.identifier_preparer
+    table = preparer.quote(table_name)
+    column = preparer.quote(column_name)
+    
+    if dialect == 'postgresql':
+        connection.execute(text(
+            f"ALTER TABLE {table} ALTER COLUMN {column} TYPE BIGINT USING ROUND({column} * {MINOR_UNITS})::bigint"
+        ))
+    elif dialect == 'mysql':
+        connection.execute(text(f"UPDATE {table} SET {column} = ROUND({column} * {MINOR_UNITS})"))
+        connection.execute(text(f"ALTER TABLE {table} MODIFY {column} BIGINT"))
+    else:
+        # SQLite cannot change a column type in place; the values become integers
+        connection.execute(text(
+            f"UPDATE {table} SET {column} = CAST(ROUND({column} * {MINOR_UNITS}) AS INTEGER) "
+            f"WHERE {column} IS NOT NULL"
+        ))
+
+def migrate_money_columns():
+    """Convert Float amount columns of an existing database to integer minor units
+    
+    Columns created as BIGINT by create_all are only recorded. Returns the
+    list of converted (table, column) pairs.
+    """
+    converted = []
+    with db.engine.begin() as connection:
+        migration_metadata.create_all(connection)
+        done = {
+            (row.table_name, row.column_name)
+            for row in connection.execute(select(money_column_migrations))
+        }
+        
+        inspector = inspect(connection)
+        existing_tables = set(inspector.get_table_names())
+        now = datetime.utcnow()
+        
+        for table_name, column_name in get_money_columns():
+            if (table_name, column_name) in done or table_name not in existing_tables:
+                continue
+            
+            column_types = {column['name']: column['type'] for column in inspector.get_columns(table_name)}
+            if column_name not in column_types:
+                continue
+            
+            if not isinstance(column_types[column_name], Integer):
+                _convert_column(connection, table_name, column_name)
+                converted.append((table_name, column_name))
+            
+            connection.execute(insert(money_column_migrations).values(
+                table_name=table_name, column_name=column_name, migrated_at=now
+            ))
+    
+    return converted
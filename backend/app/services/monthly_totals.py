@@ -0,0 +1,124 @@
+from sqlalchemy import select, insert, update, delete, bindparam, func, extract, tuple_
+from datetime import datetime
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import AccountMonthlyTotal, db
+from app.models.money import Money, minor_units, from_minor_units
+from app.services.account_balances import POSTED_STATUSES
+from app.services.archive import journal_tables
+
+# Journal lines carry no cost center yet, so actuals are kept company-wide
+DEFAULT_COST_CENTER = ''
+
+def collect_monthly_deltas(entry_date, lines, deltas=None):
+    """Sum debit/credit per (account, year, month, cost center)"""
+    if deltas is None:
+        deltas = {}
+    for line in lines:
+        key = (line['account_id'], entry_date.year, entry_date.month, line.get('cost_center') or DEFAULT_COST_CENTER)
+        totals = deltas.setdefault(key, [0.0, 0.0])
+        totals[0] += line['debit_amount'] or 0
+        totals[1] += line['credit_amount'] or 0
+    return deltas
+
+def apply_monthly_deltas(deltas):
+    """Add posted debit/credit to the monthly totals: one executemany UPDATE plus one bulk INSERT
+    
+    Runs inside the caller's transaction so the aggregate commits with the
+    journal lines it summarizes.
+    """
+    if not deltas:
+        return
+    
+    table = AccountMonthlyTotal.__table__
+    existing = {
+        (row.account_id, row.year, row.month, row.cost_center): row.id
+        for row in db.session.execute(
+            select(table.c.id, table.c.account_id, table.c.year, table.c.month, table.c.cost_center).where(
+                tuple_(table.c.account_id, table.c.year, table.c.month, table.c.cost_center).in_(list(deltas))
+            )
+        )
+    }
+    
+    now = datetime.utcnow()
+    new_rows, changed_rows = [], []
+    for key, (debit, credit) in deltas.items():
+        total_id = existing.get(key)
+        if total_id:
+            changed_rows.append({'b_total_id': total_id, 'b_debit': debit, 'b_credit': credit})
+        else:
+            account_id, year, month, cost_center = key
+            new_rows.append({
+                'account_id': account_id,
+                'year': year,
+                'month': month,
+                'cost_center': cost_center,
+                'debit_total': debit,
+                'credit_total': credit,
+                'updated_at': now
+            })
+    
+    if changed_rows:
+        db.session.execute(
+            update(table).where(table.c.id == bindparam('b_total_id')).values(
+                debit_total=table.c.debit_total + bindparam('b_debit', type_=Money()),
+                credit_total=table.c.credit_total + bindparam('b_credit', type_=Money()),
+                updated_at=now
+            ),
+            changed_rows
+        )
+    if new_rows:
+        db.session.execute(insert(AccountMonthlyTotal), new_rows)
+
+def rebuild_monthly_totals(only_if_empty=False):
+    """Recompute the monthly totals from posted journal lines with one GROUP BY
+    
+    Returns the number of rows written, or None when skipped.
+    """
+    if only_if_empty and db.session.query(AccountMonthlyTotal.id).first() is not None:
+        return None
+    
+    entries, entry_lines = journal_tables()
+    
+    year = extract('year', entries.entry_date)
+    month = extract('month', entries.entry_date)
+    rows = db.session.execute(
+        select(
+            entry_lines.account_id,
+            year.label('year'),
+            month.label('month'),
+            minor_units(func.sum(entry_lines.debit_amount)).label('debit_total'),
+            minor_units(func.sum(entry_lines.credit_amount)).label('credit_total')
+        ).join(
+            entries, entries.id == entry_lines.journal_entry_id
+        ).where(
+            entries.status.in_(POSTED_STATUSES)
+        ).group_by(entry_lines.account_id, year, month)
+    ).all()
+    
+    now = datetime.utcnow()
+    try:
+        db.session.execute(delete(AccountMonthlyTotal))
+        if rows:
+            db.session.execute(insert(AccountMonthlyTotal), [
+                {
+                    'account_id': row.account_id,
+                    'year': int(row.year),
+                    'month': int(row.month),
+                    'cost_center': DEFAULT_COST_CENTER,
+                    'debit_total': from_minor_units(int(row.debit_total or 0)),
+                    'credit_total': from_minor_units(int(row.credit_total or 0)),
+                    'updated_at': now
+                }
+                for row in rows
+            ])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    
+    return len(rows)
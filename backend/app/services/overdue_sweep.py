@@ -0,0 +1,89 @@
+from sqlalchemy import update, case, func
+from datetime import datetime
+import threading
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import db
+from app.models.invoice import Invoice
+from app.models.purchase import Purchase
+
+# Sweep sides: (document model, statuses that may become overdue,
+# status once no longer due when the earlier one is unknown, status once paid)
+OVERDUE_SIDES = {
+    'invoices': (Invoice, ('sent', 'pending'), 'sent', 'paid'),
+    'purchases': (Purchase, ('received', 'partial'), 'received', 'completed')
+}
+
+def sweep_overdue(today=None):
+    """Flip past-due documents to 'overdue' and back again once they no longer are
+    
+    Each side is one UPDATE per direction over the (status, due_date)
+    index, so lists and reports can filter on the stored status. The
+    status a document had before it became overdue is kept in
+    status_before_overdue and restored when it is no longer due.
+    """
+    today = today or datetime.now().date()
+    now = datetime.utcnow()
+    counts = {}
+    
+    try:
+        for side, (model, open_statuses, due_status, paid_status) in OVERDUE_SIDES.items():
+            table = model.__table__
+            marked = db.session.execute(
+                update(table).where(
+                    table.c.status.in_(open_statuses),
+                    table.c.due_date < today,
+                    table.c.balance_due > 0
+                ).values(status='overdue', status_before_overdue=table.c.status, updated_at=now)
+            ).rowcount
+            
+            # Paid off elsewhere or given a later due date
+            cleared = db.session.execute(
+                update(table).where(
+                    table.c.status == 'overdue',
+                    (table.c.due_date >= today) | (table.c.balance_due <= 0)
+                ).values(
+                    status=case(
+                        (table.c.balance_due <= 0, paid_status),
+                        else_=func.coalesce(table.c.status_before_overdue, due_status)
+                    ),
+                    payment_status=case((table.c.balance_due <= 0, 'paid'), else_=table.c.payment_status),
+                    status_before_overdue=None,
+                    updated_at=now
+                )
+            ).rowcount
+            
+            counts[side] = {'marked_overdue': marked, 'cleared': cleared}
+        
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    
+    return counts
+
+def start_overdue_sweeper(app):
+    """Run the sweep in a daemon thread every OVERDUE_SWEEP_INTERVAL_MINUTES (0 disables it)"""
+    interval = app.config.get('OVERDUE_SWEEP_INTERVAL_MINUTES', 0)
+    if not interval:
+        return None
+    
+    stopped = threading.Event()
+    
+    def run():
+        while not stopped.wait(interval * 60):
+            with app.app_context():
+                try:
+                    sweep_overdue()
+                except Exception as e:
+                    app.logger.error(f"Overdue sweep failed: {str(e)}")
+                finally:
+                    db.session.remove()
+    
+    thread = threading.Thread(target=run, name='overdue-sweeper', daemon=True)
+    thread.start()
+    return stopped
@@ -0,0 +1,255 @@
+from sqlalchemy import insert, update
+from datetime import datetime
+import csv
+import io
+import re
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import Payment, db
+from app.models.money import to_minor_units, from_minor_units
+from app.services.document_numbers import reserve_numbers
+from app.services.journal_posting import post_journal_batch
+from app.services.posting_rules import posting_accounts
+
+# :61:YYMMDD[MMDD](C|D|RC|RD)[funds code]amount(N|F|S)XXX reference[//bank reference]
+MT940_STATEMENT_LINE = re.compile(
+    r'^(?P<date>\d{6})(?P<entry_date>\d{4})?(?P<mark>RC|RD|C|D)[A-Z]?'
+    r'(?P<amount>\d+(?:,\d{0,2})?)[NFS][A-Z0-9]{3}(?P<reference>[^/\n]*)(?://(?P<bank_reference>.*))?$'
+)
+
+def parse_csv(content):
+    """Parse a bank/payment CSV file into payment records
+    
+    Expected columns: date, amount and optionally payment_type, party_type,
+    party_id, party_name, payment_method, reference, check_number and
+    description. Without payment_type, positive amounts are receipts and
+    negative amounts are payments.
+    """
+    records = []
+    for row in csv.DictReader(io.StringIO(content)):
+        amount = float(row['amount'])
+        payment_type = row.get('payment_type') or ('receipt' if amount >= 0 else 'payment')
+        records.append({
+            'payment_date': datetime.strptime(row['date'].strip(), '%Y-%m-%d').date(),
+            'payment_type': payment_type,
+            'amount': abs(amount),
+            'party_type': row.get('party_type') or ('customer' if payment_type == 'receipt' else 'supplier'),
+            'party_id': int(row['party_id']) if row.get('party_id') else None,
+            'party_name': row.get('party_name') or row.get('description') or 'Bank statement',
+            'payment_method': row.get('payment_method') or 'bank',
+            'reference_number': row.get('reference') or None,
+            'check_number': row.get('check_number') or None,
+            'description': row.get('description') or None
+        })
+    return records
+
+def parse_mt940(content):
+    """Parse MT940 statement lines (:61: with their :86: details) into payment records"""
+    records = []
+    current = None
+    
+    for raw_line in content.splitlines():
+        line = raw_line.strip()
+        
+        if line.startswith(':61:'):
+            match = MT940_STATEMENT_LINE.match(line[4:])
+            if not match:
+                raise ValueError(f"Unrecognised MT940 statement line: {line}")
+            
+            is_credit = match.group('mark') in ('C', 'RD')
+            reference = match.group('reference').strip()
+            current = {
+                'payment_date': datetime.strptime(match.group('date'), '%y%m%d').date(),
+                'payment_type': 'receipt' if is_credit else 'payment',
+                'amount': float(match.group('amount').replace(',', '.')),
+                'party_type': 'customer' if is_credit else 'supplier',
+                'party_id': None,
+                'party_name': 'Bank statement',
+                'payment_method': 'bank',
+                'reference_number': None if reference in ('', 'NONREF') else reference,
+                'check_number': None,
+                'description': None
+            }
+            records.append(current)
+        elif line.startswith(':86:') and current is not None:
+            current['description'] = line[4:]
+            current['party_name'] = line[4:][:200]
+        elif current is not None and current['description'] and not line.startswith(':'):
+            # :86: details may continue over several lines
+            current['description'] = f"{current['description']} {line}"
+        elif line.startswith(':'):
+            current = None
+    
+    return records
+
+def allocate_payment_numbers(payment_type, count):
+    """Reserve a block of consecutive payment numbers from the payment type's sequence"""
+    prefix = 'RCP' if payment_type == 'receipt' else 'PAY'
+    last_payment = db.session.query(Payment.payment_number).filter(
+        Payment.payment_type == payment_type
+    ).order_by(Payment.id.desc()).first()
+    last_number = int(last_payment.payment_number.split('-')[1]) if last_payment else 0
+    first_number = reserve_numbers(f"payment_{payment_type}", count, last_number)
+    return [f"{prefix}-{str(first_number + offset).zfill(6)}" for offset in range(count)]
+
+def build_payment_entry(payment):
+    """Build the journal entry data for a payment (dict or Payment)"""
+    get = payment.get if isinstance(payment, dict) else lambda field: getattr(payment, field)
+    
+    cash_account_id = get('bank_account_id') or posting_accounts.resolve('cash')
+    party_account_id = Payment.get_party_account_id(get('party_type'))
+    # Post in base currency, as invoices and purchases post their receivables and payables
+    amount = from_minor_units(to_minor_units(get('amount') * (get('exchange_rate') or 1)))
+    party_name = get('party_name')
+    
+    if get('payment_type') == 'receipt':
+        description = f"Receipt from {party_name}"
+        debit_account_id, credit_account_id = cash_account_id, party_account_id
+    else:
+        description = f"Payment to {party_name}"
+        debit_account_id, credit_account_id = party_account_id, cash_account_id
+    
+    return {
+        'entry_date': get('payment_date'),
+        'description': f"{get('payment_type').title()} - {party_name}",
+        'reference_type': 'payment',
+        'reference_id': get('id'),
+        'reference_number': get('payment_number'),
+        'lines': [
+            {'account_id': debit_account_id, 'description': description, 'debit_amount': amount, 'credit_amount': 0},
+            {'account_id': credit_account_id, 'description': description, 'debit_amount': 0, 'credit_amount': amount}
+        ]
+    }
+
+def post_payments(payments, posted_by_user_id):
+    """Post draft payments with one batched journal posting and a single commit"""
+    payments = [payment for payment in payments if payment.status == 'draft']
+    if not payments:
+        return []
+    
+    try:
+        posting_accounts.refresh()
+        post_journal_batch([build_payment_entry(payment) for payment in payments], posted_by_user_id, commit=False)
+        
+        now = datetime.utcnow()
+        db.session.execute(
+            update(Payment).where(Payment.id.in_([payment.id for payment in payments])).values(
+                status='posted', posted_by=posted_by_user_id, posted_at=now
+            ).execution_options(synchronize_session='fetch')
+        )
+        
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    
+    return payments
+
+def _statement_key(payment_date, payment_type, amount, party_name, description):
+    return payment_date, payment_type, round(amount, 2), party_name, description or None
+
+def import_payments(records, bank_account_id, created_by_user_id, post=True):
+    """Insert and optionally post imported payment records in one transaction
+    
+    Records whose reference number already exists for the same date and
+    amount are skipped. Records without a reference are matched on date,
+    type, amount, party name and description against payments already
+    imported to the same bank account, as many times as they occur there,
+    so re-importing a statement is harmless.
+    """
+    references = [record['reference_number'] for record in records if record.get('reference_number')]
+    existing = set()
+    if references:
+        existing = {
+            (row.reference_number, row.payment_date, round(row.amount, 2))
+            for row in db.session.query(Payment.reference_number, Payment.payment_date, Payment.amount).filter(
+                Payment.reference_number.in_(references)
+            )
+        }
+    
+    unreferenced = {}
+    dates = {record['payment_date'] for record in records if not record.get('reference_number')}
+    if dates:
+        for row in db.session.query(
+            Payment.payment_date, Payment.payment_type, Payment.amount, Payment.party_name, Payment.description
+        ).filter(
+            Payment.reference_number.is_(None),
+            Payment.bank_account_id == bank_account_id,
+            Payment.payment_date.in_(dates)
+        ):
+            key = _statement_key(row.payment_date, row.payment_type, row.amount, row.party_name, row.description)
+            unreferenced[key] = unreferenced.get(key, 0) + 1
+    
+    new_records = []
+    for record in records:
+        if record.get('reference_number'):
+            if (record['reference_number'], record['payment_date'], round(record['amount'], 2)) in existing:
+                continue
+        else:
+            key = _statement_key(
+                record['payment_date'], record['payment_type'], record['amount'], record['party_name'], record.get('description')
+            )
+            if unreferenced.get(key):
+                unreferenced[key] -= 1
+                continue
+        new_records.append(record)
+    if not new_records:
+        return {'imported': 0, 'skipped': len(records), 'payment_ids': []}
+    
+    now = datetime.utcnow()
+    
+    try:
+        numbers = {
+            payment_type: iter(allocate_payment_numbers(
+                payment_type, sum(1 for record in new_records if record['payment_type'] == payment_type)
+            ))
+            for payment_type in {record['payment_type'] for record in new_records}
+        }
+        
+        payment_rows = []
+        for record in new_records:
+            payment_rows.append({
+                'payment_number': next(numbers[record['payment_type']]),
+                'payment_date': record['payment_date'],
+                'payment_type': record['payment_type'],
+                'amount': record['amount'],
+                'party_type': record['party_type'],
+                'party_id': record.get('party_id'),
+                'party_name': record['party_name'],
+                'payment_method': record.get('payment_method') or 'bank',
+                'bank_account_id': bank_account_id,
+                'check_number': record.get('check_number'),
+                'reference_number': record.get('reference_number'),
+                'description': record.get('description'),
+                'status': 'posted' if post else 'draft',
+                'created_by': created_by_user_id,
+                'posted_by': created_by_user_id if post else None,
+                'created_at': now,
+                'posted_at': now if post else None
+            })
+        
+        result = db.session.execute(insert(Payment).returning(Payment.id, Payment.payment_number), payment_rows)
+        payment_ids = {row.payment_number: row.id for row in result}
+        
+        if post:
+            posting_accounts.refresh()
+            entries = []
+            for payment_row in payment_rows:
+                payment_row['id'] = payment_ids[payment_row['payment_number']]
+                entries.append(build_payment_entry(payment_row))
+            post_journal_batch(entries, created_by_user_id, commit=False)
+        
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    
+    return {
+        'imported': len(new_records),
+        'skipped': len(records) - len(new_records),
+        'payment_ids': [payment_ids[payment_row['payment_number']] for payment_row in payment_rows]
+    }
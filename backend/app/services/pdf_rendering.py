@@ -0,0 +1,314 @@
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from functools import lru_cache
+import arabic_reshaper
+from bidi.algorithm import get_display
+import logging
+import io
+import os
+import re
+
+# Rendering only: this module takes plain document dicts and never touches the database,
+# so pool workers import it without the application
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+MARGIN = 15 * mm
+FOOTER_HEIGHT = 15 * mm
+
+REGULAR_FONT = 'DocumentFont'
+BOLD_FONT = 'DocumentFont-Bold'
+
+ARABIC_PATTERN = re.compile('[\u0600-\u06FF\u0750-\u077F\uFB50-\uFDFF\uFE70-\uFEFF]')
+
+# Item table columns: (key, English label, Arabic label, width, alignment)
+ITEM_COLUMNS = (
+    ('index', '#', '#', 8 * mm, 'center'),
+    ('item_name', 'Item', 'الصنف', 62 * mm, 'left'),
+    ('quantity', 'Qty', 'الكمية', 16 * mm, 'right'),
+    ('unit_price', 'Unit price', 'سعر الوحدة', 22 * mm, 'right'),
+    ('discount_amount', 'Discount', 'الخصم', 18 * mm, 'right'),
+    ('tax_amount', 'VAT', 'الضريبة', 20 * mm, 'right'),
+    ('total_amount', 'Total', 'الإجمالي', 34 * mm, 'right')
+)
+
+TITLES = {
+    'invoice': ('Tax Invoice', 'فاتورة ضريبية'),
+    'receipt': ('Receipt Voucher', 'سند قبض')
+}
+
+# Fonts and logo loaded once per process and reused by every render
+_resources = {}
+
+logger = logging.getLogger(__name__)
+
+def init_resources(font_path=None, bold_font_path=None, logo_path=None):
+    """Register the document fonts and load the company logo, once per process
+    
+    Pool workers call this as their initializer. Without a font file the
+    built-in Helvetica is used, which has no Arabic glyphs, and rendering
+    refuses documents with Arabic text.
+    """
+    key = (font_path, bold_font_path, logo_path)
+    if _resources.get('key') == key:
+        return _resources
+    
+    regular, bold = 'Helvetica', 'Helvetica-Bold'
+    if font_path and os.path.exists(font_path):
+        if REGULAR_FONT not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(TTFont(REGULAR_FONT, font_path))
+        regular = bold = REGULAR_FONT
+        if bold_font_path and os.path.exists(bold_font_path):
+            if BOLD_FONT not in pdfmetrics.getRegisteredFontNames():
+                pdfmetrics.registerFont(TTFont(BOLD_FONT, bold_font_path))
+            bold = BOLD_FONT
+    elif font_path:
+        logger.error(f"PDF font {font_path} not found; documents with Arabic text cannot be rendered")
+    
+    logo = None
+    if logo_path and os.path.exists(logo_path):
+        logo = ImageReader(logo_path)
+        # Decode once here rather than on every page drawn
+        logo.getRGBData()
+    
+    _resources.clear()
+    _resources.update({'key': key, 'font': regular, 'bold_font': bold, 'logo': logo})
+    return _resources
+
+@lru_cache(maxsize=4096)
+def shape(text):
+    """Join Arabic letters into their contextual forms and reorder right-to-left runs for drawing"""
+    if not text:
+        return ''
+    text = str(text)
+    if not ARABIC_PATTERN.search(text):
+        return text
+    return get_display(arabic_reshaper.reshape(text))
+
+def _amount(value):
+    return f'{value or 0:,.2f}'
+
+def _quantity(value):
+    return f'{value:,.3f}'.rstrip('0').rstrip('.') if value is not None else ''
+
+def _draw(pdf, x, y, text, font, size, align='left'):
+    pdf.setFont(font, size)
+    text = shape(text)
+    if align == 'right':
+        pdf.drawRightString(x, y, text)
+    elif align == 'center':
+        pdf.drawCentredString(x, y, text)
+    else:
+        pdf.drawString(x, y, text)
+
+def _fit(text, font, size, width):
+    """Cut text to fit a column width"""
+    text = str(text or '')
+    if pdfmetrics.stringWidth(shape(text), font, size) <= width:
+        return text
+    while text and pdfmetrics.stringWidth(shape(text + '…'), font, size) > width:
+        text = text[:-1]
+    return text + '…'
+
+def _draw_header(pdf, document, resources):
+    company = document['company']
+    font, bold = resources['font'], resources['bold_font']
+    top = PAGE_HEIGHT - MARGIN
+    
+    logo = resources['logo']
+    if logo is not None:
+        width, height = logo.getSize()
+        scale = min(40 * mm / width, 22 * mm / height)
+        pdf.drawImage(logo, MARGIN, top - height * scale, width * scale, height * scale, mask='auto')
+    
+    right = PAGE_WIDTH - MARGIN
+    _draw(pdf, right, top - 5 * mm, company.get('name'), bold, 13, 'right')
+    lines = [
+        company.get('name_en'),
+        company.get('address'),
+        f"VAT No. / الرقم الضريبي: {company['vat_number']}" if company.get('vat_number') else None,
+        f"CR / السجل التجاري: {company['commercial_register']}" if company.get('commercial_register') else None,
+        ' · '.join(value for value in (company.get('phone'), company.get('email')) if value)
+    ]
+    y = top - 11 * mm
+    for line in lines:
+        if line:
+            _draw(pdf, right, y, line, font, 8, 'right')
+            y -= 4.5 * mm
+    
+    english, arabic = TITLES[document['kind']]
+    y = top - 36 * mm
+    _draw(pdf, PAGE_WIDTH / 2, y, f'{english}  {arabic}', bold, 15, 'center')
+    pdf.line(MARGIN, y - 3 * mm, PAGE_WIDTH - MARGIN, y - 3 * mm)
+    return y - 10 * mm
+
+def _draw_fields(pdf, y, fields, resources, x, width):
+    """Draw (English label, Arabic label, value) rows in a box column"""
+    font, bold = resources['font'], resources['bold_font']
+    for english, arabic, value in fields:
+        if value in (None, ''):
+            continue
+        _draw(pdf, x, y, english, font, 8)
+        _draw(pdf, x + width, y, arabic, font, 8, 'right')
+        _draw(pdf, x + width / 2, y, _fit(value, bold, 9, width - 48 * mm), bold, 9, 'center')
+        y -= 5.5 * mm
+    return y
+
+def _draw_table_header(pdf, y, resources):
+    bold = resources['bold_font']
+    pdf.setFillGray(0.92)
+    pdf.rect(MARGIN, y - 7.5 * mm, PAGE_WIDTH - 2 * MARGIN, 10 * mm, stroke=0, fill=1)
+    pdf.setFillGray(0)
+    x = MARGIN
+    for _, english, arabic, width, _ in ITEM_COLUMNS:
+        _draw(pdf, x + width / 2, y - 1 * mm, arabic, bold, 7, 'center')
+        _draw(pdf, x + width / 2, y - 5 * mm, english, bold, 7, 'center')
+        x += width
+    return y - 12 * mm
+
+def _draw_footer(pdf, document, resources, page):
+    font = resources['font']
+    pdf.line(MARGIN, FOOTER_HEIGHT, PAGE_WIDTH - MARGIN, FOOTER_HEIGHT)
+    _draw(pdf, MARGIN, FOOTER_HEIGHT - 5 * mm, document['number'], font, 7)
+    _draw(pdf, PAGE_WIDTH - MARGIN, FOOTER_HEIGHT - 5 * mm, f'Page {page}', font, 7, 'right')
+
+def _render_invoice(pdf, document, resources):
+    font, bold = resources['font'], resources['bold_font']
+    customer = document['customer']
+    column_width = (PAGE_WIDTH - 2 * MARGIN - 10 * mm) / 2
+    page = 1
+    
+    y = _draw_header(pdf, document, resources)
+    left = _draw_fields(pdf, y, (
+        ('Invoice No.', 'رقم الفاتورة', document['number']),
+        ('Invoice date', 'تاريخ الفاتورة', document['date']),
+        ('Due date', 'تاريخ الاستحقاق', document.get('due_date')),
+        ('Reference', 'المرجع', document.get('reference')),
+        ('Currency', 'العملة', document.get('currency'))
+    ), resources, MARGIN, column_width)
+    right = _draw_fields(pdf, y, (
+        ('Customer', 'العميل', customer.get('name')),
+        ('Customer (EN)', 'اسم العميل', customer.get('name_en')),
+        ('VAT No.', 'الرقم الضريبي', customer.get('tax_number')),
+        ('Address', 'العنوان', customer.get('address')),
+        ('Phone', 'الهاتف', customer.get('phone'))
+    ), resources, MARGIN + column_width + 10 * mm, column_width)
+    
+    y = _draw_table_header(pdf, min(left, right) - 4 * mm, resources)
+    for index, item in enumerate(document['items'], start=1):
+        if y < FOOTER_HEIGHT + 10 * mm:
+            _draw_footer(pdf, document, resources, page)
+            pdf.showPage()
+            page += 1
+            y = _draw_table_header(pdf, PAGE_HEIGHT - MARGIN, resources)
+        values = dict(
+            item,
+            index=index,
+            quantity=_quantity(item['quantity']),
+            unit_price=_amount(item['unit_price']),
+            discount_amount=_amount(item['discount_amount']),
+            tax_amount=_amount(item['tax_amount']),
+            total_amount=_amount(item['total_amount'])
+        )
+        x = MARGIN
+        for key, _, _, width, align in ITEM_COLUMNS:
+            text = _fit(values[key], font, 8, width - 3 * mm)
+            if key == 'item_name' and ARABIC_PATTERN.search(text):
+                align = 'right'
+            anchor = {'left': x + 1.5 * mm, 'right': x + width - 1.5 * mm, 'center': x + width / 2}[align]
+            _draw(pdf, anchor, y, text, font, 8, align)
+            x += width
+        pdf.setStrokeGray(0.85)
+        pdf.line(MARGIN, y - 2.5 * mm, PAGE_WIDTH - MARGIN, y - 2.5 * mm)
+        pdf.setStrokeGray(0)
+        y -= 7 * mm
+    
+    totals = (
+        ('Subtotal', 'المجموع', document['subtotal']),
+        ('Discount', 'الخصم', document['discount_amount']),
+        ('VAT', 'ضريبة القيمة المضافة', document['tax_amount']),
+        ('Total', 'الإجمالي', document['total_amount']),
+        ('Paid', 'المدفوع', document['paid_amount']),
+        ('Balance due', 'المبلغ المستحق', document['balance_due'])
+    )
+    if y < FOOTER_HEIGHT + (len(totals) + 4) * 6 * mm:
+        _draw_footer(pdf, document, resources, page)
+        pdf.showPage()
+        page += 1
+        y = PAGE_HEIGHT - MARGIN
+    x = PAGE_WIDTH / 2
+    y -= 4 * mm
+    for english, arabic, value in totals:
+        weight = bold if english in ('Total', 'Balance due') else font
+        _draw(pdf, x, y, english, weight, 9)
+        _draw(pdf, x + 55 * mm, y, f"{_amount(value)} {document.get('currency') or ''}", weight, 9, 'right')
+        _draw(pdf, PAGE_WIDTH - MARGIN, y, arabic, weight, 9, 'right')
+        y -= 6 * mm
+    
+    y -= 4 * mm
+    for note in (document.get('notes'), document.get('terms_conditions')):
+        for line in (note or '').splitlines()[:4]:
+            if y < FOOTER_HEIGHT + 5 * mm:
+                break
+            text = _fit(line, font, 8, PAGE_WIDTH - 2 * MARGIN)
+            if ARABIC_PATTERN.search(text):
+                _draw(pdf, PAGE_WIDTH - MARGIN, y, text, font, 8, 'right')
+            else:
+                _draw(pdf, MARGIN, y, text, font, 8)
+            y -= 4.5 * mm
+    _draw_footer(pdf, document, resources, page)
+
+def _render_receipt(pdf, document, resources):
+    bold = resources['bold_font']
+    y = _draw_header(pdf, document, resources)
+    y = _draw_fields(pdf, y, (
+        ('Receipt No.', 'رقم السند', document['number']),
+        ('Date', 'التاريخ', document['date']),
+        ('Received from', 'استلمنا من', document.get('party_name')),
+        ('Payment method', 'طريقة الدفع', document.get('payment_method')),
+        ('Check No.', 'رقم الشيك', document.get('check_number')),
+        ('Bank', 'البنك', document.get('bank_name')),
+        ('For', 'وذلك عن', document.get('reference_number')),
+        ('Description', 'البيان', document.get('description'))
+    ), resources, MARGIN, PAGE_WIDTH - 2 * MARGIN)
+    
+    y -= 6 * mm
+    pdf.setFillGray(0.92)
+    pdf.rect(MARGIN, y - 4 * mm, PAGE_WIDTH - 2 * MARGIN, 12 * mm, stroke=0, fill=1)
+    pdf.setFillGray(0)
+    _draw(pdf, MARGIN + 3 * mm, y, 'Amount', bold, 11)
+    _draw(pdf, PAGE_WIDTH / 2, y, f"{_amount(document['amount'])} {document.get('currency') or ''}", bold, 13, 'center')
+    _draw(pdf, PAGE_WIDTH - MARGIN - 3 * mm, y, 'المبلغ', bold, 11, 'right')
+    
+    y -= 30 * mm
+    _draw(pdf, MARGIN + 30 * mm, y, 'Received by  المستلم', resources['font'], 9, 'center')
+    _draw(pdf, PAGE_WIDTH - MARGIN - 30 * mm, y, 'Signature  التوقيع', resources['font'], 9, 'center')
+    _draw_footer(pdf, document, resources, 1)
+
+RENDERERS = {
+    'invoice': _render_invoice,
+    'receipt': _render_receipt
+}
+
+def render_document(document):
+    """Render one invoice or receipt dict to PDF bytes with the process's loaded resources
+    
+    Raises RuntimeError when no document font is loaded: every document
+    carries Arabic labels, which Helvetica would draw as blank boxes.
+    """
+    resources = _resources if _resources else init_resources()
+    if resources['font'] != REGULAR_FONT:
+        raise RuntimeError(
+            "No PDF font with Arabic glyphs is loaded; set PDF_FONT_PATH to a TTF font such as Amiri-Regular.ttf"
+        )
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4, pageCompression=1)
+    pdf.setTitle(document['number'])
+    pdf.setAuthor(document['company'].get('name_en') or document['company'].get('name') or '')
+    RENDERERS[document['kind']](pdf, document, resources)
+    pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
@@ -0,0 +1,185 @@
+from sqlalchemy import insert
+from dateutil.relativedelta import relativedelta
+from datetime import datetime, date, timedelta
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import Account, FiscalPeriod, AccountBalanceSnapshot, ArchivedFiscalYear, db
+from app.services.account_balances import get_movement_query, get_snapshot_totals, signed_balance
+from app.services.document_numbers import advance_sequence, BOOKS_VERSION
+
+def get_fiscal_year_start(company, fiscal_year):
+    """Get the first day of a fiscal year from Company.fiscal_year_start"""
+    if company is not None and company.fiscal_year_start:
+        start = company.fiscal_year_start
+        # Clamp so a 29 February start still works in non-leap years
+        day = min(start.day, 28) if start.month == 2 else start.day
+        return date(fiscal_year, start.month, day)
+    return date(fiscal_year, 1, 1)
+
+def get_fiscal_year_for_date(company, entry_date):
+    """Get the fiscal year (named by its starting calendar year) containing a date"""
+    start = get_fiscal_year_start(company, entry_date.year)
+    return entry_date.year if entry_date >= start else entry_date.year - 1
+
+def generate_fiscal_periods(company, fiscal_year):
+    """Create the twelve monthly periods of a fiscal year if missing
+    
+    The company only sets where the fiscal year starts; periods belong to
+    the books, which are not split by company.
+    """
+    year_start = get_fiscal_year_start(company, fiscal_year)
+    
+    existing = {
+        period.start_date: period
+        for period in FiscalPeriod.query.filter_by(fiscal_year=fiscal_year).all()
+    }
+    
+    periods = []
+    for period_number in range(1, 13):
+        start_date = year_start + relativedelta(months=period_number - 1)
+        end_date = year_start + relativedelta(months=period_number) - timedelta(days=1)
+        
+        period = existing.get(start_date)
+        if period is None:
+            period = FiscalPeriod(
+                fiscal_year=fiscal_year,
+                period_number=period_number,
+                name=f"FY{fiscal_year}-P{str(period_number).zfill(2)}",
+                start_date=start_date,
+                end_date=end_date,
+                status='open'
+            )
+            db.session.add(period)
+        periods.append(period)
+    
+    db.session.commit()
+    return periods
+
+def close_period(period, closed_by_user_id):
+    """Close a fiscal period and write per-account closing balance snapshots"""
+    if period.is_closed():
+        raise ValueError(f"Fiscal period {period.name} is already closed")
+    
+    earlier_open = FiscalPeriod.query.filter(
+        FiscalPeriod.status == 'open',
+        FiscalPeriod.end_date < period.start_date
+    ).first()
+    if earlier_open:
+        raise ValueError(f"Fiscal period {earlier_open.name} must be closed first")
+    
+    # Seed from the previous snapshot so each close only scans its own period
+    previous = FiscalPeriod.query.filter(
+        FiscalPeriod.status == 'closed',
+        FiscalPeriod.end_date < period.start_date
+    ).order_by(FiscalPeriod.end_date.desc()).first()
+    
+    totals = {
+        account_id: [debit, credit]
+        for account_id, (debit, credit) in get_snapshot_totals(previous).items()
+    }
+    
+    start_date = previous.end_date + timedelta(days=1) if previous else None
+    for row in get_movement_query(as_of_date=period.end_date, start_date=start_date):
+        account_totals = totals.setdefault(row.account_id, [0.0, 0.0])
+        account_totals[0] += row.total_debit or 0
+        account_totals[1] += row.total_credit or 0
+    
+    accounts = db.session.query(Account.id, Account.normal_balance, Account.opening_balance).all()
+    now = datetime.utcnow()
+    
+    snapshot_rows = []
+    for account in accounts:
+        debit_total, credit_total = totals.get(account.id, (0.0, 0.0))
+        snapshot_rows.append({
+            'period_id': period.id,
+            'account_id': account.id,
+            'period_end': period.end_date,
+            'debit_total': round(debit_total, 2),
+            'credit_total': round(credit_total, 2),
+            'closing_balance': round(
+                (account.opening_balance or 0) + signed_balance(account.normal_balance, debit_total, credit_total), 2
+            ),
+            'created_at': now
+        })
+    
+    try:
+        if snapshot_rows:
+            db.session.execute(insert(AccountBalanceSnapshot), snapshot_rows)
+        
+        period.status = 'closed'
+        period.closed_by = closed_by_user_id
+        period.closed_at = now
+        advance_sequence(db.session.connection(), BOOKS_VERSION)
+        
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    
+    return period
+
+def close_periods_through(as_of_date, closed_by_user_id):
+    """Close every open period ending on or before a date, oldest first"""
+    periods = FiscalPeriod.query.filter(
+        FiscalPeriod.status == 'open',
+        FiscalPeriod.end_date <= as_of_date
+    ).order_by(FiscalPeriod.end_date).all()
+    
+    return [close_period(period, closed_by_user_id) for period in periods]
+
+def reopen_period(period):
+    """Reopen a period, dropping its snapshots and those of every later period"""
+    if not period.is_closed():
+        raise ValueError(f"Fiscal period {period.name} is not closed")
+    archived = ArchivedFiscalYear.query.filter(ArchivedFiscalYear.end_date >= period.start_date).first()
+    if archived is not None:
+        raise ValueError(f"Fiscal year {archived.fiscal_year} is archived and its periods cannot be reopened")
+    
+    later_periods = FiscalPeriod.query.filter(
+        FiscalPeriod.status == 'closed',
+        FiscalPeriod.start_date >= period.start_date
+    ).all()
+    period_ids = [later.id for later in later_periods]
+    
+    try:
+        AccountBalanceSnapshot.query.filter(
+            AccountBalanceSnapshot.period_id.in_(period_ids)
+        ).delete(synchronize_session=False)
+        
+        for later in later_periods:
+            later.status = 'open'
+            later.closed_by = None
+            later.closed_at = None
+        advance_sequence(db.session.connection(), BOOKS_VERSION)
+        
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    
+    return later_periods
+
+def check_dates_open(entry_dates):
+    """Raise if any posting date falls on or before the last closed period end
+    
+    Periods close in order, so everything up to the latest closed period is
+    covered by snapshots and must not change underneath them.
+    """
+    entry_dates = list(entry_dates)
+    if not entry_dates:
+        return
+    
+    latest_closed = FiscalPeriod.query.filter(
+        FiscalPeriod.status == 'closed'
+    ).order_by(FiscalPeriod.end_date.desc()).first()
+    
+    earliest_date = min(entry_dates)
+    if latest_closed and earliest_date <= latest_closed.end_date:
+        raise ValueError(
+            f"Fiscal period {latest_closed.name} is closed; cannot post entries dated "
+            f"{earliest_date.isoformat()}"
+        )
@@ -0,0 +1,261 @@
+from sqlalchemy import insert, event
+from sqlalchemy.orm import Session
+from flask import current_app, has_app_context
+from datetime import datetime
+import threading
+import time
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import Account, Payment, db
+from app.models.product import Product
+from app.models.money import to_minor_units, from_minor_units
+from app.services.invoice_builder import create_invoice, calculate_item_totals, calculate_invoice_totals
+from app.services.payment_import import allocate_payment_numbers, build_payment_entry
+from app.services.journal_posting import post_journal_batch
+from app.services.posting_rules import posting_accounts
+from app.services.account_paths import subtree_filter
+
+TENDER_METHODS = ('cash', 'card', 'bank', 'check')
+
+# Changed products wait on the session until the transaction commits
+SESSION_KEY = 'pos_catalog_stale'
+
+DEFAULT_CATALOG_TTL_SECONDS = 60
+
+class ProductCatalog:
+    """Sellable product data by id and barcode, loaded once and dropped when a product changes
+    
+    Product changes committed by this process drop the catalog at once;
+    changes made by other worker processes are picked up when it expires
+    after POS_CATALOG_TTL_SECONDS. Stock levels are not cached; the
+    invoice builder checks them as it decrements them.
+    """
+    
+    def __init__(self):
+        self.by_id = None
+        self.by_barcode = None
+        self.loaded_at = None
+        self.lock = threading.Lock()
+    
+    def get_ttl(self):
+        if has_app_context():
+            return current_app.config.get('POS_CATALOG_TTL_SECONDS', DEFAULT_CATALOG_TTL_SECONDS)
+        return DEFAULT_CATALOG_TTL_SECONDS
+    
+    def _load(self):
+        products = db.session.query(
+            Product.id, Product.code, Product.barcode, Product.name, Product.unit, Product.selling_price,
+            Product.is_taxable, Product.tax_rate
+        ).filter(Product.status == 'active').all()
+        self.by_id = {product.id: product for product in products}
+        self.by_barcode = {product.barcode: product for product in products if product.barcode}
+        self.loaded_at = time.monotonic()
+    
+    def get(self, product_id=None, barcode=None):
+        with self.lock:
+            if self.by_id is None or time.monotonic() - self.loaded_at >= self.get_ttl():
+                self._load()
+            if product_id is not None:
+                return self.by_id.get(product_id)
+            return self.by_barcode.get(barcode)
+    
+    def clear(self):
+        with self.lock:
+            self.by_id = None
+            self.by_barcode = None
+
+product_catalog = ProductCatalog()
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_products(session, flush_context):
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(instance, Product):
+            session.info[SESSION_KEY] = True
+            return
+
+@event.listens_for(Session, 'after_commit')
+def _clear_changed_products(session):
+    if session.info.pop(SESSION_KEY, None):
+        product_catalog.clear()
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed_products(session):
+    session.info.pop(SESSION_KEY, None)
+
+def price_basket(basket, allow_discounts=False):
+    """Resolve basket lines (barcode or product_id plus quantity) to invoice items from the catalog
+    
+    Prices always come from the catalog. Line discount percentages are
+    only taken when allow_discounts is set (the cashier holds the sales
+    discount permission).
+    """
+    if not basket:
+        raise ValueError('Basket is empty')
+    
+    items = []
+    for line in basket:
+        product = product_catalog.get(product_id=line.get('product_id'), barcode=line.get('barcode'))
+        if product is None:
+            raise ValueError(f"Product {line.get('barcode') or line.get('product_id')} is not available for sale")
+        
+        quantity = line.get('quantity', 1)
+        if isinstance(quantity, bool) or not isinstance(quantity, (int, float)) or quantity <= 0:
+            raise ValueError(f"Quantity of {product.name} must be a positive number")
+        
+        discount_percentage = line.get('discount_percentage') or 0
+        if discount_percentage:
+            if not allow_discounts:
+                raise ValueError('Permission denied for line discounts')
+            if isinstance(discount_percentage, bool) or not isinstance(discount_percentage, (int, float)) \
+                    or not 0 <= discount_percentage <= 100:
+                raise ValueError(f"Discount of {product.name} must be between 0 and 100 percent")
+        
+        items.append({
+            'product_id': product.id,
+            'item_name': product.name,
+            'quantity': quantity,
+            'unit': product.unit,
+            'unit_price': product.selling_price or 0,
+            'discount_percentage': discount_percentage,
+            'is_taxable': product.is_taxable,
+            'tax_rate': product.tax_rate
+        })
+    return items
+
+def check_tender_accounts(tenders):
+    """Check the accounts tenders name are cash or bank accounts, so the client cannot pick any ledger account"""
+    account_ids = {tender.get('bank_account_id') for tender in tenders if tender.get('bank_account_id')}
+    if not account_ids:
+        return
+    allowed = {
+        row.id for row in db.session.query(Account.id).filter(
+            Account.id.in_(account_ids),
+            subtree_filter(posting_accounts.get_codes()['cash'])
+        )
+    }
+    for account_id in account_ids:
+        if account_id not in allowed:
+            raise ValueError(f"Account {account_id} is not a cash or bank account")
+
+def apply_tenders(tenders, total):
+    """Split tenders into applied amounts and change due, all in minor units
+    
+    Only cash may exceed what is still owed; the excess is returned as change.
+    """
+    remaining = total
+    applied = []
+    change = 0
+    for tender in tenders:
+        method = tender.get('method', 'cash')
+        if method not in TENDER_METHODS:
+            raise ValueError(f"Unknown tender method {method}")
+        amount = to_minor_units(tender.get('amount') or 0)
+        if amount <= 0:
+            raise ValueError('Tender amounts must be greater than zero')
+        if amount > remaining:
+            if method != 'cash':
+                raise ValueError(f"{method.title()} tender exceeds the amount due")
+            change += amount - remaining
+            amount = remaining
+        remaining -= amount
+        if amount:
+            applied.append((tender, method, amount))
+    return applied, change
+
+def checkout(basket, tenders, customer_id, cashier_id, cashier_name=None, notes=None, allow_discounts=False):
+    """Sell a basket in one transaction and return the receipt
+    
+    The invoice, its items, stock movements, customer balance and posted
+    receipt payments (one per tender) commit together.
+    """
+    items = price_basket(basket, allow_discounts)
+    
+    # Tenders are settled against the in-memory total, so the invoice is inserted already paid
+    totals = calculate_invoice_totals({}, [calculate_item_totals(item) for item in items])
+    applied, change = apply_tenders(tenders or [], totals['total_amount'])
+    check_tender_accounts([tender for tender, _, _ in applied])
+    paid = sum(amount for _, _, amount in applied)
+    
+    # The invoice and its receipts share one local business date
+    now = datetime.utcnow()
+    today = datetime.now().date()
+    try:
+        invoice = create_invoice({
+            'customer_id': customer_id,
+            'invoice_date': today,
+            'items': items,
+            'paid_amount': from_minor_units(paid),
+            'notes': notes,
+            'reference': 'POS'
+        }, cashier_id, commit=False)
+        
+        payments = []
+        if applied:
+            numbers = allocate_payment_numbers('receipt', len(applied))
+            payment_rows = []
+            for (tender, method, amount), payment_number in zip(applied, numbers):
+                payment_rows.append({
+                    'payment_number': payment_number,
+                    'payment_date': today,
+                    'payment_type': 'receipt',
+                    'amount': from_minor_units(amount),
+                    'party_type': 'customer',
+                    'party_id': customer_id,
+                    'party_name': invoice['customer_name'],
+                    'payment_method': method,
+                    'bank_account_id': tender.get('bank_account_id'),
+                    'reference_type': 'invoice',
+                    'reference_id': invoice['id'],
+                    'reference_number': tender.get('reference') or invoice['invoice_number'],
+                    'description': f"POS sale {invoice['invoice_number']}",
+                    'currency': invoice['currency'],
+                    'status': 'posted',
+                    'created_by': cashier_id,
+                    'posted_by': cashier_id,
+                    'created_at': now,
+                    'posted_at': now
+                })
+            
+            result = db.session.execute(insert(Payment).returning(Payment.id, Payment.payment_number), payment_rows)
+            payment_ids = {row.payment_number: row.id for row in result}
+            for payment_row in payment_rows:
+                payment_row['id'] = payment_ids[payment_row['payment_number']]
+            posting_accounts.refresh()
+            post_journal_batch([build_payment_entry(payment_row) for payment_row in payment_rows], cashier_id, commit=False)
+            payments = payment_rows
+        
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    
+    return {
+        'invoice_id': invoice['id'],
+        'invoice_number': invoice['invoice_number'],
+        'date': invoice['invoice_date'],
+        'customer_id': invoice['customer_id'],
+        'customer_name': invoice['customer_name'],
+        'cashier': cashier_name,
+        'currency': invoice['currency'],
+        'items': invoice['items'],
+        'subtotal': invoice['subtotal'],
+        'discount_amount': invoice['discount_amount'],
+        'tax_amount': invoice['tax_amount'],
+        'total_amount': invoice['total_amount'],
+        'tenders': [
+            {
+                'payment_id': payment['id'],
+                'payment_number': payment['payment_number'],
+                'method': payment['payment_method'],
+                'amount': payment['amount']
+            }
+            for payment in payments
+        ],
+        'paid_amount': invoice['paid_amount'],
+        'change_due': from_minor_units(change),
+        'balance_due': invoice['balance_due']
+    }
@@ -0,0 +1,297 @@
+from sqlalchemy import func, update, bindparam
+from flask import current_app, has_app_context
+import threading
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import Account, db
+from app.models.invoice import Invoice, InvoiceItem
+from app.models.purchase import Purchase
+from app.models.product import Product
+from app.services.document_numbers import read_sequences, BOOKS_VERSION
+from app.services.journal_posting import post_journal_batch
+
+# Account roles used by the posting templates, by account code in the default chart.
+# Override per deployment with app.config['POSTING_ACCOUNT_CODES'].
+POSTING_ACCOUNT_CODES = {
+    'cash': '1100',
+    'receivable': '1200',
+    'other_receivable': '1250',
+    'inventory': '1300',
+    'vat_input': '1400',
+    'payable': '2100',
+    'vat_output': '2200',
+    'revenue': '4100',
+    'fx_gain': '4900',
+    'cogs': '5100',
+    'fx_loss': '5900'
+}
+
+# Journal templates per document type: (account role, side, document amount)
+POSTING_TEMPLATES = {
+    'invoice': [
+        ('receivable', 'debit', 'total'),
+        ('revenue', 'credit', 'net'),
+        ('vat_output', 'credit', 'tax'),
+        ('cogs', 'debit', 'cost'),
+        ('inventory', 'credit', 'cost')
+    ],
+    'purchase': [
+        ('inventory', 'debit', 'net'),
+        ('vat_input', 'debit', 'tax'),
+        ('payable', 'credit', 'total')
+    ]
+}
+
+# Documents that are ready to be journalized
+POSTABLE_STATUSES = {
+    'invoice': ('sent', 'paid', 'overdue'),
+    'purchase': ('received', 'completed', 'overdue')
+}
+
+PARTY_ACCOUNT_ROLES = {
+    'customer': 'receivable',
+    'supplier': 'payable'
+}
+
+class PostingAccounts:
+    """Account role to id map, resolved with one query and cached
+    
+    Posting batches call refresh() first, so account changes made by any
+    worker process are picked up by the next batch.
+    """
+    
+    def __init__(self):
+        self.ids = None
+        self.version = None
+        self.lock = threading.Lock()
+    
+    def get_codes(self):
+        codes = dict(POSTING_ACCOUNT_CODES)
+        if has_app_context():
+            codes.update(current_app.config.get('POSTING_ACCOUNT_CODES') or {})
+        return codes
+    
+    def resolve(self, role):
+        """Get the account id for a role"""
+        ids = self.ids
+        if ids is None:
+            with self.lock:
+                if self.ids is None:
+                    codes = self.get_codes()
+                    by_code = dict(
+                        db.session.query(Account.code, Account.id).filter(Account.code.in_(codes.values())).all()
+                    )
+                    self.ids = {name: by_code.get(code) for name, code in codes.items()}
+                ids = self.ids
+        
+        account_id = ids.get(role)
+        if account_id is None:
+            raise ValueError(f"No account is configured for posting role '{role}'")
+        return account_id
+    
+    def refresh(self):
+        """Drop the cached ids when the chart of accounts changed since they were resolved"""
+        version = read_sequences((BOOKS_VERSION,))
+        with self.lock:
+            if version != self.version:
+                self.ids = None
+                self.version = version
+    
+    def clear(self):
+        with self.lock:
+            self.ids = None
+            self.version = None
+
+posting_accounts = PostingAccounts()
+
+def get_party_account_id(party_type):
+    """Get the control account id for a payment party type"""
+    return posting_accounts.resolve(PARTY_ACCOUNT_ROLES.get(party_type, 'other_receivable'))
+
+def get_invoice_amounts(start_date, end_date):
+    """Get unposted invoice amounts in base currency (total, net, tax, cost) with two grouped queries"""
+    invoices = db.session.query(
+        Invoice.id, Invoice.invoice_number, Invoice.invoice_date, Invoice.total_amount, Invoice.tax_amount,
+        Invoice.exchange_rate
+    ).filter(
+        Invoice.status.in_(POSTABLE_STATUSES['invoice']),
+        Invoice.journal_entry_id.is_(None),
+        Invoice.invoice_date >= start_date,
+        Invoice.invoice_date <= end_date
+    ).order_by(Invoice.invoice_date, Invoice.id).all()
+    
+    if not invoices:
+        return []
+    
+    costs = dict(
+        db.session.query(
+            InvoiceItem.invoice_id,
+            func.sum(InvoiceItem.quantity * func.coalesce(Product.cost_price, 0.0))
+        ).join(
+            Product, Product.id == InvoiceItem.product_id
+        ).join(
+            Invoice, Invoice.id == InvoiceItem.invoice_id
+        ).filter(
+            Invoice.status.in_(POSTABLE_STATUSES['invoice']),
+            Invoice.journal_entry_id.is_(None),
+            Invoice.invoice_date >= start_date,
+            Invoice.invoice_date <= end_date,
+            # Only stocked goods leave inventory, as in the invoice builder's stock movements
+            Product.track_inventory.is_(True),
+            Product.type != 'service'
+        ).group_by(InvoiceItem.invoice_id).all()
+    )
+    
+    return [
+        {
+            'id': invoice.id,
+            'number': invoice.invoice_number,
+            'date': invoice.invoice_date,
+            'total': (invoice.total_amount or 0) * (invoice.exchange_rate or 1),
+            'tax': (invoice.tax_amount or 0) * (invoice.exchange_rate or 1),
+            'net': ((invoice.total_amount or 0) - (invoice.tax_amount or 0)) * (invoice.exchange_rate or 1),
+            'cost': costs.get(invoice.id) or 0
+        }
+        for invoice in invoices
+    ]
+
+def get_purchase_amounts(start_date, end_date):
+    """Get unposted purchase amounts in base currency (total, net, tax) with one query"""
+    purchases = db.session.query(
+        Purchase.id, Purchase.purchase_number, Purchase.purchase_date, Purchase.total_amount, Purchase.tax_amount,
+        Purchase.exchange_rate
+    ).filter(
+        Purchase.status.in_(POSTABLE_STATUSES['purchase']),
+        Purchase.journal_entry_id.is_(None),
+        Purchase.purchase_date >= start_date,
+        Purchase.purchase_date <= end_date
+    ).order_by(Purchase.purchase_date, Purchase.id).all()
+    
+    return [
+        {
+            'id': purchase.id,
+            'number': purchase.purchase_number,
+            'date': purchase.purchase_date,
+            'total': (purchase.total_amount or 0) * (purchase.exchange_rate or 1),
+            'tax': (purchase.tax_amount or 0) * (purchase.exchange_rate or 1),
+            'net': ((purchase.total_amount or 0) - (purchase.tax_amount or 0)) * (purchase.exchange_rate or 1),
+            'cost': 0
+        }
+        for purchase in purchases
+    ]
+
+def build_template_lines(document_type, amounts, description):
+    """Apply a posting template to summed document amounts"""
+    lines = []
+    for role, side, amount_key in POSTING_TEMPLATES[document_type]:
+        amount = round(amounts.get(amount_key, 0), 2)
+        if not amount:
+            continue
+        # Negative amounts (credit notes, returns) flip to the other side
+        if amount < 0:
+            side, amount = ('credit' if side == 'debit' else 'debit'), -amount
+        lines.append({
+            'account_id': posting_accounts.resolve(role),
+            'description': description,
+            'debit_amount': amount if side == 'debit' else 0,
+            'credit_amount': amount if side == 'credit' else 0
+        })
+    return lines
+
+def build_document_entries(document_type, documents, summarize=True):
+    """Group documents into journal entries: one per day, or one per document
+    
+    Returns a list of (entry_data, document_ids).
+    """
+    groups = {}
+    for document in documents:
+        key = document['date'] if summarize else document['id']
+        groups.setdefault(key, []).append(document)
+    
+    entries = []
+    for group in groups.values():
+        total = round(sum(document['total'] for document in group), 2)
+        tax = round(sum(document['tax'] for document in group), 2)
+        # Net is derived from the rounded figures so the entry always balances
+        amounts = {
+            'total': total,
+            'tax': tax,
+            'net': round(total - tax, 2),
+            'cost': round(sum(document['cost'] for document in group), 2)
+        }
+        
+        if summarize:
+            description = f"{document_type.title()}s summary {group[0]['date'].isoformat()} ({len(group)} documents)"
+            reference_id, reference_number = None, None
+        else:
+            description = f"{document_type.title()} {group[0]['number']}"
+            reference_id, reference_number = group[0]['id'], group[0]['number']
+        
+        lines = build_template_lines(document_type, amounts, description)
+        if not lines:
+            continue
+        
+        entries.append(({
+            'entry_date': group[0]['date'],
+            'description': description,
+            'reference_type': document_type,
+            'reference_id': reference_id,
+            'reference_number': reference_number,
+            'lines': lines
+        }, [document['id'] for document in group]))
+    
+    return entries
+
+def post_documents(start_date, end_date, posted_by_user_id, document_types=('invoice', 'purchase'), summarize=True):
+    """Journalize unposted invoices and purchases in a date range in one transaction
+    
+    With summarize=True each day gets one entry per document type; otherwise
+    each document gets its own entry. Posted documents are linked to their
+    journal entry so they are never posted twice.
+    """
+    loaders = {'invoice': get_invoice_amounts, 'purchase': get_purchase_amounts}
+    models = {'invoice': Invoice, 'purchase': Purchase}
+    posting_accounts.refresh()
+    
+    entries = []
+    for document_type in document_types:
+        for entry_data, document_ids in build_document_entries(
+            document_type, loaders[document_type](start_date, end_date), summarize
+        ):
+            entries.append((document_type, entry_data, document_ids))
+    
+    if not entries:
+        return {'entries': 0, 'journal_entry_ids': [], 'documents': {document_type: 0 for document_type in document_types}}
+    
+    try:
+        entry_ids = post_journal_batch([entry_data for _, entry_data, _ in entries], posted_by_user_id, commit=False)
+        
+        counts = {document_type: 0 for document_type in document_types}
+        for document_type in document_types:
+            rows = [
+                {'b_document_id': document_id, 'b_entry_id': entry_id}
+                for (entry_type, _, document_ids), entry_id in zip(entries, entry_ids)
+                if entry_type == document_type
+                for document_id in document_ids
+            ]
+            if not rows:
+                continue
+            table = models[document_type].__table__
+            db.session.execute(
+                update(table).where(table.c.id == bindparam('b_document_id')).values(
+                    journal_entry_id=bindparam('b_entry_id')
+                ),
+                rows
+            )
+            counts[document_type] = len(rows)
+        
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    
+    return {'entries': len(entry_ids), 'journal_entry_ids': entry_ids, 'documents': counts}
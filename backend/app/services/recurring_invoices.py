@@ -0,0 +1,265 @@
+from sqlalchemy import select, insert, update, bindparam
+from dateutil.relativedelta import relativedelta
+from datetime import datetime, timedelta
+import threading
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import db
+from app.models.invoice import RecurringInvoice, RecurringInvoiceItem, RecurringInvoiceRun
+from app.models.customer import Customer
+from app.services.invoice_builder import load_products, calculate_items_totals, create_invoices
+
+FREQUENCIES = {
+    'weekly': relativedelta(weeks=1),
+    'monthly': relativedelta(months=1),
+    'quarterly': relativedelta(months=3),
+    'yearly': relativedelta(years=1)
+}
+
+INVOICE_STATUSES = ('draft', 'sent')
+
+# Template columns the generator reads; plain rows survive the per-batch commits
+TEMPLATE_COLUMNS = (
+    RecurringInvoice.id, RecurringInvoice.customer_id, RecurringInvoice.frequency, RecurringInvoice.interval_count,
+    RecurringInvoice.start_date, RecurringInvoice.end_date, RecurringInvoice.last_run_date,
+    RecurringInvoice.periods_generated, RecurringInvoice.invoice_status, RecurringInvoice.payment_terms,
+    RecurringInvoice.discount_percentage, RecurringInvoice.discount_amount, RecurringInvoice.currency,
+    RecurringInvoice.exchange_rate, RecurringInvoice.notes, RecurringInvoice.terms_conditions,
+    RecurringInvoice.status, RecurringInvoice.created_by
+)
+
+def period_date(template, index):
+    """Get the date of a template's index-th period, counted from its start date
+    
+    Counting from the start date keeps month-end anchors (31 Jan, 28 Feb,
+    31 Mar) instead of drifting to the shortest month.
+    """
+    return template.start_date + FREQUENCIES[template.frequency] * ((template.interval_count or 1) * index)
+
+def create_recurring_invoice(data, created_by):
+    """Create a recurring invoice template with its items"""
+    if not data.get('name'):
+        raise ValueError('name is required')
+    if not data.get('items'):
+        raise ValueError('At least one item is required')
+    frequency = data.get('frequency', 'monthly')
+    if frequency not in FREQUENCIES:
+        raise ValueError(f"frequency must be one of {', '.join(FREQUENCIES)}")
+    interval_count = int(data.get('interval_count') or 1)
+    if interval_count < 1:
+        raise ValueError('interval_count must be at least 1')
+    invoice_status = data.get('invoice_status', 'sent')
+    if invoice_status not in INVOICE_STATUSES:
+        raise ValueError(f"invoice_status must be one of {', '.join(INVOICE_STATUSES)}")
+    customer = db.session.get(Customer, data['customer_id'])
+    if customer is None:
+        raise ValueError(f"Customer {data['customer_id']} does not exist")
+    
+    start_date = data.get('start_date') or datetime.now().date()
+    end_date = data.get('end_date')
+    if end_date and end_date < start_date:
+        raise ValueError('end_date must be after start_date')
+    
+    template = RecurringInvoice(
+        name=data['name'],
+        customer_id=customer.id,
+        frequency=frequency,
+        interval_count=interval_count,
+        start_date=start_date,
+        end_date=end_date,
+        next_run_date=start_date,
+        invoice_status=invoice_status,
+        payment_terms=data.get('payment_terms'),
+        discount_percentage=data.get('discount_percentage') or 0,
+        discount_amount=data.get('discount_amount') or 0,
+        currency=data.get('currency'),
+        exchange_rate=data.get('exchange_rate') or 1.0,
+        notes=data.get('notes'),
+        terms_conditions=data.get('terms_conditions'),
+        created_by=created_by
+    )
+    for item in data['items']:
+        if not item.get('product_id') and not item.get('item_name'):
+            raise ValueError('Each item needs a product_id or an item_name')
+        if not item.get('quantity') or item['quantity'] <= 0:
+            raise ValueError('Item quantity must be greater than zero')
+        template.items.append(RecurringInvoiceItem(
+            product_id=item.get('product_id'),
+            item_name=item.get('item_name'),
+            item_description=item.get('item_description'),
+            unit=item.get('unit'),
+            quantity=item['quantity'],
+            unit_price=item.get('unit_price'),
+            discount_percentage=item.get('discount_percentage') or 0,
+            discount_amount=item.get('discount_amount') or 0,
+            is_taxable=item.get('is_taxable'),
+            tax_rate=item.get('tax_rate')
+        ))
+    
+    try:
+        db.session.add(template)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return template
+
+def _due_periods(template, run_date, billed):
+    """List (index, date) of a template's periods due by run_date that are not billed yet"""
+    periods = []
+    index = template.periods_generated or 0
+    while True:
+        date = period_date(template, index)
+        if date > run_date or (template.end_date and date > template.end_date):
+            return periods, index, date
+        if (template.id, date) not in billed:
+            periods.append((index, date))
+        index += 1
+
+def _generate_batch(templates, run_date):
+    """Bill every due period of a batch of templates in one transaction"""
+    template_ids = [template.id for template in templates]
+    items = {}
+    for item in db.session.query(RecurringInvoiceItem).filter(
+        RecurringInvoiceItem.recurring_invoice_id.in_(template_ids)
+    ).order_by(RecurringInvoiceItem.id):
+        items.setdefault(item.recurring_invoice_id, []).append(item.to_item())
+    
+    # Periods billed by an earlier run that stopped before moving the schedule on
+    billed = {
+        (row.recurring_invoice_id, row.period_date)
+        for row in db.session.execute(
+            select(RecurringInvoiceRun.recurring_invoice_id, RecurringInvoiceRun.period_date).where(
+                RecurringInvoiceRun.recurring_invoice_id.in_(template_ids),
+                RecurringInvoiceRun.period_date <= run_date
+            )
+        )
+    }
+    
+    # Template lines are identical every period, so compute them once for the whole batch
+    item_groups = [items.get(template.id, []) for template in templates]
+    products = load_products(item_groups)
+    all_lines = calculate_items_totals([item for group in item_groups for item in group], products)
+    
+    invoices, line_groups, periods, schedule_rows = [], [], [], []
+    offset = 0
+    now = datetime.utcnow()
+    for template, group in zip(templates, item_groups):
+        lines = all_lines[offset:offset + len(group)]
+        offset += len(group)
+        due, next_index, next_date = _due_periods(template, run_date, billed)
+        for _, date in due:
+            if not lines:
+                raise ValueError(f"Recurring invoice {template.id} has no items")
+            invoices.append({
+                'customer_id': template.customer_id,
+                'invoice_date': date,
+                'due_date': date + timedelta(days=template.payment_terms) if template.payment_terms is not None else None,
+                'status': template.invoice_status or 'sent',
+                'discount_percentage': template.discount_percentage,
+                'discount_amount': template.discount_amount,
+                'notes': template.notes,
+                'terms_conditions': template.terms_conditions,
+                'reference': f"REC-{template.id}-{date.isoformat()}",
+                'currency': template.currency,
+                'exchange_rate': template.exchange_rate
+            })
+            line_groups.append(lines)
+            periods.append((template.id, date))
+        finished = template.end_date is not None and next_date > template.end_date
+        schedule_rows.append({
+            'b_template_id': template.id,
+            'b_next_run_date': next_date,
+            'b_last_run_date': due[-1][1] if due else template.last_run_date,
+            'b_periods': next_index,
+            'b_status': 'completed' if finished else template.status
+        })
+    
+    try:
+        created = create_invoices(invoices, templates[0].created_by, commit=False, calculated_lines=line_groups)
+        if created:
+            db.session.execute(insert(RecurringInvoiceRun), [
+                {'recurring_invoice_id': template_id, 'period_date': date, 'invoice_id': invoice['id'], 'created_at': now}
+                for (template_id, date), invoice in zip(periods, created)
+            ])
+        table = RecurringInvoice.__table__
+        db.session.execute(
+            update(table).where(table.c.id == bindparam('b_template_id')).values(
+                next_run_date=bindparam('b_next_run_date'),
+                last_run_date=bindparam('b_last_run_date'),
+                periods_generated=bindparam('b_periods'),
+                status=bindparam('b_status'),
+                updated_at=now
+            ),
+            schedule_rows
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return created
+
+def generate_recurring_invoices(run_date=None, batch_size=500):
+    """Create every invoice due from active recurring templates by run_date
+    
+    Templates are processed in batches, each one transaction: one block of
+    invoice numbers, bulk inserted headers and items, and a run row per
+    billed period. The run rows are unique per template and period, so
+    rerunning for the same date (or overlapping runs) never bills a
+    period twice; missed periods are caught up.
+    """
+    run_date = run_date or datetime.now().date()
+    counts = {'templates': 0, 'invoices': 0, 'total_amount': 0.0}
+    
+    template_ids = [
+        row.id for row in db.session.execute(
+            select(RecurringInvoice.id).where(
+                RecurringInvoice.status == 'active',
+                RecurringInvoice.next_run_date <= run_date
+            ).order_by(RecurringInvoice.id)
+        )
+    ]
+    for start in range(0, len(template_ids), batch_size):
+        batch_ids = template_ids[start:start + batch_size]
+        templates = db.session.execute(
+            select(*TEMPLATE_COLUMNS).where(RecurringInvoice.id.in_(batch_ids)).order_by(RecurringInvoice.id)
+        ).all()
+        
+        # Invoices are created by each template's owner
+        by_creator = {}
+        for template in templates:
+            by_creator.setdefault(template.created_by, []).append(template)
+        for creator_templates in by_creator.values():
+            created = _generate_batch(creator_templates, run_date)
+            counts['templates'] += len(creator_templates)
+            counts['invoices'] += len(created)
+            counts['total_amount'] += sum(invoice['total_amount'] for invoice in created)
+    
+    counts['total_amount'] = round(counts['total_amount'], 2)
+    return counts
+
+def start_recurring_invoice_generator(app):
+    """Run the generator in a daemon thread every RECURRING_INVOICE_INTERVAL_MINUTES (0 disables it)"""
+    interval = app.config.get('RECURRING_INVOICE_INTERVAL_MINUTES', 0)
+    if not interval:
+        return None
+    
+    stopped = threading.Event()
+    
+    def run():
+        while not stopped.wait(interval * 60):
+            with app.app_context():
+                try:
+                    generate_recurring_invoices()
+                except Exception as e:
+                    app.logger.error(f"Recurring invoice generation failed: {str(e)}")
+                finally:
+                    db.session.remove()
+    
+    thread = threading.Thread(target=run, name='recurring-invoice-generator', daemon=True)
+    thread.start()
+    return stopped
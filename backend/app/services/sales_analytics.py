@@ -0,0 +1,178 @@
+from sqlalchemy import select, func, extract
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import db
+from app.models.money import minor_units, from_minor_units
+from app.models.invoice import SalesDailyTotal
+from app.models.product import Product, Category
+from app.models.customer import Customer
+
+RANK_FIELDS = ('net_amount', 'quantity', 'gross_profit')
+
+def _in_range(query, start_date, end_date):
+    if start_date:
+        query = query.where(SalesDailyTotal.sale_date >= start_date)
+    if end_date:
+        query = query.where(SalesDailyTotal.sale_date <= end_date)
+    return query
+
+def _measures():
+    net = func.sum(minor_units(SalesDailyTotal.net_amount))
+    cost = func.sum(minor_units(SalesDailyTotal.cost_amount))
+    return (
+        func.sum(SalesDailyTotal.quantity).label('quantity'),
+        net.label('net_amount'),
+        func.sum(minor_units(SalesDailyTotal.tax_amount)).label('tax_amount'),
+        (net - cost).label('gross_profit'),
+        func.sum(SalesDailyTotal.line_count).label('line_count')
+    )
+
+def _measures_to_dict(row):
+    return {
+        'quantity': row.quantity or 0,
+        'net_amount': from_minor_units(int(row.net_amount or 0)),
+        'tax_amount': from_minor_units(int(row.tax_amount or 0)),
+        'gross_profit': from_minor_units(int(row.gross_profit or 0)),
+        'line_count': int(row.line_count or 0)
+    }
+
+def _month(row):
+    return f'{int(row.year):04d}-{int(row.month):02d}'
+
+def get_top_products(start_date=None, end_date=None, rank_by='net_amount', limit=10):
+    """Rank products sold in a date range by net sales, quantity or gross profit"""
+    if rank_by not in RANK_FIELDS:
+        raise ValueError(f"rank_by must be one of {', '.join(RANK_FIELDS)}")
+    
+    measures = _measures()
+    rank_column = {measure.name: measure for measure in measures}[rank_by]
+    query = _in_range(
+        select(SalesDailyTotal.product_id, Product.code, Product.name, *measures).outerjoin(
+            Product, Product.id == SalesDailyTotal.product_id
+        ).group_by(SalesDailyTotal.product_id, Product.code, Product.name),
+        start_date, end_date
+    ).order_by(rank_column.desc(), SalesDailyTotal.product_id)
+    if limit:
+        query = query.limit(limit)
+    
+    products = []
+    for rank, row in enumerate(db.session.execute(query), start=1):
+        products.append(dict(
+            _measures_to_dict(row),
+            rank=rank,
+            product_id=row.product_id,
+            code=row.code,
+            name=row.name
+        ))
+    
+    return {
+        'start_date': start_date.isoformat() if start_date else None,
+        'end_date': end_date.isoformat() if end_date else None,
+        'rank_by': rank_by,
+        'products': products
+    }
+
+def get_sales_by_category_month(start_date=None, end_date=None):
+    """Sales per product category per calendar month, with a total per category"""
+    year = extract('year', SalesDailyTotal.sale_date).label('year')
+    month = extract('month', SalesDailyTotal.sale_date).label('month')
+    query = _in_range(
+        select(SalesDailyTotal.category_id, Category.name, year, month, *_measures()).outerjoin(
+            Category, Category.id == SalesDailyTotal.category_id
+        ).group_by(SalesDailyTotal.category_id, Category.name, year, month),
+        start_date, end_date
+    ).order_by(SalesDailyTotal.category_id, year, month)
+    
+    categories = {}
+    months = set()
+    for row in db.session.execute(query):
+        category = categories.setdefault(row.category_id, {
+            'category_id': row.category_id,
+            'name': row.name,
+            'months': {},
+            'net_amount': 0
+        })
+        category['months'][_month(row)] = _measures_to_dict(row)
+        category['net_amount'] += int(row.net_amount or 0)
+        months.add(_month(row))
+    
+    results = sorted(categories.values(), key=lambda category: category['net_amount'], reverse=True)
+    for category in results:
+        category['net_amount'] = from_minor_units(category['net_amount'])
+    
+    return {
+        'start_date': start_date.isoformat() if start_date else None,
+        'end_date': end_date.isoformat() if end_date else None,
+        'months': sorted(months),
+        'categories': results
+    }
+
+def get_customer_trends(start_date=None, end_date=None, customer_ids=None, limit=10):
+    """Monthly sales series for the given customers, or the top customers by net sales
+    
+    Each customer also gets the change of its last month with sales against
+    the one before it, as a percentage.
+    """
+    if customer_ids is None:
+        net = func.sum(minor_units(SalesDailyTotal.net_amount))
+        top_query = _in_range(
+            select(SalesDailyTotal.customer_id).group_by(SalesDailyTotal.customer_id),
+            start_date, end_date
+        ).order_by(net.desc(), SalesDailyTotal.customer_id).limit(limit or 10)
+        customer_ids = [row.customer_id for row in db.session.execute(top_query)]
+    if not customer_ids:
+        return {
+            'start_date': start_date.isoformat() if start_date else None,
+            'end_date': end_date.isoformat() if end_date else None,
+            'months': [],
+            'customers': []
+        }
+    
+    year = extract('year', SalesDailyTotal.sale_date).label('year')
+    month = extract('month', SalesDailyTotal.sale_date).label('month')
+    query = _in_range(
+        select(SalesDailyTotal.customer_id, year, month, *_measures()).where(
+            SalesDailyTotal.customer_id.in_(customer_ids)
+        ).group_by(SalesDailyTotal.customer_id, year, month),
+        start_date, end_date
+    ).order_by(SalesDailyTotal.customer_id, year, month)
+    
+    parties = {
+        customer.id: customer
+        for customer in db.session.query(Customer.id, Customer.code, Customer.name).filter(Customer.id.in_(customer_ids))
+    }
+    customers = {
+        customer_id: {
+            'customer_id': customer_id,
+            'code': parties[customer_id].code if customer_id in parties else None,
+            'name': parties[customer_id].name if customer_id in parties else None,
+            'months': {},
+            'net_amount': 0
+        }
+        for customer_id in customer_ids
+    }
+    months = set()
+    for row in db.session.execute(query):
+        customer = customers[row.customer_id]
+        customer['months'][_month(row)] = _measures_to_dict(row)
+        customer['net_amount'] += int(row.net_amount or 0)
+        months.add(_month(row))
+    
+    for customer in customers.values():
+        customer['net_amount'] = from_minor_units(customer['net_amount'])
+        series = [customer['months'][key]['net_amount'] for key in sorted(customer['months'])]
+        if len(series) >= 2 and series[-2]:
+            customer['last_month_change'] = round((series[-1] - series[-2]) / abs(series[-2]) * 100, 2)
+        else:
+            customer['last_month_change'] = None
+    
+    return {
+        'start_date': start_date.isoformat() if start_date else None,
+        'end_date': end_date.isoformat() if end_date else None,
+        'months': sorted(months),
+        'customers': [customers[customer_id] for customer_id in customer_ids]
+    }
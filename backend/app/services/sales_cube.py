@@ -0,0 +1,209 @@
+from sqlalchemy import select, insert, update, delete, bindparam, func, literal
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import db
+from app.models.money import Money, MINOR_UNITS, minor_units, from_minor_units
+from app.models.invoice import SalesDailyTotal
+from app.models.product import Product
+from app.services.archive import archive_registry, invoice_tables
+
+# Invoices counted as sales; everything else is left out of the cube.
+# Only invoices issued through the invoice builder are added as they are created; an invoice
+# moved into or out of these statuses any other way shows up after rebuild_sales_cube.
+UNSOLD_STATUSES = ('draft', 'cancelled')
+
+def _in_base(minor, rate):
+    if not rate or rate == 1:
+        return minor
+    return int((Decimal(minor) * Decimal(str(rate))).to_integral_value(rounding=ROUND_HALF_UP))
+
+def collect_sales_deltas(invoice, lines, products, deltas=None):
+    """Sum one issued invoice's lines per (sale date, product, customer)
+    
+    invoice is a header dict (invoice_date, customer_id, exchange_rate);
+    lines carry product_id, quantity and minor-unit subtotal,
+    discount_amount and tax_amount, as computed by the invoice builder.
+    products maps product ids to rows with category_id and cost_price.
+    """
+    if deltas is None:
+        deltas = {}
+    rate = invoice.get('exchange_rate') or 1.0
+    for line in lines:
+        product = products.get(line['product_id'])
+        key = (invoice['invoice_date'], line['product_id'], invoice['customer_id'])
+        totals = deltas.setdefault(key, {
+            'category_id': product.category_id if product is not None else None,
+            'quantity': 0.0, 'net_amount': 0, 'tax_amount': 0, 'cost_amount': 0, 'line_count': 0
+        })
+        cost = round(line['quantity'] * (product.cost_price or 0) * MINOR_UNITS) if product is not None else 0
+        totals['quantity'] += line['quantity']
+        totals['net_amount'] += _in_base(line['subtotal'] - line['discount_amount'], rate)
+        totals['tax_amount'] += _in_base(line['tax_amount'], rate)
+        totals['cost_amount'] += cost
+        totals['line_count'] += 1
+    return deltas
+
+def apply_sales_deltas(deltas):
+    """Add sales deltas to the cube: one executemany UPDATE plus one bulk INSERT
+    
+    Runs inside the caller's transaction so the cube commits with the
+    invoices it summarizes.
+    """
+    if not deltas:
+        return
+    
+    table = SalesDailyTotal.__table__
+    dates = {key[0] for key in deltas}
+    customer_ids = {key[2] for key in deltas}
+    existing = {
+        (row.sale_date, row.product_id, row.customer_id): row.id
+        for row in db.session.execute(
+            select(table.c.id, table.c.sale_date, table.c.product_id, table.c.customer_id).where(
+                table.c.sale_date.in_(dates),
+                table.c.customer_id.in_(customer_ids)
+            )
+        )
+        if (row.sale_date, row.product_id, row.customer_id) in deltas
+    }
+    
+    now = datetime.utcnow()
+    new_rows, changed_rows = [], []
+    for key, totals in deltas.items():
+        total_id = existing.get(key)
+        if total_id:
+            changed_rows.append({
+                'b_total_id': total_id,
+                'b_quantity': totals['quantity'],
+                'b_net': from_minor_units(totals['net_amount']),
+                'b_tax': from_minor_units(totals['tax_amount']),
+                'b_cost': from_minor_units(totals['cost_amount']),
+                'b_lines': totals['line_count']
+            })
+        else:
+            sale_date, product_id, customer_id = key
+            new_rows.append({
+                'sale_date': sale_date,
+                'product_id': product_id,
+                'customer_id': customer_id,
+                'category_id': totals['category_id'],
+                'quantity': totals['quantity'],
+                'net_amount': from_minor_units(totals['net_amount']),
+                'tax_amount': from_minor_units(totals['tax_amount']),
+                'cost_amount': from_minor_units(totals['cost_amount']),
+                'line_count': totals['line_count'],
+                'updated_at': now
+            })
+    
+    if changed_rows:
+        db.session.execute(
+            update(table).where(table.c.id == bindparam('b_total_id')).values(
+                quantity=table.c.quantity + bindparam('b_quantity'),
+                net_amount=table.c.net_amount + bindparam('b_net', type_=Money()),
+                tax_amount=table.c.tax_amount + bindparam('b_tax', type_=Money()),
+                cost_amount=table.c.cost_amount + bindparam('b_cost', type_=Money()),
+                line_count=table.c.line_count + bindparam('b_lines'),
+                updated_at=now
+            ),
+            changed_rows
+        )
+    if new_rows:
+        db.session.execute(insert(SalesDailyTotal), new_rows)
+
+def _chunk_select(start_date, end_date, connection):
+    """INSERT ... SELECT source aggregating one date range of issued invoice lines"""
+    invoices, items = invoice_tables(start_date, end_date, connection)
+    rate = func.coalesce(invoices.exchange_rate, 1.0)
+    return select(
+        invoices.invoice_date,
+        items.product_id,
+        invoices.customer_id,
+        func.max(Product.category_id),
+        func.sum(items.quantity),
+        func.sum(func.round((minor_units(items.subtotal) - func.coalesce(minor_units(items.discount_amount), 0)) * rate)),
+        func.sum(func.round(func.coalesce(minor_units(items.tax_amount), 0) * rate)),
+        func.sum(func.round(items.quantity * func.coalesce(Product.cost_price, 0) * MINOR_UNITS)),
+        func.count(items.id),
+        literal(datetime.utcnow())
+    ).join(
+        invoices, invoices.id == items.invoice_id
+    ).outerjoin(
+        Product, Product.id == items.product_id
+    ).where(
+        invoices.status.notin_(UNSOLD_STATUSES),
+        invoices.invoice_date.between(start_date, end_date)
+    ).group_by(invoices.invoice_date, items.product_id, invoices.customer_id)
+
+def _rebuild_chunk(engine, start_date, end_date, clear):
+    """Recompute one date range of the cube in its own transaction"""
+    table = SalesDailyTotal.__table__
+    with engine.begin() as connection:
+        if clear:
+            connection.execute(delete(table).where(table.c.sale_date.between(start_date, end_date)))
+        connection.execute(insert(table).from_select(
+            ['sale_date', 'product_id', 'customer_id', 'category_id', 'quantity', 'net_amount', 'tax_amount',
+             'cost_amount', 'line_count', 'updated_at'],
+            _chunk_select(start_date, end_date, connection)
+        ))
+    return start_date, end_date
+
+def rebuild_sales_cube(start_date=None, end_date=None, chunk_days=31, workers=4, only_if_empty=False):
+    """Recompute the cube from invoice lines in date chunks, several chunks at a time
+    
+    Each chunk is one INSERT ... SELECT ... GROUP BY in its own transaction,
+    so an interrupted backfill can be repeated for the missing range.
+    Costs use current product cost prices. SQLite runs the chunks one at a
+    time, since it allows a single writer. Returns the number of chunks,
+    or None when skipped.
+    """
+    if only_if_empty and db.session.query(SalesDailyTotal.id).first() is not None:
+        return None
+    
+    full_rebuild = start_date is None and end_date is None
+    if start_date is None or end_date is None:
+        invoices, _ = invoice_tables()
+        first_date, last_date = db.session.query(func.min(invoices.invoice_date), func.max(invoices.invoice_date)).one()
+        if first_date is None:
+            return 0
+        start_date = start_date or first_date
+        end_date = end_date or last_date
+    
+    # Load the archive list before handing work to other threads
+    archive_registry.get()
+    engine = db.engine
+    if full_rebuild:
+        try:
+            db.session.execute(delete(SalesDailyTotal))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    else:
+        db.session.commit()
+    
+    chunks = []
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_date)
+        chunks.append((chunk_start, chunk_end))
+        chunk_start = chunk_end + timedelta(days=1)
+    
+    if engine.dialect.name == 'sqlite' or workers <= 1:
+        for chunk_start, chunk_end in chunks:
+            _rebuild_chunk(engine, chunk_start, chunk_end, not full_rebuild)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_rebuild_chunk, engine, chunk_start, chunk_end, not full_rebuild)
+                for chunk_start, chunk_end in chunks
+            ]
+            for future in futures:
+                future.result()
+    
+    return len(chunks)
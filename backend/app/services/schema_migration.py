@@ -0,0 +1,87 @@
+from sqlalchemy import MetaData, Table, Column, String, DateTime, inspect, select, insert, text
+from datetime import datetime
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import Account, Payment, db
+from app.models.invoice import Invoice
+from app.models.purchase import Purchase
+
+# Columns added to tables that older databases already have; create_all only creates missing tables
+ADDED_COLUMNS = [
+    # Materialized account paths
+    (Account, 'full_code'),
+    (Account, 'full_name'),
+    # Bank reconciliation matches
+    (Payment, 'statement_line_id'),
+    (Payment, 'reconciled_at'),
+    # Journal entries of posted documents
+    (Invoice, 'journal_entry_id'),
+    (Purchase, 'journal_entry_id'),
+    # Status restored by the overdue sweep
+    (Invoice, 'status_before_overdue'),
+    (Purchase, 'status_before_overdue')
+]
+
+# Records which added columns exist so each is added once
+migration_metadata = MetaData()
+schema_column_migrations = Table(
+    'schema_column_migrations', migration_metadata,
+    Column('table_name', String(100), primary_key=True),
+    Column('column_name', String(100), primary_key=True),
+    Column('migrated_at', DateTime, nullable=False)
+)
+
+def _add_column(connection, column):
+    preparer = connection.dialect.identifier_preparer
+    definition = f"{preparer.quote(column.name)} {column.type.compile(dialect=connection.dialect)}"
+    for foreign_key in column.foreign_keys:
+        target = foreign_key.column
+        definition += f" REFERENCES {preparer.quote(target.table.name)} ({preparer.quote(target.name)})"
+        if foreign_key.ondelete:
+            definition += f" ON DELETE {foreign_key.ondelete}"
+    connection.execute(text(f"ALTER TABLE {preparer.quote(column.table.name)} ADD COLUMN {definition}"))
+
+def migrate_added_columns():
+    """Add new nullable columns and indexes to the tables of an existing database
+    
+    Columns created by create_all are only recorded. Returns the list of
+    added (table, column) pairs.
+    """
+    added = []
+    with db.engine.begin() as connection:
+        migration_metadata.create_all(connection)
+        done = {
+            (row.table_name, row.column_name)
+            for row in connection.execute(select(schema_column_migrations))
+        }
+        
+        inspector = inspect(connection)
+        existing_tables = set(inspector.get_table_names())
+        now = datetime.utcnow()
+        
+        tables = {}
+        for model, column_name in ADDED_COLUMNS:
+            table = model.__table__
+            if (table.name, column_name) in done or table.name not in existing_tables:
+                continue
+            
+            if table.name not in tables:
+                tables[table.name] = {column['name'] for column in inspector.get_columns(table.name)}
+            if column_name not in tables[table.name]:
+                _add_column(connection, table.c[column_name])
+                added.append((table.name, column_name))
+            
+            connection.execute(insert(schema_column_migrations).values(
+                table_name=table.name, column_name=column_name, migrated_at=now
+            ))
+        
+        # Indexes declared on tables that existed before them
+        for model, _ in ADDED_COLUMNS:
+            for index in model.__table__.indexes:
+                index.create(connection, checkfirst=True)
+    
+    return added
@@ -0,0 +1,203 @@
+from sqlalchemy import select, func, case, event
+from sqlalchemy.orm import Session
+from collections import OrderedDict
+import threading
+import time
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import db
+from app.models.money import minor_units, from_minor_units
+from app.models.purchase import Purchase, PurchaseItem
+from app.models.supplier import Supplier
+
+# Draft and cancelled orders count as orders but are never delivered or filled
+UNPLACED_STATUSES = ('draft', 'cancelled')
+
+SORT_FIELDS = ('total_amount', 'total_orders', 'on_time_rate', 'fill_rate', 'completion_rate', 'name')
+
+# Changed purchases wait on the session until the transaction commits
+SESSION_KEY = 'supplier_scorecard_stale'
+
+class ScorecardCache:
+    """Scorecards keyed by (start_date, end_date), dropped when purchases change or after max_age seconds"""
+    
+    def __init__(self, max_entries=64, max_age=300):
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.lock = threading.Lock()
+    
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry['loaded_at'] > self.max_age:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry['data']
+    
+    def set(self, key, data):
+        with self.lock:
+            self.entries[key] = {'data': data, 'loaded_at': time.monotonic()}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+    
+    def invalidate(self, purchase_dates):
+        """Drop scorecards whose range covers a changed purchase date (None drops everything)"""
+        with self.lock:
+            if purchase_dates is None:
+                self.entries.clear()
+                return
+            for key in list(self.entries):
+                start_date, end_date = key
+                if any((start_date is None or start_date <= day) and (end_date is None or day <= end_date) for day in purchase_dates):
+                    del self.entries[key]
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+scorecard_cache = ScorecardCache()
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_purchases(session, flush_context):
+    stale = session.info.get(SESSION_KEY, set())
+    if stale is None:
+        return
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(instance, PurchaseItem):
+            # Items do not carry the purchase date, so drop every range
+            stale = None
+            break
+        if isinstance(instance, Purchase) and instance.purchase_date is not None:
+            stale.add(instance.purchase_date)
+    session.info[SESSION_KEY] = stale
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_purchases(session):
+    if SESSION_KEY in session.info:
+        scorecard_cache.invalidate(session.info.pop(SESSION_KEY))
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed_purchases(session):
+    session.info.pop(SESSION_KEY, None)
+
+def _in_range(query, start_date, end_date):
+    if start_date:
+        query = query.where(Purchase.purchase_date >= start_date)
+    if end_date:
+        query = query.where(Purchase.purchase_date <= end_date)
+    return query
+
+def _rate(part, whole):
+    return round(part / whole * 100, 2) if whole else None
+
+def load_scorecards(start_date=None, end_date=None):
+    """Compute every supplier's metrics with two grouped queries (orders, then item quantities)"""
+    placed = Purchase.status.notin_(UNPLACED_STATUSES)
+    delivered = placed & Purchase.delivery_date.isnot(None)
+    amount = func.round(minor_units(Purchase.total_amount) * func.coalesce(Purchase.exchange_rate, 1.0))
+    
+    orders = db.session.execute(_in_range(
+        select(
+            Purchase.supplier_id,
+            func.count(Purchase.id).label('total_orders'),
+            func.sum(amount).label('total_amount'),
+            func.count(Purchase.id).filter(Purchase.status == 'completed').label('completed_orders'),
+            func.count(Purchase.id).filter(Purchase.status == 'cancelled').label('cancelled_orders'),
+            func.count(Purchase.id).filter(delivered).label('delivered_orders'),
+            func.count(Purchase.id).filter(delivered & (Purchase.delivery_date <= Purchase.due_date)).label('on_time_orders')
+        ).group_by(Purchase.supplier_id),
+        start_date, end_date
+    )).all()
+    
+    received_quantity = func.coalesce(PurchaseItem.received_quantity, 0)
+    # Over-deliveries count as filled, not as more than filled
+    received = case(
+        (received_quantity >= PurchaseItem.quantity, PurchaseItem.quantity),
+        (received_quantity > 0, received_quantity),
+        else_=0
+    )
+    quantities = {
+        row.supplier_id: (row.ordered or 0, row.received or 0)
+        for row in db.session.execute(_in_range(
+            select(
+                Purchase.supplier_id,
+                func.sum(PurchaseItem.quantity).label('ordered'),
+                func.sum(received).label('received')
+            ).join(
+                Purchase, Purchase.id == PurchaseItem.purchase_id
+            ).where(placed).group_by(Purchase.supplier_id),
+            start_date, end_date
+        ))
+    }
+    
+    scorecards = {}
+    for row in orders:
+        ordered, filled = quantities.get(row.supplier_id, (0, 0))
+        total_amount = int(row.total_amount or 0)
+        scorecards[row.supplier_id] = {
+            'total_orders': row.total_orders,
+            'total_amount': from_minor_units(total_amount),
+            'average_order': from_minor_units(round(total_amount / row.total_orders)) if row.total_orders else 0,
+            'completed_orders': row.completed_orders,
+            'cancelled_orders': row.cancelled_orders,
+            'completion_rate': _rate(row.completed_orders, row.total_orders) or 0,
+            'delivered_orders': row.delivered_orders,
+            'on_time_rate': _rate(row.on_time_orders, row.delivered_orders),
+            'ordered_quantity': ordered,
+            'received_quantity': filled,
+            'fill_rate': _rate(filled, ordered)
+        }
+    return scorecards
+
+def get_scorecards(start_date=None, end_date=None):
+    """Get every supplier's scorecard for a purchase date range, from the cache when possible"""
+    key = (start_date, end_date)
+    scorecards = scorecard_cache.get(key)
+    if scorecards is None:
+        scorecards = load_scorecards(start_date, end_date)
+        scorecard_cache.set(key, scorecards)
+    return scorecards
+
+def generate_supplier_leaderboard(start_date=None, end_date=None, sort_by='total_amount', descending=True, limit=None):
+    """Rank suppliers with orders in a date range by one scorecard metric"""
+    if sort_by not in SORT_FIELDS:
+        raise ValueError(f"sort_by must be one of {', '.join(SORT_FIELDS)}")
+    
+    scorecards = get_scorecards(start_date, end_date)
+    suppliers = db.session.query(Supplier.id, Supplier.code, Supplier.name, Supplier.rating).filter(
+        Supplier.id.in_(list(scorecards))
+    ).all() if scorecards else []
+    
+    results = [
+        dict(scorecards[supplier.id], supplier_id=supplier.id, code=supplier.code, name=supplier.name, rating=supplier.rating)
+        for supplier in suppliers
+    ]
+    if sort_by == 'name':
+        results.sort(key=lambda result: result['name'] or '', reverse=descending)
+    else:
+        # Suppliers without a rate (nothing delivered yet) always rank last
+        present = [result for result in results if result[sort_by] is not None]
+        missing = [result for result in results if result[sort_by] is None]
+        present.sort(key=lambda result: result[sort_by], reverse=descending)
+        results = present + missing
+    if limit:
+        results = results[:limit]
+    
+    for rank, result in enumerate(results, start=1):
+        result['rank'] = rank
+    
+    return {
+        'start_date': start_date.isoformat() if start_date else None,
+        'end_date': end_date.isoformat() if end_date else None,
+        'sort_by': sort_by,
+        'suppliers': results
+    }
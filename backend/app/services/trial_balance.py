@@ -0,0 +1,180 @@
+from sqlalchemy import func, case
+from datetime import timedelta
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import Account, db
+from app.models.money import to_minor_units
+from app.services.account_balances import POSTED_STATUSES, get_snapshot_period, get_snapshot_totals
+from app.services.archive import journal_tables
+
+def get_range_movements(start_date, end_date):
+    """Get opening and period debit/credit totals per account in one aggregate
+    
+    Opening totals start from the latest closed-period snapshot before
+    start_date, so only journal lines after that period are scanned.
+    """
+    period = get_snapshot_period(start_date - timedelta(days=1))
+    entries, entry_lines = journal_tables(period.end_date + timedelta(days=1) if period else None, end_date)
+    before_start = entries.entry_date < start_date
+    in_range = entries.entry_date >= start_date
+    
+    query = db.session.query(
+        entry_lines.account_id,
+        func.sum(case((before_start, entry_lines.debit_amount), else_=0.0)).label('opening_debit'),
+        func.sum(case((before_start, entry_lines.credit_amount), else_=0.0)).label('opening_credit'),
+        func.sum(case((in_range, entry_lines.debit_amount), else_=0.0)).label('period_debit'),
+        func.sum(case((in_range, entry_lines.credit_amount), else_=0.0)).label('period_credit')
+    ).join(
+        entries, entries.id == entry_lines.journal_entry_id
+    ).filter(
+        entries.status.in_(POSTED_STATUSES),
+        entries.entry_date <= end_date
+    )
+    
+    if period:
+        query = query.filter(entries.entry_date > period.end_date)
+    
+    movements = {
+        account_id: [debit, credit, 0.0, 0.0]
+        for account_id, (debit, credit) in get_snapshot_totals(period).items()
+    }
+    
+    for row in query.group_by(entry_lines.account_id):
+        totals = movements.setdefault(row.account_id, [0.0, 0.0, 0.0, 0.0])
+        totals[0] += row.opening_debit or 0
+        totals[1] += row.opening_credit or 0
+        totals[2] += row.period_debit or 0
+        totals[3] += row.period_credit or 0
+    
+    return movements
+
+def split_net(amount):
+    """Split a net debit-positive amount into debit and credit columns"""
+    if amount >= 0:
+        return round(amount, 2), 0.0
+    return 0.0, round(-amount, 2)
+
+def generate_trial_balance(start_date, end_date, max_level=None, include_zero=False):
+    """Generate a hierarchical trial balance for a date range"""
+    accounts = db.session.query(
+        Account.id,
+        Account.code,
+        Account.name,
+        Account.name_en,
+        Account.account_type,
+        Account.parent_id,
+        Account.normal_balance,
+        Account.opening_balance
+    ).all()
+    
+    movements = get_range_movements(start_date, end_date)
+    
+    nodes = {}
+    for account in accounts:
+        opening_debit, opening_credit, period_debit, period_credit = movements.get(account.id, [0.0, 0.0, 0.0, 0.0])
+        
+        # Account.opening_balance is stored in the account's normal direction
+        opening_balance = account.opening_balance or 0.0
+        if account.normal_balance == 'debit':
+            opening_debit += opening_balance
+        else:
+            opening_credit += opening_balance
+        
+        nodes[account.id] = {
+            'account': account,
+            'totals': [opening_debit, opening_credit, period_debit, period_credit],
+            'is_leaf': True
+        }
+    
+    # Resolve depth and full code/name from the in-memory parent map
+    depths = {}
+    for account_id in nodes:
+        chain = []
+        current = account_id
+        while current is not None and current not in depths and current in nodes:
+            chain.append(current)
+            current = nodes[current]['account'].parent_id
+        base = depths[current] if current in depths else 0
+        for node_id in reversed(chain):
+            base += 1
+            depths[node_id] = base
+    
+    for account_id in sorted(nodes, key=lambda node_id: depths[node_id]):
+        node = nodes[account_id]
+        account = node['account']
+        parent = nodes.get(account.parent_id)
+        if parent:
+            parent['is_leaf'] = False
+            node['full_code'] = f"{parent['full_code']}.{account.code}"
+            node['full_name'] = f"{parent['full_name']} > {account.name}"
+        else:
+            node['full_code'] = account.code
+            node['full_name'] = account.name
+    
+    # Single bottom-up pass: deepest accounts first, each adds into its parent
+    for account_id in sorted(nodes, key=lambda node_id: depths[node_id], reverse=True):
+        node = nodes[account_id]
+        parent = nodes.get(node['account'].parent_id)
+        if parent:
+            parent['totals'] = [total + amount for total, amount in zip(parent['totals'], node['totals'])]
+    
+    rows = []
+    grand_totals = [0.0] * 6
+    for account_id, node in nodes.items():
+        account = node['account']
+        opening_debit, opening_credit, period_debit, period_credit = node['totals']
+        opening_net = opening_debit - opening_credit
+        closing_net = opening_net + period_debit - period_credit
+        
+        row_debit_opening, row_credit_opening = split_net(opening_net)
+        row_debit_closing, row_credit_closing = split_net(closing_net)
+        columns = [
+            row_debit_opening, row_credit_opening,
+            round(period_debit, 2), round(period_credit, 2),
+            row_debit_closing, row_credit_closing
+        ]
+        
+        if depths[account_id] == 1:
+            grand_totals = [total + amount for total, amount in zip(grand_totals, columns)]
+        
+        if max_level and depths[account_id] > max_level:
+            continue
+        if not include_zero and not any(columns):
+            continue
+        
+        rows.append({
+            'account_id': account.id,
+            'code': account.code,
+            'name': account.name,
+            'name_en': account.name_en,
+            'account_type': account.account_type,
+            'parent_id': account.parent_id,
+            'level': depths[account_id],
+            'is_leaf': node['is_leaf'],
+            'full_code': node['full_code'],
+            'full_name': node['full_name'],
+            'opening_debit': columns[0],
+            'opening_credit': columns[1],
+            'period_debit': columns[2],
+            'period_credit': columns[3],
+            'closing_debit': columns[4],
+            'closing_credit': columns[5]
+        })
+    
+    rows.sort(key=lambda row: row['full_code'])
+    
+    keys = ['opening_debit', 'opening_credit', 'period_debit', 'period_credit', 'closing_debit', 'closing_credit']
+    totals = {key: round(value, 2) for key, value in zip(keys, grand_totals)}
+    totals['is_balanced'] = to_minor_units(totals['closing_debit']) == to_minor_units(totals['closing_credit'])
+    
+    return {
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'opening_date': (start_date - timedelta(days=1)).isoformat(),
+        'accounts': rows,
+        'totals': totals
+    }
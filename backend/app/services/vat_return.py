@@ -0,0 +1,188 @@
+from sqlalchemy import select, func, type_coerce
+from datetime import date, timedelta
+import sys
+import os
+
+# Add the parent directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.accounting import db
+from app.models.money import Money
+from app.models.purchase import Purchase, PurchaseItem
+from app.models.customer import Customer
+from app.models.supplier import Supplier
+from app.services.posting_rules import POSTABLE_STATUSES
+from app.services.archive import invoice_tables
+
+# VAT return sides: (document type, item foreign key, number column, date column, party model, party foreign key);
+# columns are named so they resolve against archive-unioned aliases too
+VAT_SIDES = {
+    'sales': ('invoice', 'invoice_id', 'invoice_number', 'invoice_date', Customer, 'customer_id'),
+    'purchases': ('purchase', 'purchase_id', 'purchase_number', 'purchase_date', Supplier, 'supplier_id')
+}
+
+VAT_CATEGORIES = ('standard', 'zero_rated', 'exempt')
+
+VAT_AUDIT_COLUMNS = [
+    'side', 'document_id', 'document_number', 'document_date', 'party_name', 'party_tax_number',
+    'item_id', 'item_name', 'category', 'tax_rate', 'currency', 'exchange_rate', 'taxable_amount', 'tax_amount'
+]
+
+def get_quarter_dates(year, quarter):
+    """Get the first and last day of a calendar quarter"""
+    if quarter not in (1, 2, 3, 4):
+        raise ValueError('quarter must be between 1 and 4')
+    start_date = date(year, 3 * quarter - 2, 1)
+    end_date = date(year + 1, 1, 1) if quarter == 4 else date(year, 3 * quarter + 1, 1)
+    return start_date, end_date - timedelta(days=1)
+
+def get_vat_category(is_taxable, tax_rate):
+    """Classify an item as standard rated, zero rated or exempt"""
+    if is_taxable is False:
+        return 'exempt'
+    if not tax_rate:
+        return 'zero_rated'
+    return 'standard'
+
+def get_side_tables(side, start_date, end_date):
+    """Get the (document, item) models for a side; sales reach into archived years when needed"""
+    if side == 'sales':
+        return invoice_tables(start_date, end_date)
+    return Purchase, PurchaseItem
+
+def in_base_currency(amount, rate):
+    """Convert a Money column at a document rate, rounded per line to whole minor units"""
+    return type_coerce(func.round(amount * rate), Money())
+
+def get_vat_totals(side, start_date, end_date):
+    """Aggregate taxable base and VAT per rate for one side with a single grouped query
+    
+    Amounts are converted to base currency at each document's exchange rate
+    and rounded per line, so the totals match the audit export.
+    """
+    document_type, item_fk, _, date_column, _, _ = VAT_SIDES[side]
+    document, item = get_side_tables(side, start_date, end_date)
+    item_fk, date_column = getattr(item, item_fk), getattr(document, date_column)
+    rate = func.coalesce(document.exchange_rate, 1.0)
+    
+    rows = db.session.execute(
+        select(
+            item.is_taxable,
+            item.tax_rate,
+            func.count(func.distinct(document.id)).label('documents'),
+            func.count(item.id).label('lines'),
+            func.sum(in_base_currency(item.subtotal - item.discount_amount, rate)).label('taxable_amount'),
+            func.sum(in_base_currency(item.tax_amount, rate)).label('tax_amount')
+        ).join(
+            document, document.id == item_fk
+        ).where(
+            document.status.in_(POSTABLE_STATUSES[document_type]),
+            date_column >= start_date,
+            date_column <= end_date
+        ).group_by(item.is_taxable, item.tax_rate)
+    ).all()
+    
+    return [
+        {
+            'category': get_vat_category(row.is_taxable, row.tax_rate),
+            'tax_rate': row.tax_rate or 0.0,
+            'documents': row.documents,
+            'lines': row.lines,
+            'taxable_amount': round(row.taxable_amount or 0, 2),
+            'tax_amount': round(row.tax_amount or 0, 2)
+        }
+        for row in rows
+    ]
+
+def summarize_categories(rates):
+    """Sum per-rate totals into the return categories"""
+    categories = {category: {'taxable_amount': 0.0, 'tax_amount': 0.0} for category in VAT_CATEGORIES}
+    for rate in rates:
+        totals = categories[rate['category']]
+        totals['taxable_amount'] = round(totals['taxable_amount'] + rate['taxable_amount'], 2)
+        totals['tax_amount'] = round(totals['tax_amount'] + rate['tax_amount'], 2)
+    return categories
+
+def generate_vat_return(start_date, end_date):
+    """Generate a VAT return for a period from two grouped queries"""
+    sales = get_vat_totals('sales', start_date, end_date)
+    purchases = get_vat_totals('purchases', start_date, end_date)
+    
+    sales_categories = summarize_categories(sales)
+    purchase_categories = summarize_categories(purchases)
+    output_vat = round(sum(totals['tax_amount'] for totals in sales_categories.values()), 2)
+    input_vat = round(sum(totals['tax_amount'] for totals in purchase_categories.values()), 2)
+    
+    return {
+        'period': {
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat()
+        },
+        'sales': {
+            'rates': sales,
+            'categories': sales_categories,
+            'total_taxable_amount': round(sum(totals['taxable_amount'] for totals in sales_categories.values()), 2),
+            'total_tax_amount': output_vat
+        },
+        'purchases': {
+            'rates': purchases,
+            'categories': purchase_categories,
+            'total_taxable_amount': round(sum(totals['taxable_amount'] for totals in purchase_categories.values()), 2),
+            'total_tax_amount': input_vat
+        },
+        'output_vat': output_vat,
+        'input_vat': input_vat,
+        'net_vat_due': round(output_vat - input_vat, 2)
+    }
+
+def iter_vat_audit_rows(start_date, end_date, batch_size=1000):
+    """Stream every item behind a VAT return through a server-side cursor"""
+    for side, (document_type, item_fk, number_column, date_column, party, party_fk) in VAT_SIDES.items():
+        document, item = get_side_tables(side, start_date, end_date)
+        item_fk, number_column, date_column = getattr(item, item_fk), getattr(document, number_column), getattr(document, date_column)
+        party_fk = getattr(document, party_fk)
+        rate = func.coalesce(document.exchange_rate, 1.0)
+        
+        result = db.session.execute(
+            select(
+                document.id.label('document_id'),
+                number_column.label('document_number'),
+                date_column.label('document_date'),
+                party.name.label('party_name'),
+                party.tax_number.label('party_tax_number'),
+                item.id.label('item_id'),
+                item.item_name,
+                item.is_taxable,
+                item.tax_rate,
+                document.currency,
+                rate.label('exchange_rate'),
+                in_base_currency(item.subtotal - item.discount_amount, rate).label('taxable_amount'),
+                in_base_currency(item.tax_amount, rate).label('tax_amount')
+            ).join(
+                document, document.id == item_fk
+            ).outerjoin(
+                party, party.id == party_fk
+            ).where(
+                document.status.in_(POSTABLE_STATUSES[document_type]),
+                date_column >= start_date,
+                date_column <= end_date
+            ).order_by(date_column, document.id, item.id).execution_options(stream_results=True, yield_per=batch_size)
+        )
+        
+        for row in result:
+            yield {
+                'side': side,
+                'document_id': row.document_id,
+                'document_number': row.document_number,
+                'document_date': row.document_date.isoformat(),
+                'party_name': row.party_name,
+                'party_tax_number': row.party_tax_number,
+                'item_id': row.item_id,
+                'item_name': row.item_name,
+                'category': get_vat_category(row.is_taxable, row.tax_rate),
+                'tax_rate': row.tax_rate or 0.0,
+                'currency': row.currency,
+                'exchange_rate': row.exchange_rate,
+                'taxable_amount': round(row.taxable_amount or 0, 2),
+                'tax_amount': round(row.tax_amount or 0, 2)
+            }
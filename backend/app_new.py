@@ -27,6 +27,33 @@ database_url = os.environ.get('DATABASE_URL', 'sqlite:///erp_system.db')
 app.config['SQLALCHEMY_DATABASE_URI'] = database_url
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# In-process ledger index for range balance queries (falls back to SQL when disabled, cold or stale).
+# Each worker keeps its own copy, which goes stale once another worker posts: enable with one worker.
+app.config['LEDGER_INDEX_ENABLED'] = os.environ.get('LEDGER_INDEX_ENABLED', 'False').lower() == 'true'
+app.config['LEDGER_INDEX_MEMORY_MB'] = int(os.environ.get('LEDGER_INDEX_MEMORY_MB', '256'))
+
+# Closed fiscal years are moved to per-year archive databases in this directory (SQLite)
+app.config['ARCHIVE_DIRECTORY'] = os.environ.get('ARCHIVE_DIRECTORY', 'archive')
+
+# Customer used by POS sales that do not name one (walk-in customer)
+app.config['POS_DEFAULT_CUSTOMER_ID'] = os.environ.get('POS_DEFAULT_CUSTOMER_ID')
+
+# Seconds before other workers' product price changes reach this worker's POS catalog
+app.config['POS_CATALOG_TTL_SECONDS'] = int(os.environ.get('POS_CATALOG_TTL_SECONDS', '60'))
+
+# Minutes between overdue status sweeps of invoices and purchases (0 disables the background sweep)
+app.config['OVERDUE_SWEEP_INTERVAL_MINUTES'] = int(os.environ.get('OVERDUE_SWEEP_INTERVAL_MINUTES', '60'))
+
+# Minutes between recurring invoice generator runs (0 disables the background generator)
+app.config['RECURRING_INVOICE_INTERVAL_MINUTES'] = int(os.environ.get('RECURRING_INVOICE_INTERVAL_MINUTES', '60'))
+
+# Invoice and receipt PDFs: cache directory, worker processes for bulk jobs, and an Arabic-capable TrueType font
+app.config['PDF_CACHE_DIRECTORY'] = os.environ.get('PDF_CACHE_DIRECTORY', 'pdf_cache')
+app.config['PDF_RENDER_WORKERS'] = int(os.environ.get('PDF_RENDER_WORKERS', str(os.cpu_count() or 2)))
+app.config['PDF_FONT_PATH'] = os.environ.get('PDF_FONT_PATH', 'fonts/Amiri-Regular.ttf')
+app.config['PDF_BOLD_FONT_PATH'] = os.environ.get('PDF_BOLD_FONT_PATH', 'fonts/Amiri-Bold.ttf')
+app.config['PDF_LOGO_PATH'] = os.environ.get('PDF_LOGO_PATH')
+
 # Initialize extensions
 db = SQLAlchemy(app)
 jwt = JWTManager(app)
@@ -47,10 +74,28 @@ from app.models.accounting import Account, JournalEntry, JournalEntryLine, Payme
 # Import routes
 from app.routes.auth import auth_bp
 from app.routes.products import products_bp
+from app.routes.accounting import accounting_bp
+from app.routes.pos import pos_bp
+from app.routes.recurring_invoices import recurring_invoices_bp
+from app.routes.documents import documents_bp
+
+# Import services
+from app.services.ledger_index import init_ledger_index
+from app.services.account_paths import rebuild_account_paths
+from app.services.money_migration import migrate_money_columns
+from app.services.schema_migration import migrate_added_columns
+from app.services.monthly_totals import rebuild_monthly_totals
+from app.services.sales_cube import rebuild_sales_cube
+from app.services.recurring_invoices import generate_recurring_invoices, start_recurring_invoice_generator
+from app.services.overdue_sweep import sweep_overdue, start_overdue_sweeper
 
 # Register blueprints
 app.register_blueprint(auth_bp)
 app.register_blueprint(products_bp)
+app.register_blueprint(accounting_bp)
+app.register_blueprint(pos_bp)
+app.register_blueprint(recurring_invoices_bp)
+app.register_blueprint(documents_bp)
 
 # JWT error handlers
 @jwt.expired_token_loader
@@ -149,7 +194,7 @@ def system_info():
                 ]
             }
         }), 200
-        
+    
     except Exception as e:
         return jsonify({
             'success': False,
@@ -196,14 +241,19 @@ def create_default_data():
             {'code': '1000', 'name': 'الأصول', 'name_en': 'Assets', 'account_type': 'asset', 'normal_balance': 'debit'},
             {'code': '1100', 'name': 'النقدية', 'name_en': 'Cash', 'account_type': 'asset', 'normal_balance': 'debit', 'parent_code': '1000'},
             {'code': '1200', 'name': 'العملاء', 'name_en': 'Accounts Receivable', 'account_type': 'asset', 'normal_balance': 'debit', 'parent_code': '1000'},
+            {'code': '1250', 'name': 'ذمم مدينة أخرى', 'name_en': 'Other Receivables', 'account_type': 'asset', 'normal_balance': 'debit', 'parent_code': '1000'},
             {'code': '1300', 'name': 'المخزون', 'name_en': 'Inventory', 'account_type': 'asset', 'normal_balance': 'debit', 'parent_code': '1000'},
+            {'code': '1400', 'name': 'ضريبة القيمة المضافة - المدخلات', 'name_en': 'VAT Input', 'account_type': 'asset', 'normal_balance': 'debit', 'parent_code': '1000'},
             {'code': '2000', 'name': 'الخصوم', 'name_en': 'Liabilities', 'account_type': 'liability', 'normal_balance': 'credit'},
             {'code': '2100', 'name': 'الموردين', 'name_en': 'Accounts Payable', 'account_type': 'liability', 'normal_balance': 'credit', 'parent_code': '2000'},
+            {'code': '2200', 'name': 'ضريبة القيمة المضافة - المخرجات', 'name_en': 'VAT Output', 'account_type': 'liability', 'normal_balance': 'credit', 'parent_code': '2000'},
             {'code': '3000', 'name': 'حقوق الملكية', 'name_en': 'Equity', 'account_type': 'equity', 'normal_balance': 'credit'},
             {'code': '4000', 'name': 'الإيرادات', 'name_en': 'Revenue', 'account_type': 'revenue', 'normal_balance': 'credit'},
             {'code': '4100', 'name': 'مبيعات', 'name_en': 'Sales', 'account_type': 'revenue', 'normal_balance': 'credit', 'parent_code': '4000'},
+            {'code': '4900', 'name': 'أرباح فروق العملة', 'name_en': 'Foreign Exchange Gains', 'account_type': 'revenue', 'normal_balance': 'credit', 'parent_code': '4000'},
             {'code': '5000', 'name': 'المصروفات', 'name_en': 'Expenses', 'account_type': 'expense', 'normal_balance': 'debit'},
-            {'code': '5100', 'name': 'تكلفة البضاعة المباعة', 'name_en': 'Cost of Goods Sold', 'account_type': 'expense', 'normal_balance': 'debit', 'parent_code': '5000'}
+            {'code': '5100', 'name': 'تكلفة البضاعة المباعة', 'name_en': 'Cost of Goods Sold', 'account_type': 'expense', 'normal_balance': 'debit', 'parent_code': '5000'},
+            {'code': '5900', 'name': 'خسائر فروق العملة', 'name_en': 'Foreign Exchange Losses', 'account_type': 'expense', 'normal_balance': 'debit', 'parent_code': '5000'}
         ]
         
         for account_data in accounts_data:
@@ -267,7 +317,7 @@ def create_default_data():
         
         db.session.commit()
         print("✅ تم إنشاء جميع البيانات الافتراضية بنجاح")
-        
+    
     except Exception as e:
         db.session.rollback()
         print(f"❌ خطأ في إنشاء البيانات الافتراضية: {str(e)}")
@@ -280,9 +330,42 @@ def init_database():
             db.create_all()
             print("✅ تم إنشاء جداول قاعدة البيانات")
             
+            # Add columns introduced since an existing database was created
+            if migrate_added_columns():
+                print("✅ تم إضافة الأعمدة الجديدة إلى الجداول")
+            
+            # Convert amount columns of older databases to integer minor units
+            if migrate_money_columns():
+                print("✅ تم تحويل أعمدة المبالغ إلى وحدات صحيحة")
+            
             # Create default data
             create_default_data()
             
+            # Fill materialized account paths for charts created before they existed
+            rebuild_account_paths(only_missing=True)
+            
+            # Backfill monthly account totals for journals posted before they were maintained
+            if rebuild_monthly_totals(only_if_empty=True):
+                print("✅ تم احتساب المجاميع الشهرية للحسابات")
+            
+            # Backfill the sales cube for invoices issued before it was maintained
+            if rebuild_sales_cube(only_if_empty=True):
+                print("✅ تم احتساب ملخصات المبيعات اليومية")
+            
+            # Warm the ledger index
+            if init_ledger_index(app):
+                print("✅ تم بناء فهرس دفتر الأستاذ")
+            
+            # Mark past-due invoices and purchases, then keep doing so on a schedule
+            sweep_overdue()
+            start_overdue_sweeper(app)
+            print("✅ تم تحديث حالات الفواتير المتأخرة")
+            
+            # Bill recurring invoices due since the last run, then keep doing so on a schedule
+            generate_recurring_invoices()
+            start_recurring_invoice_generator(app)
+            print("✅ تم إنشاء الفواتير الدورية المستحقة")
+    
     except Exception as e:
         print(f"❌ خطأ في تهيئة قاعدة البيانات: {str(e)}")
 
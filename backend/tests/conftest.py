@@ -0,0 +1,106 @@
+"""Fixtures: the application models on a temporary SQLite database
+
+Each model module creates its own SQLAlchemy() instance; the tests bind
+them all to one instance, so every model shares one session and metadata.
+"""
+from flask import Flask
+import flask_sqlalchemy
+import pytest
+import sys
+import os
+
+# Add the backend directory to the path to import app
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+shared_db = flask_sqlalchemy.SQLAlchemy()
+flask_sqlalchemy.SQLAlchemy = lambda *args, **kwargs: shared_db
+
+# Every model module is imported so create_all makes all the tables
+from app.models.user import User
+from app.models.company import Company
+from app.models.customer import Customer
+from app.models.supplier import Supplier
+from app.models.product import Product
+from app.models.invoice import Invoice
+from app.models.purchase import Purchase
+from app.models.inventory import InventoryMovement
+from app.models.accounting import Account, db
+from app.services.financial_statements import statement_cache
+from app.services.ledger_index import ledger_index
+from app.services.archive import archive_registry
+from app.services.posting_rules import posting_accounts
+from app.services.pos_checkout import product_catalog
+from app.services import pdf_rendering
+
+# (code, name, account type, normal balance): the roles used by the posting templates plus equity
+CHART_OF_ACCOUNTS = [
+    ('1100', 'Cash', 'asset', 'debit'),
+    ('1200', 'Accounts Receivable', 'asset', 'debit'),
+    ('1250', 'Other Receivables', 'asset', 'debit'),
+    ('1300', 'Inventory', 'asset', 'debit'),
+    ('1400', 'VAT Input', 'asset', 'debit'),
+    ('2100', 'Accounts Payable', 'liability', 'credit'),
+    ('2200', 'VAT Output', 'liability', 'credit'),
+    ('3000', 'Equity', 'equity', 'credit'),
+    ('4100', 'Sales', 'revenue', 'credit'),
+    ('4900', 'FX Gain', 'revenue', 'credit'),
+    ('5100', 'Cost of Goods Sold', 'expense', 'debit'),
+    ('5900', 'FX Loss', 'expense', 'debit')
+]
+
+def _clear_caches():
+    """Process-wide caches outlive the per-test database"""
+    statement_cache.clear()
+    ledger_index.clear()
+    archive_registry.clear()
+    posting_accounts.clear()
+    product_catalog.clear()
+    pdf_rendering._resources.clear()
+
+@pytest.fixture
+def app(tmp_path):
+    flask_app = Flask(__name__)
+    flask_app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'erp.db'}"
+    flask_app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    flask_app.config['ARCHIVE_DIRECTORY'] = str(tmp_path / 'archive')
+    flask_app.config['PDF_CACHE_DIRECTORY'] = str(tmp_path / 'pdf_cache')
+    db.init_app(flask_app)
+    
+    with flask_app.app_context():
+        db.create_all()
+        _clear_caches()
+        yield flask_app
+        db.session.remove()
+        db.engine.dispose()
+    _clear_caches()
+
+@pytest.fixture
+def user(app):
+    user = User(username='accountant', email='accountant@example.com', password_hash='x', name='Accountant', role='admin')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+@pytest.fixture
+def accounts(app):
+    """Chart of accounts by code"""
+    accounts = {}
+    for code, name, account_type, normal_balance in CHART_OF_ACCOUNTS:
+        accounts[code] = Account(code=code, name=name, account_type=account_type, normal_balance=normal_balance)
+        db.session.add(accounts[code])
+    db.session.commit()
+    return accounts
+
+@pytest.fixture
+def customer(app):
+    customer = Customer(code='C001', name='عميل تجريبي', name_en='Test Customer')
+    db.session.add(customer)
+    db.session.commit()
+    return customer
+
+@pytest.fixture
+def product(app):
+    product = Product(code='P001', name='منتج', name_en='Product', cost_price=10, selling_price=20, current_stock=5)
+    db.session.add(product)
+    db.session.commit()
+    return product
@@ -0,0 +1,53 @@
+from datetime import date
+from sqlalchemy import func
+import pytest
+
+from app.models.accounting import JournalEntry, db
+from app.services.journal_posting import post_journal_batch
+from app.services.period_close import generate_fiscal_periods, close_periods_through
+from app.services.archive import archive_fiscal_year, journal_tables
+from app.services.ledger_index import get_range_balances
+
+def _entry(accounts, entry_date, amount):
+    return {
+        'entry_date': entry_date,
+        'description': 'Cash sale',
+        'lines': [
+            {'account_id': accounts['1100'].id, 'debit_amount': amount, 'credit_amount': 0},
+            {'account_id': accounts['4100'].id, 'debit_amount': 0, 'credit_amount': amount}
+        ]
+    }
+
+@pytest.fixture
+def archived_2024(user, accounts):
+    generate_fiscal_periods(None, 2024)
+    generate_fiscal_periods(None, 2025)
+    post_journal_batch([_entry(accounts, date(2024, 3, 1), 100), _entry(accounts, date(2024, 11, 5), 40)], user.id)
+    post_journal_batch([_entry(accounts, date(2025, 2, 1), 7)], user.id)
+    close_periods_through(date(2024, 12, 31), user.id)
+    return archive_fiscal_year(2024, user.id)
+
+def test_archive_moves_the_year_out_of_the_hot_tables(archived_2024):
+    assert archived_2024['journal_entries'] == 2
+    assert [entry.entry_date for entry in JournalEntry.query.all()] == [date(2025, 2, 1)]
+
+def test_reads_union_archived_years(archived_2024):
+    entries, _ = journal_tables(date(2024, 1, 1), date(2025, 12, 31))
+    assert db.session.query(func.count(entries.id)).scalar() == 3
+    
+    entries, _ = journal_tables(date(2025, 1, 1), date(2025, 12, 31))
+    assert entries is JournalEntry
+
+def test_range_balances_include_archived_years(archived_2024, accounts):
+    result = get_range_balances([accounts['1100'].id], date(2024, 6, 1), date(2025, 12, 31))
+    balances = result['accounts'][0]
+    
+    assert balances['opening_balance'] == 100
+    assert balances['debit_amount'] == 47
+    assert balances['closing_balance'] == 147
+
+def test_open_years_cannot_be_archived(user, accounts):
+    generate_fiscal_periods(None, 2024)
+    
+    with pytest.raises(ValueError, match='open periods'):
+        archive_fiscal_year(2024, user.id)
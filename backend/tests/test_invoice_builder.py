@@ -0,0 +1,51 @@
+import pytest
+
+from app.models.product import Product
+from app.models.invoice import Invoice
+from app.models.inventory import InventoryMovement
+from app.models.accounting import db
+from app.services.invoice_builder import create_invoice, create_invoices, calculate_item_totals, calculate_items_totals
+
+def test_invoice_takes_stock_and_records_the_movement(user, customer, product):
+    invoice = create_invoice({'customer_id': customer.id, 'items': [{'product_id': product.id, 'quantity': 3}]}, user.id)
+    
+    assert invoice['total_amount'] == 69
+    assert db.session.get(Product, product.id).current_stock == 2
+    movement = InventoryMovement.query.one()
+    assert (movement.old_stock, movement.new_stock) == (5, 2)
+
+def test_overselling_is_rejected_without_a_partial_batch(user, customer, product):
+    invoices = [
+        {'customer_id': customer.id, 'items': [{'product_id': product.id, 'quantity': 4}]},
+        {'customer_id': customer.id, 'items': [{'product_id': product.id, 'quantity': 2}]}
+    ]
+    
+    with pytest.raises(ValueError, match='Insufficient stock'):
+        create_invoices(invoices, user.id)
+    assert Invoice.query.count() == 0
+    assert db.session.get(Product, product.id).current_stock == 5
+
+def test_negative_stock_when_the_product_allows_it(user, customer, product):
+    product.allow_negative_stock = True
+    db.session.commit()
+    
+    create_invoice({'customer_id': customer.id, 'items': [{'product_id': product.id, 'quantity': 7}]}, user.id)
+    assert db.session.get(Product, product.id).current_stock == -2
+
+def test_draft_invoices_leave_stock_alone(user, customer, product):
+    create_invoice({
+        'customer_id': customer.id, 'status': 'draft', 'items': [{'product_id': product.id, 'quantity': 50}]
+    }, user.id)
+    assert db.session.get(Product, product.id).current_stock == 5
+
+def test_single_and_batch_totals_agree(product):
+    items = [
+        {'product_id': product.id, 'quantity': 3, 'discount_percentage': 10},
+        {'item_name': 'Service', 'quantity': 1.5, 'unit_price': 33.33, 'tax_rate': None},
+        {'item_name': 'Exempt', 'quantity': 2, 'unit_price': 9.99, 'is_taxable': False}
+    ]
+    products = {product.id: product}
+    
+    assert calculate_items_totals(items, products) == [
+        calculate_item_totals(item, products.get(item.get('product_id'))) for item in items
+    ]
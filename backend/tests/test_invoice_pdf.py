@@ -0,0 +1,45 @@
+from reportlab.pdfbase import pdfmetrics
+import reportlab
+import pytest
+import os
+
+from app.models.accounting import db
+from app.services import invoice_pdf
+from app.services.invoice_builder import create_invoice
+
+# Bundled with reportlab; enough to exercise the full render path, though it has no Arabic glyphs
+TEST_FONT_PATH = os.path.join(os.path.dirname(reportlab.__file__), 'fonts', 'Vera.ttf')
+
+@pytest.fixture
+def invoice(user, customer, product):
+    return create_invoice({
+        'customer_id': customer.id,
+        'items': [{'product_id': product.id, 'quantity': 2}],
+        'notes': 'شكرا لتعاملكم معنا'
+    }, user.id)
+
+def test_invoice_renders_to_pdf(app, invoice):
+    app.config['PDF_FONT_PATH'] = TEST_FONT_PATH
+    
+    filename, data = invoice_pdf.get_document_pdf('invoice', invoice['id'])
+    
+    assert filename == f"invoice-{invoice['invoice_number']}.pdf"
+    assert data.startswith(b'%PDF-')
+    assert 'DocumentFont' in pdfmetrics.getRegisteredFontNames()
+
+def test_rendering_without_a_font_is_refused(app, invoice):
+    app.config['PDF_FONT_PATH'] = os.path.join(app.config['PDF_CACHE_DIRECTORY'], 'missing.ttf')
+    
+    with pytest.raises(RuntimeError, match='PDF_FONT_PATH'):
+        invoice_pdf.get_document_pdf('invoice', invoice['id'])
+
+def test_customer_changes_render_again(app, invoice, customer):
+    app.config['PDF_FONT_PATH'] = TEST_FONT_PATH
+    invoice_pdf.get_document_pdf('invoice', invoice['id'])
+    
+    customer.address = 'الرياض'
+    db.session.commit()
+    invoice_pdf.get_document_pdf('invoice', invoice['id'])
+    
+    cached = [name for _, _, names in os.walk(app.config['PDF_CACHE_DIRECTORY']) for name in names]
+    assert len(cached) == 2
@@ -0,0 +1,54 @@
+from datetime import date
+import pytest
+
+from app.models.accounting import Account, JournalEntry, db
+from app.services.journal_posting import post_journal_batch
+
+def _entry(debit_account, credit_account, amount, entry_date=date(2025, 3, 1)):
+    return {
+        'entry_date': entry_date,
+        'description': 'Test entry',
+        'lines': [
+            {'account_id': debit_account.id, 'debit_amount': amount, 'credit_amount': 0},
+            {'account_id': credit_account.id, 'debit_amount': 0, 'credit_amount': amount}
+        ]
+    }
+
+def test_batch_posts_balanced_entries(user, accounts):
+    entry_ids = post_journal_batch([_entry(accounts['1100'], accounts['4100'], 115)], user.id)
+    
+    entry = db.session.get(JournalEntry, entry_ids[0])
+    assert entry.status == 'posted'
+    assert entry.total_debit == entry.total_credit == 115
+    assert db.session.get(Account, accounts['1100'].id).current_balance == 115
+    assert db.session.get(Account, accounts['4100'].id).current_balance == 115
+
+def test_unbalanced_entry_is_rejected(user, accounts):
+    entry = _entry(accounts['1100'], accounts['4100'], 100)
+    entry['lines'][1]['credit_amount'] = 99.99
+    
+    with pytest.raises(ValueError):
+        post_journal_batch([entry], user.id)
+    assert JournalEntry.query.count() == 0
+    assert db.session.get(Account, accounts['1100'].id).current_balance == 0
+
+def test_amounts_are_summed_in_minor_units(user, accounts):
+    # Thirty postings of 0.10 drift away from 3.00 when summed as floats
+    post_journal_batch([_entry(accounts['1100'], accounts['4100'], 0.1) for _ in range(30)], user.id)
+    
+    assert db.session.get(Account, accounts['1100'].id).current_balance == 3.0
+    assert db.session.get(Account, accounts['4100'].id).current_balance == 3.0
+
+def test_lines_that_round_to_balance_are_accepted(user, accounts):
+    entry = _entry(accounts['1100'], accounts['4100'], 0.3)
+    entry['lines'][0]['debit_amount'] = 0.1
+    entry['lines'].append({'account_id': accounts['1100'].id, 'debit_amount': 0.2, 'credit_amount': 0})
+    
+    entry_ids = post_journal_batch([entry], user.id)
+    assert db.session.get(JournalEntry, entry_ids[0]).total_debit == 0.3
+
+def test_only_drafts_are_posted(user, accounts):
+    entry = dict(_entry(accounts['1100'], accounts['4100'], 10), status='posted')
+    
+    with pytest.raises(ValueError):
+        post_journal_batch([entry], user.id)
@@ -0,0 +1,51 @@
+from datetime import date
+
+from app.models.accounting import Account, Payment, db
+from app.services.payment_import import parse_csv, parse_mt940, import_payments
+
+MT940_STATEMENT = """:20:STMT1
+:25:SA0380000000608010167519
+:61:2503010301C150,00NTRFNONREF
+:86:Transfer from customer
+:61:2503010301C150,00NTRFNONREF
+:86:Transfer from customer
+:61:2503020302D40,50NCHK123456//BANK1
+:86:Supplier cheque
+"""
+
+CSV_STATEMENT = """date,amount,reference,description
+2025-03-03,200.00,INV-7,Invoice 7
+2025-03-04,-25.00,,Bank fee
+"""
+
+def test_reimporting_a_statement_skips_every_line(user, accounts):
+    records = parse_mt940(MT940_STATEMENT)
+    first = import_payments(records, accounts['1100'].id, user.id)
+    second = import_payments(parse_mt940(MT940_STATEMENT), accounts['1100'].id, user.id)
+    
+    assert first['imported'] == 3
+    assert second == {'imported': 0, 'skipped': 3, 'payment_ids': []}
+    assert Payment.query.count() == 3
+
+def test_identical_unreferenced_lines_in_one_statement_are_kept(user, accounts):
+    result = import_payments(parse_mt940(MT940_STATEMENT), accounts['1100'].id, user.id, post=False)
+    
+    unreferenced = Payment.query.filter(Payment.reference_number.is_(None)).all()
+    assert result['imported'] == 3
+    assert len(unreferenced) == 2
+    assert all(payment.status == 'draft' for payment in unreferenced)
+
+def test_referenced_lines_are_deduplicated_on_reference_date_and_amount(user, accounts):
+    import_payments(parse_csv(CSV_STATEMENT), accounts['1100'].id, user.id)
+    result = import_payments(parse_csv(CSV_STATEMENT), accounts['1100'].id, user.id)
+    
+    assert result['skipped'] == 2
+    payment = Payment.query.filter_by(reference_number='INV-7').one()
+    assert payment.payment_date == date(2025, 3, 3)
+    assert payment.payment_type == 'receipt'
+
+def test_imported_payments_post_to_the_bank_account(user, accounts):
+    import_payments(parse_csv(CSV_STATEMENT), accounts['1100'].id, user.id)
+    
+    # 200.00 received less the 25.00 fee
+    assert db.session.get(Account, accounts['1100'].id).current_balance == 175
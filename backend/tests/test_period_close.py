@@ -0,0 +1,46 @@
+from datetime import date
+import pytest
+
+from app.models.accounting import AccountBalanceSnapshot
+from app.services.journal_posting import post_journal_batch
+from app.services.period_close import generate_fiscal_periods, close_period, reopen_period
+
+def _entry(accounts, entry_date, amount=50):
+    return {
+        'entry_date': entry_date,
+        'description': 'Cash sale',
+        'lines': [
+            {'account_id': accounts['1100'].id, 'debit_amount': amount, 'credit_amount': 0},
+            {'account_id': accounts['4100'].id, 'debit_amount': 0, 'credit_amount': amount}
+        ]
+    }
+
+def test_closed_period_blocks_posting(user, accounts):
+    periods = generate_fiscal_periods(None, 2025)
+    post_journal_batch([_entry(accounts, date(2025, 1, 10))], user.id)
+    close_period(periods[0], user.id)
+    
+    with pytest.raises(ValueError, match='is closed'):
+        post_journal_batch([_entry(accounts, date(2025, 1, 31))], user.id)
+    
+    # Later periods stay open
+    post_journal_batch([_entry(accounts, date(2025, 2, 1))], user.id)
+
+def test_close_writes_snapshots_and_reopen_drops_them(user, accounts):
+    periods = generate_fiscal_periods(None, 2025)
+    post_journal_batch([_entry(accounts, date(2025, 1, 10), 80)], user.id)
+    close_period(periods[0], user.id)
+    
+    snapshot = AccountBalanceSnapshot.query.filter_by(period_id=periods[0].id, account_id=accounts['1100'].id).one()
+    assert snapshot.closing_balance == 80
+    
+    reopened = reopen_period(periods[0])
+    assert [period.id for period in reopened] == [periods[0].id]
+    assert AccountBalanceSnapshot.query.count() == 0
+    post_journal_batch([_entry(accounts, date(2025, 1, 31))], user.id)
+
+def test_periods_close_in_order(user, accounts):
+    periods = generate_fiscal_periods(None, 2025)
+    
+    with pytest.raises(ValueError, match='must be closed first'):
+        close_period(periods[1], user.id)
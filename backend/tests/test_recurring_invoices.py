@@ -0,0 +1,58 @@
+from datetime import date
+
+from app.models.invoice import Invoice, RecurringInvoice
+from app.models.accounting import db
+from app.services.recurring_invoices import create_recurring_invoice, generate_recurring_invoices
+
+def _template(customer, user, **overrides):
+    data = {
+        'name': 'Monthly support',
+        'customer_id': customer.id,
+        'frequency': 'monthly',
+        'start_date': date(2025, 1, 15),
+        'items': [{'item_name': 'Support', 'quantity': 1, 'unit_price': 100}]
+    }
+    data.update(overrides)
+    return create_recurring_invoice(data, user.id)
+
+def test_missed_periods_are_caught_up(user, customer):
+    template = _template(customer, user)
+    
+    counts = generate_recurring_invoices(date(2025, 3, 20))
+    
+    assert counts['invoices'] == 3
+    assert sorted(invoice.invoice_date for invoice in Invoice.query.all()) == [
+        date(2025, 1, 15), date(2025, 2, 15), date(2025, 3, 15)
+    ]
+    assert db.session.get(RecurringInvoice, template.id).next_run_date == date(2025, 4, 15)
+
+def test_rerunning_for_the_same_date_bills_nothing(user, customer):
+    _template(customer, user)
+    
+    generate_recurring_invoices(date(2025, 3, 20))
+    counts = generate_recurring_invoices(date(2025, 3, 20))
+    
+    assert counts['invoices'] == 0
+    assert Invoice.query.count() == 3
+
+def test_periods_already_billed_are_skipped_when_the_schedule_lags(user, customer):
+    template = _template(customer, user)
+    generate_recurring_invoices(date(2025, 2, 20))
+    
+    # An earlier run billed the periods but stopped before moving the schedule on
+    template = db.session.get(RecurringInvoice, template.id)
+    template.next_run_date = date(2025, 1, 15)
+    template.periods_generated = 0
+    db.session.commit()
+    
+    counts = generate_recurring_invoices(date(2025, 2, 20))
+    assert counts['invoices'] == 0
+    assert Invoice.query.count() == 2
+
+def test_templates_end_after_their_last_period(user, customer):
+    template = _template(customer, user, end_date=date(2025, 2, 28))
+    
+    generate_recurring_invoices(date(2025, 6, 1))
+    
+    assert Invoice.query.count() == 2
+    assert db.session.get(RecurringInvoice, template.id).status == 'completed'